@@ -1,32 +1,24 @@
 """Simple disease risk lookup for SNPs in ``Genome.txt``."""
 
-import pandas as pd
+import sys
+from pathlib import Path
 
-df = pd.read_csv("Genome.txt", sep="\t", comment="#", header=None)
-df.columns = ["rsid", "chromosome", "position", "genotype"]
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from Gene_Analysis.genotype_store import GenotypeStore
+from Gene_Analysis.loader import stream_genome
+from Gene_Analysis.panels import load_registry
+from Gene_Analysis.prs import allele_present, genotype_calls
+from Gene_Analysis.report import marker_row
+
+def global_snps() -> list:
+    """Return the global disease markers of the shared panel registry."""
+    return [m for m in load_registry().panel('disease').markers() if m.group == 'Global']
 
-snps = {
-    'rs429358':    {'disease': "Alzheimer's (late onset)", 'risk': ['C'], 'description': "APOE ε4 allele increases risk of late-onset Alzheimer's."},
-    'rs2187668':   {'disease': "Celiac disease", 'risk': ['T'], 'description': "Associated with HLA-DQ2, key in immune response to gluten."},
-    'rs4988235':   {'disease': "Lactose intolerance", 'risk': ['C'], 'description': "CC genotype likely causes lactose intolerance."},
-    'rs1800562':   {'disease': "Hemochromatosis", 'risk': ['G'], 'description': "Mutation in HFE gene leads to iron overload."},
-    'rs6025':      {'disease': "Factor V Leiden (thrombophilia)", 'risk': ['A'], 'description': "Increased risk of blood clots."},
-    'rs7903146':   {'disease': "Type 2 Diabetes", 'risk': ['T'], 'description': "TCF7L2 gene variant raises diabetes risk."},
-    'rs1333049':   {'disease': "Coronary artery disease", 'risk': ['C'], 'description': "Strong association with heart disease."},
-    'rs10490924':  {'disease': "Macular degeneration", 'risk': ['T'], 'description': "Increases risk of age-related vision loss."},
-    'rs2066847':   {'disease': "Crohn's disease", 'risk': ['C'], 'description': "Mutation in NOD2 gene linked to Crohn’s."},
-    'rs2476601':   {'disease': "Rheumatoid arthritis", 'risk': ['A'], 'description': "PTPN22 gene variant increases autoimmune risk."},
-    'rs3135388':   {'disease': "Multiple sclerosis", 'risk': ['T'], 'description': "HLA-DRB1*15:01 allele linked to MS."},
-    'rs9939609':   {'disease': "Obesity", 'risk': ['A'], 'description': "FTO gene variant associated with higher BMI."},
-    'rs356219':    {'disease': "Parkinson’s disease", 'risk': ['G'], 'description': "SNCA gene variant increases risk."},
-    'rs10484554':  {'disease': "Psoriasis", 'risk': ['T'], 'description': "Linked to immune skin response."},
-    'rs10993994':  {'disease': "Prostate cancer", 'risk': ['T'], 'description': "Risk allele in MSMB gene region."},
-    'rs1799950':   {'disease': "Breast cancer (BRCA1 proxy)", 'risk': ['G'], 'description': "Rare variant possibly linked to BRCA1."},
-    'rs6265':      {'disease': "Depression / neuroticism", 'risk': ['C'], 'description': "BDNF gene variant may affect mood regulation."},
-    'rs12134493':  {'disease': "Migraine", 'risk': ['A'], 'description': "Variant in CACNA1A gene affects migraine susceptibility."},
-    'rs7216389':   {'disease': "Asthma (childhood)", 'risk': ['T'], 'description': "Variant on 17q21 linked to early asthma."},
-    'rs7574865':   {'disease': "Lupus (SLE)", 'risk': ['T'], 'description': "STAT4 gene variant common in autoimmunity."}
-}
 
 # Polygenic risk score SNPs – risk variants for complex traits
 prs_snps = {
@@ -41,25 +33,39 @@ prs_snps = {
     # add more PRS SNPs relevant to your traits here
 
 }
-print("\n GENETIC RISK ANALYSIS:\n")
-for rsid, data in snps.items():
-    match = df[df['rsid'] == rsid]
-    if not match.empty:
-        genotype = match.iloc[0]['genotype']
-        has_risk = any(allele in genotype for allele in data['risk'])
-        print(f"Disease: {data['disease']}")
-        print(f"  - SNP: {rsid}")
-        print(f"  - Your genotype: {genotype}")
-        print(f"  - Risk allele(s): {', '.join(data['risk'])}")
-        print(f"  - Description: {data['description']}")
-        if has_risk:
-            print("  Potential genetic risk detected (risk allele present)\n")
+
+
+def main(store: GenotypeStore = None) -> list:
+    """Print the risk lookup and return one report row per SNP."""
+    snps = global_snps()
+    if store is None:
+        store = stream_genome("Genome.txt", (m.rsid for m in snps))
+    print("\n GENETIC RISK ANALYSIS:\n")
+    genotypes = store.lookup_many(m.rsid for m in snps)
+    calls, codes = genotype_calls(genotypes.get(m.rsid) for m in snps)
+    risk_present = allele_present(
+        codes,
+        np.array([m.allele for m in snps], dtype='S1'),
+    ).tolist()
+    rows = []
+    for marker, genotype, has_risk in zip(snps, calls, risk_present):
+        rsid, risk = marker.rsid, [marker.allele]
+        rows.append(marker_row('disease', marker.trait, rsid, genotype, marker.description, marker.allele))
+        if genotype is not None:
+            print(f"Disease: {marker.trait}")
+            print(f"  - SNP: {rsid}")
+            print(f"  - Your genotype: {genotype}")
+            print(f"  - Risk allele(s): {', '.join(risk)}")
+            print(f"  - Description: {marker.description}")
+            if has_risk:
+                print("  Potential genetic risk detected (risk allele present)\n")
+            else:
+                print("  No known risk alleles found\n")
         else:
-            print("  No known risk alleles found\n")
-    else:
-        print(f"Disease: {data['disease']}")
-        print(f"  - SNP: {rsid} not found in your raw data.\n")
+            print(f"Disease: {marker.trait}")
+            print(f"  - SNP: {rsid} not found in your raw data.\n")
+    return rows
 
 
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    main()
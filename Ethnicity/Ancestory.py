@@ -2,65 +2,49 @@
 
 The script groups markers by trait (skin pigmentation, eye color, etc.) and
 shows whether each SNP is present in the genotype file.  At the end a short
-summary with counts for each category is displayed.
+summary with counts for each category is displayed.  Given a reference
+allele-frequency table (``python Ancestory.py reference.tsv``), it also
+prints the admixture proportions fitted by :mod:`Gene_Analysis.admixture`.
 """
 
-import pandas as pd
-
-
-def load_data() -> pd.DataFrame:
-    """Read ``Genome.txt`` into a DataFrame."""
-    df = pd.read_csv("Genome.txt", sep="\t", comment="#", header=None)
-    df.columns = ["rsid", "chromosome", "position", "genotype"]
-    return df
-
-# Comprehensive ancestry-informative SNPs organized by category
-ancestry_categories = {
-    'Skin Pigmentation': {
-        'rs1426654': 'SLC24A5 - European vs African skin pigmentation',
-        'rs16891982': 'SLC45A2 - Skin, hair, eye color variation',
-        'rs1042602': 'TYR - Skin pigmentation variation',
-    },
-    'Eye Color': {
-        'rs12913832': 'HERC2/OCA2 - Blue vs brown eye color (European)',
-        'rs1545397': 'OCA2 - Eye color variation',
-        'rs1800401': 'OCA2 - Eye color variant',
-        'rs4778138': 'OCA2 - Eye color',
-        'rs7495174': 'OCA2 - Eye color',
-        'rs4778241': 'OCA2 - Eye color',
-        'rs1800407': 'OCA2 - Eye color',
-    },
-    'Hair Color & Texture': {
-        'rs1805007': 'MC1R - Red hair (European)',
-        'rs1805008': 'MC1R - Red hair variant',
-        'rs885479': 'IRF4 - Hair color',
-        'rs12203592': 'IRF4 - Hair/skin color',
-        'rs3827760': 'EDAR - East Asian hair thickness',
-    },
-    'Metabolic Traits': {
-        'rs2736100': 'TERT - Telomere length differences',
-        'rs11076174': 'SLC39A8 - Height and metabolic traits',
-        'rs1801133': 'MTHFR - Folate metabolism',
-        'rs1801131': 'MTHFR - Folate metabolism',
-        'rs1805087': 'MTHFR - Folate metabolism',
-    },
-    'Lactose Tolerance': {
-        'rs4988235': 'LCT - Lactose tolerance',
-        'rs182549': 'LCT - Lactose tolerance',
-    },
-    'Alcohol Metabolism': {
-        'rs1229984': 'ADH1B - Alcohol metabolism',
-        'rs671': 'ALDH2 - Alcohol metabolism',
-    },
-    'European Ancestry Markers': {
-        'rs6058017': 'HERC2 - European light pigmentation',
-    }
-}
-
-
-def main() -> None:
-    """Run the ancestry summary using the SNP table above."""
-    df = load_data()
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from Gene_Analysis.genotype_store import GenotypeStore
+from Gene_Analysis.loader import stream_genome
+from Gene_Analysis.panels import load_registry
+from Gene_Analysis.prs import genotype_calls
+from Gene_Analysis.report import marker_row
+
+
+def load_data(extra_rsids=()) -> GenotypeStore:
+    """Read the ancestry markers (and ``extra_rsids``) from ``Genome.txt`` into a :class:`GenotypeStore`."""
+    return stream_genome("Genome.txt", panel_rsids() | set(extra_rsids))
+
+def ancestry_panel():
+    """Return the ancestry-informative SNPs, organized by category, of the shared panel registry."""
+    return load_registry().panel('ancestry')
+
+
+def panel_rsids() -> set:
+    """Return every rsid in the ancestry panel."""
+    return set(ancestry_panel().rsids())
+
+
+def main(store: GenotypeStore = None, reference=None) -> list:
+    """Run the ancestry summary and return one report row per SNP.
+
+    ``store`` lets a caller that already parsed the genome share it; when
+    omitted ``Genome.txt`` is loaded.  ``reference`` is an
+    :class:`~Gene_Analysis.admixture.ReferencePanel` to fit admixture
+    proportions against; the store must then hold its markers too.
+    """
+    if store is None:
+        store = load_data(reference.rsids if reference is not None else ())
 
     print("\n==============================")
     print("COMPREHENSIVE ANCESTRY SUMMARY")
@@ -68,18 +52,23 @@ def main() -> None:
 
     all_results = {}
     category_counts = {}
+    rows = []
 
-    for category, snps in ancestry_categories.items():
+    panel = ancestry_panel()
+    for category in panel.traits:
         print(f"{'='*60}")
         print(f"CATEGORY: {category}")
         print(f"{'='*60}")
 
         found_count = 0
-
-        for rsid, description in snps.items():
-            row = df[df["rsid"] == rsid]
-            if not row.empty:
-                genotype = row.iloc[0]["genotype"]
+        markers = panel.markers(category)
+        typed = store.lookup_many(m.rsid for m in markers)
+        calls, _ = genotype_calls(typed.get(m.rsid) for m in markers)
+
+        for marker, genotype in zip(markers, calls):
+            rsid, description = marker.rsid, marker.description
+            rows.append(marker_row('ancestry', category, rsid, genotype, description))
+            if genotype is not None:
                 found_count += 1
                 all_results[rsid] = (genotype, description, category)
                 print(f"{'-'*50}")
@@ -93,7 +82,7 @@ def main() -> None:
                 print(f"Function: {description}")
                 print()
 
-        category_counts[category] = (found_count, len(snps))
+        category_counts[category] = (found_count, len(markers))
 
     print(f"{'='*60}")
     print("SUMMARY STATISTICS")
@@ -134,6 +123,20 @@ def main() -> None:
     print(f"European markers found: {european_count}")
     print(f"African markers found: {african_count}")
 
+    if reference is not None:
+        from Gene_Analysis.admixture import admix
+
+        estimate = admix(reference, store)
+        print(f"\n{'='*60}")
+        print("ADMIXTURE ESTIMATE")
+        print(f"{'='*60}")
+        print(f"Reference: {reference.name} ({estimate.markers_used}/{estimate.markers_total} markers genotyped)")
+        if estimate.proportions is None:
+            print("No reference markers were genotyped; no estimate possible.")
+        else:
+            for population, proportion in zip(estimate.populations, estimate.proportions):
+                print(f"{population:<25} {proportion:6.1%}")
+
     print(f"\n{'='*60}")
     print("KEY FINDINGS")
     print(f"{'='*60}")
@@ -168,7 +171,13 @@ def main() -> None:
     print("- These results are statistical associations, not definitive ancestry")
     print("- Individual genetic variation is complex and doesn't fit simple categories")
     print("- Your cultural identity is valid regardless of genetic markers")
+    return rows
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        from Gene_Analysis.admixture import ReferencePanel
+
+        main(reference=ReferencePanel.load(sys.argv[1]))
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""Shared genome loading and scoring infrastructure for the analysis scripts."""
+
+from Gene_Analysis.genotype_store import GenotypeRecord, GenotypeStore
+from Gene_Analysis.loader import load_genome
+
+__all__ = ["GenotypeRecord", "GenotypeStore", "load_genome"]
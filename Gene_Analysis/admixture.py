@@ -0,0 +1,217 @@
+"""Admixture proportions from a reference allele-frequency matrix.
+
+Counting how many "European" or "East Asian" markers a genome carries says
+little about ancestry.  Here a genome is modelled as a mix of reference
+populations: at marker ``j`` the chance of drawing the counted allele is
+``p_j = sum_k q_k f_jk``, where ``f_jk`` is the allele frequency in population
+``k`` and ``q`` the admixture proportions.  :func:`estimate_admixture` fits
+``q`` by maximum likelihood with the EM update of supervised ADMIXTURE /
+frappe, with the frequencies held fixed:
+
+    q_k <- q_k / 2n * sum_j [ g_j f_jk / p_j + (2 - g_j) (1 - f_jk) / (1 - p_j) ]
+
+Each iteration is two matrix products over all markers, and a cohort is
+fitted as one ``(samples, markers)`` array against the shared frequency
+matrix, so tens of thousands of markers take well under a second.
+
+The reference is a local table (:meth:`ReferencePanel.load`): a tab-separated
+file with a ``rsid``, ``allele`` and one frequency column per population, or
+the ``.npz`` written by :meth:`ReferencePanel.save`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from Gene_Analysis.prs import allele_dosage, genotype_array
+
+DEFAULT_MAX_ITER = 1000
+DEFAULT_TOLERANCE = 1e-6
+# Frequencies are kept this far from 0 and 1 so that no genotype has zero likelihood.
+FREQUENCY_FLOOR = 1e-3
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+
+@dataclass
+class ReferencePanel:
+    """Allele frequencies of ``rsids`` (counting ``alleles``) in each of ``populations``."""
+
+    rsids: list[str]
+    alleles: np.ndarray
+    populations: list[str]
+    frequencies: np.ndarray
+    name: str = ""
+    digest: str = field(default="", repr=False)
+
+    def __post_init__(self) -> None:
+        self.alleles = np.asarray(self.alleles, dtype="S1")
+        self.frequencies = np.asarray(self.frequencies, dtype=np.float64)
+        if self.frequencies.shape != (len(self.rsids), len(self.populations)):
+            raise ValueError(
+                f"Frequency matrix is {self.frequencies.shape}, expected "
+                f"{(len(self.rsids), len(self.populations))} (markers x populations)"
+            )
+        if not self.digest:
+            digest = hashlib.sha256("\t".join(self.rsids + self.populations).encode())
+            digest.update(self.alleles.tobytes())
+            digest.update(self.frequencies.tobytes())
+            self.digest = digest.hexdigest()
+
+    @classmethod
+    def load(cls, path: str | Path) -> ReferencePanel:
+        """Read a ``.tsv`` (``rsid``, ``allele``, one column per population) or ``.npz`` reference."""
+        path = Path(path)
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        if path.suffix == ".npz":
+            with np.load(path) as arrays:
+                return cls(
+                    arrays["rsids"].astype(str).tolist(),
+                    arrays["alleles"],
+                    arrays["populations"].astype(str).tolist(),
+                    arrays["frequencies"],
+                    path.name,
+                    digest,
+                )
+        import pandas as pd  # Only the text format needs pandas.
+
+        df = pd.read_csv(path, sep="\t", comment="#", dtype={"rsid": str, "allele": str})
+        if list(df.columns[:2]) != ["rsid", "allele"] or len(df.columns) < 3:
+            raise ValueError(f"{path} must have rsid, allele and at least one population column")
+        populations = [str(column) for column in df.columns[2:]]
+        return cls(
+            df["rsid"].tolist(),
+            df["allele"].to_numpy(dtype="S1"),
+            populations,
+            df[populations].to_numpy(dtype=np.float64),
+            path.name,
+            digest,
+        )
+
+    def save(self, path: str | Path) -> None:
+        """Write the reference as ``.npz``, which loads faster than the text table."""
+        np.savez(
+            path,
+            rsids=np.array(self.rsids),
+            alleles=self.alleles,
+            populations=np.array(self.populations),
+            frequencies=self.frequencies,
+        )
+
+    def genotype_matrix(self, genomes: Iterable[Mapping[str, str]]) -> np.ndarray:
+        """Return the ``(samples, markers)`` ``S2`` genotypes of ``genomes`` at the reference markers."""
+        rows = []
+        for genome in genomes:
+            typed = genome.lookup_many(self.rsids) if hasattr(genome, "lookup_many") else genome
+            rows.append([typed.get(rsid) or "" for rsid in self.rsids])
+        return genotype_array(rows).reshape(len(rows), len(self.rsids))
+
+
+@dataclass
+class AdmixtureResult:
+    """Fitted admixture proportions of one genome."""
+
+    populations: list[str]
+    proportions: list[float] | None
+    markers_used: int
+    markers_total: int
+    log_likelihood: float | None
+    iterations: int
+    converged: bool
+    reference: str = ""
+
+    def to_dict(self) -> dict:
+        return {
+            "reference": self.reference,
+            "proportions": None if self.proportions is None else {
+                population: round(q, 4) for population, q in zip(self.populations, self.proportions)
+            },
+            "markers_used": self.markers_used,
+            "markers_total": self.markers_total,
+            "log_likelihood": None if self.log_likelihood is None else round(self.log_likelihood, 4),
+            "iterations": self.iterations,
+            "converged": self.converged,
+        }
+
+
+def estimate_admixture(
+    dosages: np.ndarray,
+    called: np.ndarray,
+    frequencies: np.ndarray,
+    *,
+    max_iter: int = DEFAULT_MAX_ITER,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Fit admixture proportions for every row of ``dosages`` by EM.
+
+    ``dosages`` and ``called`` are ``(samples, markers)``: counted-allele
+    copies and whether the marker was called.  ``frequencies`` is
+    ``(markers, populations)``.  Returns per-sample ``(proportions,
+    log_likelihoods, iterations, converged)``; a sample stops updating once
+    no proportion moves by more than ``tolerance``.
+    """
+    frequencies = np.clip(frequencies, FREQUENCY_FLOOR, 1 - FREQUENCY_FLOOR)
+    complement = 1 - frequencies
+    present = np.where(called, dosages, 0.0)
+    absent = np.where(called, 2 - dosages, 0.0)
+    typed = called.sum(axis=1)
+    copies = 2 * np.maximum(typed, 1)[:, None]
+    samples, populations = len(dosages), frequencies.shape[1]
+    proportions = np.full((samples, populations), 1 / populations)
+    # Nothing to fit without a single called marker; such samples keep the uniform start.
+    converged = typed == 0
+    iterations = np.zeros(samples, dtype=np.int64)
+    for _ in range(max_iter):
+        # Slicing instead of masking spares copying the dosages while every sample is active.
+        active = slice(None) if not converged.any() else ~converged
+        iterations[active] += 1
+        q = proportions[active]
+        p = q @ frequencies.T
+        update = q * (
+            (present[active] / p) @ frequencies + (absent[active] / (1 - p)) @ complement
+        ) / copies[active]
+        # ``q`` is a view of ``proportions`` while every sample is active, so compare first.
+        converged[active] = np.abs(update - q).max(axis=1) < tolerance
+        proportions[active] = update
+        if converged.all():
+            break
+    p = proportions @ frequencies.T
+    log_likelihood = (present * np.log(p) + absent * np.log(1 - p)).sum(axis=1)
+    return proportions, log_likelihood, iterations, converged
+
+
+def _called(genotypes: np.ndarray) -> np.ndarray:
+    genotypes = genotype_array(genotypes)
+    pairs = genotypes.view(np.uint8).reshape(genotypes.shape + (2,))
+    return np.isin(pairs, BASES).all(axis=-1)
+
+
+def admix_matrix(reference: ReferencePanel, genotypes: np.ndarray, **options) -> list[AdmixtureResult]:
+    """Fit every sample of a ``(samples, markers)`` genotype matrix against ``reference``."""
+    called = _called(genotypes)
+    dosages = allele_dosage(genotypes, reference.alleles[None, :])
+    proportions, log_likelihood, iterations, converged = estimate_admixture(
+        dosages, called, reference.frequencies, **options
+    )
+    results = []
+    for i, used in enumerate(called.sum(axis=1).tolist()):
+        results.append(AdmixtureResult(
+            reference.populations,
+            proportions[i].tolist() if used else None,
+            used,
+            len(reference.rsids),
+            float(log_likelihood[i]) if used else None,
+            int(iterations[i]),
+            bool(converged[i]),
+            reference.name,
+        ))
+    return results
+
+
+def admix(reference: ReferencePanel, genome: Mapping[str, str], **options) -> AdmixtureResult:
+    """Fit the admixture proportions of one genome against ``reference``."""
+    return admix_matrix(reference, reference.genotype_matrix([genome]), **options)[0]
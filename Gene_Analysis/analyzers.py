@@ -0,0 +1,69 @@
+"""Registry of the analyzer scripts shared by ``analyze`` and batch runs.
+
+The scripts live in folders whose names are not importable packages
+(``Disease Testing``), so they are loaded by path and cached here.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+from collections.abc import Iterator
+from pathlib import Path
+from types import ModuleType
+
+from Gene_Analysis.genotype_store import GenotypeStore
+from Gene_Analysis.panels import load_registry
+from Gene_Analysis.profiling import Profiler
+from Gene_Analysis.prs import Encoder, allele_dosage, longevity_effect
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Analyzer scripts run by ``analyze``; each exposes ``panel_rsids()`` and
+# ``main(store) -> rows``.
+ANALYZER_SCRIPTS = {
+    "ancestry": "Ethnicity/Ancestory.py",
+    "disease": "Disease Testing/Disease_Comprehensive.py",
+    "fitness": "Fitness/Athelticism.py",
+    "longevity": "Longevity/Comprehensive_Longevity.py",
+}
+
+_analyzer_modules: dict[str, ModuleType] = {}
+
+
+def load_analyzer(name: str) -> ModuleType:
+    """Import an analyzer script by name, caching the module."""
+    module = _analyzer_modules.get(name)
+    if module is None:
+        path = REPO_ROOT / ANALYZER_SCRIPTS[name]
+        spec = importlib.util.spec_from_file_location(f"_gene_analysis_{name}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _analyzer_modules[name] = module
+    return module
+
+
+def panel_rsids() -> set[str]:
+    """Return the union of every analyzer's marker panel."""
+    return load_registry().rsids_for()
+
+
+def panel_encoder(name: str) -> Encoder:
+    """Return the genotype encoder that scores registry panel ``name``."""
+    if name == "longevity":
+        return longevity_effect
+    return allele_dosage
+
+
+def analyzer_rows(store: GenotypeStore, profiler: Profiler | None = None) -> Iterator[dict]:
+    """Run every analyzer against ``store`` and yield its report rows as they come.
+
+    With a ``profiler`` each analyzer is recorded as its own stage, which
+    includes whatever the caller does with that analyzer's rows.
+    """
+    profiler = profiler or Profiler(enabled=False)
+    for name in ANALYZER_SCRIPTS:
+        with profiler.stage(name) as stage:
+            rows = load_analyzer(name).main(store)
+            stage["markers_looked_up"] = len(rows)
+            stage["markers_found"] = sum(1 for row in rows if row["genotype"] is not None)
+            yield from rows
@@ -0,0 +1,407 @@
+"""Score a cohort of genomes in one vectorized pass.
+
+``analyze-batch`` reads every genome in a directory or manifest, fills a
+``(samples, markers)`` genotype matrix over the union of all analyzer
+panels and scores every trait model for every sample at once with
+:meth:`PRSEngine.score_matrix`.  It then writes one report per sample and a
+cohort summary table with one row per sample and one column per trait.
+Large cohorts can be spread over a process pool in chunks.  With an
+ancestry reference, each chunk's admixture proportions are fitted in one EM
+run against the frequency matrix every sample shares.  Every report records
+the evidence snapshot that was current when the batch started.
+"""
+
+from __future__ import annotations
+
+import csv
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from Gene_Analysis.admixture import ReferencePanel, admix_matrix
+from Gene_Analysis.analyzers import panel_encoder
+from Gene_Analysis.columnar import append_reports
+from Gene_Analysis.evidence import Snapshot
+from Gene_Analysis.genome_cache import file_digest
+from Gene_Analysis.genotype_store import GenotypeStore
+from Gene_Analysis.loader import COMPRESSED_SUFFIXES, genome_stem, stream_genome
+from Gene_Analysis.panels import load_registry
+from Gene_Analysis.prs import CohortPRSResult, PRSEngine, genotype_array
+from Gene_Analysis.report import build_report, marker_row, write_report
+from Gene_Analysis.result_cache import ResultCache
+from Gene_Analysis.uncertainty import annotate_report
+
+GENOME_SUFFIXES = {".txt", ".tsv", ".csv", *COMPRESSED_SUFFIXES}
+SUMMARY_FILE = "cohort_summary.tsv"
+DEFAULT_CHUNK_SIZE = 32
+
+# (path, rsids) -> store; matches stream_genome and load_cached_genome.
+GenomeLoader = Callable[[Path, Iterable[str]], GenotypeStore]
+
+
+@dataclass
+class CohortPanel:
+    """One analyzer's markers expressed as a :class:`PRSEngine`.
+
+    ``descriptions`` holds one entry per model entry in engine order.  When
+    ``scored`` is false the rows report genotypes only, as the ancestry and
+    single-SNP disease reports do.
+    """
+
+    category: str
+    engine: PRSEngine
+    descriptions: list[str]
+    scored: bool = True
+
+
+@dataclass(frozen=True)
+class ReportOutput:
+    """How each sample's report is written.
+
+    The JSON/Markdown pair is always written (compact JSON if ``compact``).
+    With ``columnar_dir`` set, the reports are also appended to that
+    Parquet or Arrow dataset (``columnar_format``).
+    """
+
+    compact: bool = False
+    columnar_dir: Path | None = None
+    columnar_format: str = "parquet"
+
+    def write(self, report: dict, output_dir: Path, sample_id: str) -> None:
+        write_report(report, output_dir / f"{sample_id}.json", output_dir / f"{sample_id}.md", compact=self.compact)
+
+
+def cohort_panels() -> list[CohortPanel]:
+    """Build an engine for every registry panel, in ``analyze`` report order."""
+    registry = load_registry()
+    panels = []
+    for name in registry:
+        panel = registry.panel(name)
+        panels.append(CohortPanel(
+            panel.category,
+            panel.engine(panel_encoder(name)),
+            [marker.description for marker in panel.markers()],
+            scored=panel.scored,
+        ))
+    return panels
+
+
+def discover_genomes(source: str | Path) -> list[tuple[str, Path]]:
+    """Return ``(sample_id, path)`` pairs from a directory or a manifest file.
+
+    A manifest lists one genome per line, either as ``path`` or as
+    ``sample_id<TAB>path``; relative paths resolve against the manifest's
+    folder and ``#`` starts a comment.  Sample IDs default to the file stem,
+    without any ``.gz``/``.bz2``/``.zip`` suffix.  A directory's
+    :data:`SUMMARY_FILE` is skipped, so a batch can write into its own
+    input folder and be run again.
+    """
+    source = Path(source)
+    if source.is_dir():
+        paths = sorted(
+            p for p in source.iterdir()
+            if p.is_file() and p.suffix.lower() in GENOME_SUFFIXES and p.name != SUMMARY_FILE
+        )
+        return [(genome_stem(p), p) for p in paths]
+    genomes = []
+    for line in source.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        sample_id, _, path = line.rpartition("\t")
+        path = Path(path) if Path(path).is_absolute() else source.parent / path
+        genomes.append((sample_id or genome_stem(path), path))
+    return genomes
+
+
+def score_cohort(
+    matrix: np.ndarray,
+    rsids: list[str],
+    panels: list[CohortPanel],
+) -> list[CohortPRSResult]:
+    """Score every panel against a genotype matrix whose columns are ``rsids``."""
+    column = {rsid: i for i, rsid in enumerate(rsids)}
+    results = []
+    for panel in panels:
+        columns = [column[rsid] for rsid in panel.engine.rsids]
+        results.append(panel.engine.score_matrix(matrix[:, columns]))
+    return results
+
+
+def sample_rows(panels: list[CohortPanel], results: list[CohortPRSResult], index: int) -> list[dict]:
+    """Rebuild the per-marker report rows of sample ``index``."""
+    rows = []
+    for panel, cohort in zip(panels, results):
+        result = cohort.sample(index)
+        descriptions = iter(panel.descriptions)
+        for trait in result.traits:
+            for c in result.contributions(trait):
+                allele = c.effect_allele or None
+                if panel.scored:
+                    contribution = c.contribution if c.genotype is not None else None
+                    rows.append(marker_row(panel.category, trait, c.rsid, c.genotype, next(descriptions),
+                                           allele, c.weight, contribution))
+                else:
+                    rows.append(marker_row(panel.category, trait, c.rsid, c.genotype, next(descriptions), allele))
+    return rows
+
+
+class SampleOutcome(NamedTuple):
+    """What happened to one sample of a batch; ``error`` is set when it failed."""
+
+    sample_id: str
+    input_file: Path
+    markers_found: int | None = None
+    scores: list[float] | None = None
+    error: str | None = None
+
+
+def analyze_chunk(
+    genomes: list[tuple[str, Path]],
+    panels: list[CohortPanel],
+    rsids: list[str],
+    load: GenomeLoader,
+    output_dir: Path,
+    results_cache: ResultCache | None = None,
+    output: ReportOutput = ReportOutput(),
+    reference: ReferencePanel | None = None,
+    snapshot: Snapshot | None = None,
+) -> list[SampleOutcome]:
+    """Load, score and report a chunk of samples, isolating per-sample failures.
+
+    With ``results_cache`` a sample whose genome was already scored against
+    the current panels is reported straight from the cache.  With
+    ``reference`` the reference markers are loaded too and every report gets
+    ``metadata["admixture"]``; ``snapshot`` stamps every report with the
+    evidence snapshot it was served from.  The chunk's
+    reports are appended to the columnar dataset in one write; if that
+    fails, every sample of the chunk is marked failed.
+    """
+    panel_version = load_registry().digest
+    wanted = rsids
+    if reference is not None:
+        panel_version = f"{panel_version}+ref-{reference.digest}"
+        wanted = list(dict.fromkeys(rsids + reference.rsids))
+    encoders = {panel.category: panel.engine.encoder for panel in panels if panel.scored}
+    outcomes: dict[int, SampleOutcome] = {}
+    keys: dict[int, str] = {}
+    loaded: list[int] = []
+    reported: dict[int, dict] = {}
+    rows = []
+    stores = []
+    for i, (sample_id, path) in enumerate(genomes):
+        try:
+            if results_cache is not None:
+                keys[i] = results_cache.key(file_digest(path), panel_version)
+                report = results_cache.get(keys[i], path.resolve())
+                if report is not None:
+                    if snapshot is not None:
+                        report["metadata"].update(snapshot.metadata())
+                    output.write(report, output_dir, sample_id)
+                    outcomes[i] = cached_outcome(sample_id, path, panels, report)
+                    reported[i] = report
+                    continue
+            typed = load(path, wanted)
+        except Exception as exc:
+            outcomes[i] = SampleOutcome(sample_id, path, error=f"{type(exc).__name__}: {exc}")
+            continue
+        loaded.append(i)
+        rows.append([typed.get(rsid) or "" for rsid in rsids])
+        stores.append(typed)
+    matrix = genotype_array(rows).reshape(len(rows), len(rsids))
+    results = score_cohort(matrix, rsids, panels)
+    admixture = admix_matrix(reference, reference.genotype_matrix(stores)) if reference is not None else None
+
+    found = sum(result.markers_found.sum(axis=1) for result in results)
+    scores = np.hstack([result.scores for panel, result in zip(panels, results) if panel.scored])
+    for row, i in enumerate(loaded):
+        sample_id, path = genomes[i]
+        try:
+            report = build_report(sample_rows(panels, results, row), path.resolve(), panel_version)
+            annotate_report(report, encoders=encoders)
+            if admixture is not None:
+                report["metadata"]["admixture"] = admixture[row].to_dict()
+            if snapshot is not None:
+                report["metadata"].update(snapshot.metadata())
+            output.write(report, output_dir, sample_id)
+        except Exception as exc:
+            outcomes[i] = SampleOutcome(sample_id, path, error=f"{type(exc).__name__}: {exc}")
+            continue
+        if results_cache is not None:
+            try:
+                results_cache.put(keys[i], report)
+            except OSError:
+                pass  # The report is written; only the next run's shortcut is lost.
+        outcomes[i] = SampleOutcome(sample_id, path, int(found[row]), scores[row].round(4).tolist())
+        reported[i] = report
+
+    if output.columnar_dir is not None and reported:
+        try:
+            append_reports(
+                output.columnar_dir,
+                [(genomes[i][0], report) for i, report in sorted(reported.items())],
+                output.columnar_format,
+            )
+        except Exception as exc:
+            error = f"columnar output: {type(exc).__name__}: {exc}"
+            for i in reported:
+                outcomes[i] = SampleOutcome(*genomes[i], error=error)
+    return [outcomes[i] for i in range(len(genomes))]
+
+
+def cached_outcome(sample_id: str, path: Path, panels: list[CohortPanel], report: dict) -> SampleOutcome:
+    """Rebuild a sample's summary-table entry from its cached report."""
+    scores = {(s["category"], s["trait"]): s["score"] for s in report["trait_summaries"]}
+    return SampleOutcome(
+        sample_id,
+        path,
+        report["metadata"]["markers_found"],
+        [
+            scores.get((panel.category, trait)) or 0.0
+            for panel in panels if panel.scored
+            for trait in panel.engine.traits
+        ],
+    )
+
+
+# Per-process state of a pool worker, filled once by ``_init_worker``.
+_worker: dict = {}
+
+
+def _init_worker(
+    load: GenomeLoader,
+    output_dir: Path,
+    results_cache: ResultCache | None,
+    output: ReportOutput,
+    reference: ReferencePanel | None = None,
+    snapshot: Snapshot | None = None,
+) -> None:
+    panels = cohort_panels()
+    _worker.update(
+        panels=panels,
+        rsids=panel_union(panels),
+        load=load,
+        output_dir=output_dir,
+        results_cache=results_cache,
+        output=output,
+        reference=reference,
+        snapshot=snapshot,
+    )
+
+
+def _analyze_in_worker(genomes: list[tuple[str, Path]]) -> list[SampleOutcome]:
+    return analyze_chunk(
+        genomes, _worker["panels"], _worker["rsids"], _worker["load"], _worker["output_dir"],
+        _worker["results_cache"], _worker["output"], _worker["reference"],
+        _worker["snapshot"],
+    )
+
+
+def panel_union(panels: list[CohortPanel]) -> list[str]:
+    """Return every rsid scored by ``panels``, in first-seen order."""
+    return list(dict.fromkeys(rsid for panel in panels for rsid in panel.engine.rsids))
+
+
+def pool_chunks(chunks: list[list[tuple[str, Path]]], workers: int, initargs: tuple) -> list[list[SampleOutcome]]:
+    """Analyze ``chunks`` on a process pool, surviving workers that die.
+
+    A worker that dies (a segfault, the OOM killer) breaks the whole pool and
+    every unfinished chunk with it.  Those chunks are retried on a fresh
+    single-worker pool, which runs them in submission order, so the first
+    chunk to break that pool is the one that crashed: its samples are marked
+    failed and the chunks queued behind it are retried again.
+    """
+    done: dict[int, list[SampleOutcome]] = {}
+    pending = list(range(len(chunks)))
+    size = workers
+    while pending:
+        with ProcessPoolExecutor(size, initializer=_init_worker, initargs=initargs) as pool:
+            futures = [(i, pool.submit(_analyze_in_worker, chunks[i])) for i in pending]
+            pending = []
+            # Only a single-worker pool tells which chunk broke it.
+            retry_broken = size > 1
+            for i, future in futures:
+                try:
+                    done[i] = future.result()
+                    continue
+                except BrokenProcessPool as exc:
+                    if retry_broken:
+                        pending.append(i)
+                        continue
+                    retry_broken = True
+                    error = f"{type(exc).__name__}: {exc}"
+                except Exception as exc:
+                    error = f"{type(exc).__name__}: {exc}"
+                done[i] = [SampleOutcome(sample_id, path, error=error) for sample_id, path in chunks[i]]
+        size = 1
+    return [done[i] for i in range(len(chunks))]
+
+
+def write_cohort_summary(path: Path, panels: list[CohortPanel], outcomes: list[SampleOutcome]) -> None:
+    """Write one TSV row per sample with marker coverage, every trait score and any error."""
+    traits = [f"{panel.category}:{trait}" for panel in panels if panel.scored for trait in panel.engine.traits]
+    total = sum(len(panel.engine.indices) for panel in panels)
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle, delimiter="\t")
+        writer.writerow(["sample_id", "input_file", "status", "markers_found", "total_markers", *traits, "error"])
+        for outcome in outcomes:
+            if outcome.error is None:
+                writer.writerow([outcome.sample_id, str(outcome.input_file), "ok", outcome.markers_found, total,
+                                 *outcome.scores, ""])
+            else:
+                writer.writerow([outcome.sample_id, str(outcome.input_file), "failed", "", total,
+                                 *[""] * len(traits), outcome.error])
+
+
+def run_batch(
+    source: str | Path,
+    output_dir: str | Path,
+    load: GenomeLoader = stream_genome,
+    *,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    results_cache: ResultCache | None = None,
+    output: ReportOutput = ReportOutput(),
+    reference: ReferencePanel | None = None,
+    snapshot: Snapshot | None = None,
+) -> list[SampleOutcome]:
+    """Score every genome listed by ``source`` and write reports into ``output_dir``.
+
+    Samples are split into chunks of ``chunk_size`` that are each scored in
+    one vectorized pass.  With ``workers > 1`` the chunks fan out over a
+    process pool whose workers build the marker panels once at start-up;
+    ``load`` must then be picklable (a module-level function or a
+    :func:`functools.partial` of one).  A sample that fails to load or
+    report is recorded as failed without stopping the batch, and a worker
+    crash fails only the chunk that caused it (see :func:`pool_chunks`).
+    Workers may share one
+    ``results_cache``, and ``output`` selects compact JSON and columnar
+    output.  A ``reference`` and the evidence ``snapshot`` are handed to each
+    worker once and shared by all of its chunks.  The cohort summary is written to ``output_dir / SUMMARY_FILE``.
+    """
+    genomes = discover_genomes(source)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    panels = cohort_panels()
+    if workers > 1:
+        # Give every worker something to do on small cohorts.
+        chunk_size = max(1, min(chunk_size, -(-len(genomes) // workers)))
+    chunks = [genomes[i:i + chunk_size] for i in range(0, len(genomes), chunk_size)]
+
+    if workers <= 1:
+        rsids = panel_union(panels)
+        outcomes = [
+            o for chunk in chunks
+            for o in analyze_chunk(chunk, panels, rsids, load, output_dir, results_cache, output, reference, snapshot)
+        ]
+    else:
+        initargs = (load, output_dir, results_cache, output, reference, snapshot)
+        outcomes = [o for chunk in pool_chunks(chunks, workers, initargs) for o in chunk]
+
+    write_cohort_summary(output_dir / SUMMARY_FILE, panels, outcomes)
+    return outcomes
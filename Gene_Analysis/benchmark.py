@@ -0,0 +1,255 @@
+"""Benchmark the parse, lookup, scoring and report hot paths.
+
+A synthetic genome of realistic size (600k rows by default, in the same
+four-column ``rsid/chromosome/position/genotype`` format as ``Genome.txt``)
+is generated once per row count and seed, with every panel marker placed at a
+random row.  Each stage is timed as the best of ``--repeat`` runs and its
+Python peak memory is measured with :mod:`tracemalloc` in a separate run:
+
+* ``load_stream`` / ``load_full`` / ``load_cache``   rows per second
+* ``lookup``                                        rsid lookups per second
+* ``score_<category>``                              scored marker entries per second
+* ``report``                                        report rows per second
+
+Results are compared against ``benchmarks/baseline.json``; a stage whose CPU
+time or peak memory exceeds the baseline by more than ``--threshold`` fails
+the run::
+
+    python -m Gene_Analysis.benchmark --rows 600000
+    python -m Gene_Analysis.benchmark --rows 600000 --update-baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from Gene_Analysis.analyzers import REPO_ROOT, panel_rsids
+from Gene_Analysis.batch import cohort_panels, sample_rows, score_cohort
+from Gene_Analysis.genome_cache import build_cache, load_cached_genome
+from Gene_Analysis.loader import load_genome, stream_genome
+from Gene_Analysis.prs import genotype_array
+from Gene_Analysis.report import build_report, render_markdown
+
+BASELINE_FILE = REPO_ROOT / "benchmarks" / "baseline.json"
+DEFAULT_ROWS = 600_000
+DEFAULT_THRESHOLD = 0.25
+# Memory differences below this are noise, whatever the threshold.
+MEMORY_SLACK_MB = 1.0
+# Repetitions inside the sub-millisecond stages so each takes long enough to time.
+LOOKUP_ROUNDS = 2_000
+SCORE_ROUNDS = 500
+REPORT_ROUNDS = 20
+
+CHROMOSOMES = [str(n) for n in range(1, 23)] + ["X", "Y", "MT"]
+GENOTYPES = ["AA", "AC", "AG", "AT", "CC", "CG", "CT", "GG", "GT", "TT", "--", "A", "C", "G", "T"]
+GENOTYPE_WEIGHTS = [0.12, 0.06, 0.14, 0.02, 0.12, 0.02, 0.14, 0.12, 0.06, 0.12, 0.02, 0.015, 0.015, 0.015, 0.015]
+
+
+class StageResult(NamedTuple):
+    """Timing of one benchmark stage; regressions are judged on ``cpu_seconds``."""
+
+    seconds: float
+    cpu_seconds: float
+    items: int
+    unit: str
+    peak_mb: float
+
+    @property
+    def throughput(self) -> float:
+        return self.items / self.seconds if self.seconds else float("inf")
+
+
+def write_synthetic_genome(path: str | Path, rows: int, panel: set[str], seed: int = 0) -> Path:
+    """Write a ``rows``-line raw genome that contains every rsid of ``panel``."""
+    rng = np.random.default_rng(seed)
+    panel = sorted(panel)
+    taken = {int(rsid[2:]) for rsid in panel if rsid.startswith("rs")}
+    ids = np.unique(rng.integers(1, 250_000_000, size=int(rows * 1.05) + 16))
+    ids = rng.permutation(ids[~np.isin(ids, list(taken))])[:rows - len(panel)]
+    names = [f"rs{i}" for i in ids.tolist()]
+    for row, rsid in zip(sorted(rng.choice(rows, size=len(panel), replace=False).tolist()), panel):
+        names.insert(row, rsid)
+    chromosomes = np.asarray(CHROMOSOMES)[np.arange(rows) * len(CHROMOSOMES) // rows]
+    positions = rng.integers(1, 2_000, size=rows).cumsum()
+    genotypes = rng.choice(GENOTYPES, size=rows, p=GENOTYPE_WEIGHTS)
+    path = Path(path)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("# Synthetic genome for benchmarking\n# rsid\tchromosome\tposition\tgenotype\n")
+        handle.writelines(
+            f"{rsid}\t{chrom}\t{pos}\t{genotype}\n"
+            for rsid, chrom, pos, genotype in zip(names, chromosomes.tolist(), positions.tolist(), genotypes.tolist())
+        )
+    return path
+
+
+def measure(fn: Callable[[], object], items: int, unit: str, repeat: int) -> StageResult:
+    """Time ``fn`` as the best of ``repeat`` runs and measure its peak memory once.
+
+    CPU time is what regressions are judged on: on a shared machine it
+    varies far less than wall time.
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    best = best_cpu = float("inf")
+    for _ in range(repeat):
+        start, start_cpu = time.perf_counter(), time.process_time()
+        fn()
+        best = min(best, time.perf_counter() - start)
+        best_cpu = min(best_cpu, time.process_time() - start_cpu)
+    return StageResult(best, best_cpu, items, unit, peak / (1 << 20))
+
+
+def run_benchmarks(genome: Path, rows: int, repeat: int, workdir: Path) -> dict[str, StageResult]:
+    """Run every stage against ``genome`` and return the results by stage name."""
+    rsids = panel_rsids()
+    ordered = sorted(rsids)
+    cache_dir = workdir / "cache"
+    build_cache(genome, cache_dir)
+    stages = {
+        "load_stream": measure(lambda: stream_genome(genome, rsids), rows, "rows/s", repeat),
+        "load_full": measure(lambda: load_genome(genome), rows, "rows/s", repeat),
+        "load_cache": measure(lambda: load_cached_genome(genome, rsids, cache_dir=cache_dir), rows, "rows/s", repeat),
+    }
+
+    full = load_genome(genome)
+
+    def lookup():
+        for _ in range(LOOKUP_ROUNDS):
+            full.lookup_many(ordered)
+
+    stages["lookup"] = measure(lookup, LOOKUP_ROUNDS * len(ordered), "lookups/s", repeat)
+
+    store = stream_genome(genome, rsids)
+    panels = cohort_panels()
+    for panel in panels:
+        engine = panel.engine
+
+        def score(engine=engine):
+            for _ in range(SCORE_ROUNDS):
+                engine.score(store)
+
+        name = f"score_{panel.category}"
+        stages[name] = measure(score, SCORE_ROUNDS * len(engine.indices), "markers/s", repeat)
+
+    union = list(dict.fromkeys(rsid for panel in panels for rsid in panel.engine.rsids))
+    matrix = genotype_array([[store.get(rsid) or "" for rsid in union]])
+    report_rows = sample_rows(panels, score_cohort(matrix, union, panels), 0)
+
+    def report():
+        for _ in range(REPORT_ROUNDS):
+            document = build_report(report_rows, genome)
+            json.dumps(document, indent=2, ensure_ascii=False)
+            render_markdown(document)
+
+    stages["report"] = measure(report, REPORT_ROUNDS * len(report_rows), "rows/s", repeat)
+    return stages
+
+
+def find_regressions(
+    results: dict[str, StageResult],
+    baseline: dict,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[str]:
+    """Describe every stage that is slower or heavier than ``baseline`` allows."""
+    regressions = []
+    for name, base in baseline.get("stages", {}).items():
+        result = results.get(name)
+        if result is None:
+            continue
+        if result.cpu_seconds > base["cpu_seconds"] * (1 + threshold):
+            regressions.append(
+                f"{name}: {result.cpu_seconds * 1000:.1f} ms CPU vs baseline {base['cpu_seconds'] * 1000:.1f} ms"
+            )
+        if result.peak_mb > base["peak_mb"] * (1 + threshold) + MEMORY_SLACK_MB:
+            regressions.append(f"{name}: peak {result.peak_mb:.1f} MB vs baseline {base['peak_mb']:.1f} MB")
+    return regressions
+
+
+def results_document(results: dict[str, StageResult], rows: int, seed: int) -> dict:
+    return {
+        "rows": rows,
+        "seed": seed,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "stages": {
+            name: {
+                "seconds": round(r.seconds, 6),
+                "cpu_seconds": round(r.cpu_seconds, 6),
+                "throughput": round(r.throughput, 1),
+                "unit": r.unit,
+                "peak_mb": round(r.peak_mb, 3),
+            }
+            for name, r in results.items()
+        },
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="Gene_Analysis.benchmark", description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Rows in the synthetic genome.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic genome.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage; the best is kept.")
+    parser.add_argument("--workdir", default=None, help="Where to keep the synthetic genome and its cache.")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="Baseline JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown/memory growth as a fraction of the baseline.")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--output", default=None, help="Optional path for the results JSON.")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    workdir = Path(args.workdir or Path(tempfile.gettempdir()) / "gene_analysis_bench")
+    workdir.mkdir(parents=True, exist_ok=True)
+    genome = workdir / f"genome_{args.rows}_{args.seed}.txt"
+    if not genome.is_file():
+        write_synthetic_genome(genome, args.rows, panel_rsids(), args.seed)
+
+    results = run_benchmarks(genome, args.rows, args.repeat, workdir)
+    document = results_document(results, args.rows, args.seed)
+    print(f"{'Stage':<22}{'Wall (ms)':>11}{'CPU (ms)':>10}{'Throughput':>16}  {'Unit':<10}{'Peak MB':>9}")
+    for name, r in results.items():
+        print(f"{name:<22}{r.seconds * 1000:>11.2f}{r.cpu_seconds * 1000:>10.2f}"
+              f"{r.throughput:>16,.0f}  {r.unit:<10}{r.peak_mb:>9.2f}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2) + "\n")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(document, indent=2) + "\n")
+        print(f"\nBaseline written to {baseline_path}")
+        return 0
+    if not baseline_path.is_file():
+        print(f"\nNo baseline at {baseline_path}; run with --update-baseline to create one.")
+        return 0
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get("rows") != args.rows:
+        print(f"\nBaseline was recorded with {baseline.get('rows')} rows; not comparing.")
+        return 0
+    regressions = find_regressions(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    if not regressions:
+        print(f"\nNo regressions beyond {args.threshold:.0%} of {baseline_path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,555 @@
+"""Command line entrypoint for running every analyzer over one genome.
+
+``analyze`` streams the raw genome a single time, keeping only the union of
+the analyzer panels, and hands the same :class:`GenotypeStore` to the
+ancestry, disease, fitness and longevity scripts, whose rows are written to
+the combined JSON and Markdown report as they are produced.  ``analyze-batch`` scores a whole cohort at once,
+``rescore`` patches stored reports after the marker panels change and ``pgs``
+streams PGS Catalog scoring files against a genome.
+
+Modules that pull in numpy are imported inside the command handlers so that
+``--help`` and argument errors return without loading them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from Gene_Analysis.loader import genome_stem, stream_genome
+from Gene_Analysis.report import ReportWriter, default_report_paths, report_metadata, write_report
+
+if TYPE_CHECKING:
+    from Gene_Analysis.admixture import ReferencePanel
+    from Gene_Analysis.evidence import RefreshThread, Snapshot
+    from Gene_Analysis.profiling import Profiler
+    from Gene_Analysis.result_cache import ResultCache
+
+
+def cmd_analyze(args: argparse.Namespace) -> int:
+    genome_path = Path(args.genome_file)
+    if not genome_path.is_file():
+        print(f"Genome file not found: {genome_path}", file=sys.stderr)
+        return 1
+    if not args.profile_output:
+        return analyze(args, genome_path)
+
+    import cProfile
+
+    profile = cProfile.Profile()
+    status = profile.runcall(analyze, args, genome_path)
+    profile.dump_stats(args.profile_output)
+    print(f"cProfile stats: {args.profile_output}")
+    return status
+
+
+def analyze(args: argparse.Namespace, genome_path: Path) -> int:
+    """Load, analyze and report one genome, recording stages when profiling.
+
+    The profile lands in ``metadata["profile"]``.  Rows are written while
+    each analyzer runs, so there is no separate write stage; a refresh the
+    run waits for is joined before the report is closed and shows up as
+    ``snapshot_refresh``.
+    """
+    from Gene_Analysis.analyzers import REPO_ROOT, panel_rsids
+    from Gene_Analysis.evidence import EvidenceStore, parse_sources
+    from Gene_Analysis.panels import load_registry
+    from Gene_Analysis.profiling import Profiler
+    from Gene_Analysis.vcf import is_vcf
+
+    try:
+        sources = parse_sources(args.evidence_source)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    reference = None
+    if args.ancestry_reference:
+        from Gene_Analysis.admixture import ReferencePanel
+
+        try:
+            reference = ReferencePanel.load(args.ancestry_reference)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"Cannot read ancestry reference {args.ancestry_reference}: {exc}", file=sys.stderr)
+            return 1
+    profiler = Profiler(enabled=args.profile or bool(args.profile_output))
+    evidence = EvidenceStore(Path(args.cache_dir) / "evidence" if args.cache_dir else None)
+    refresh = None
+    with profiler.stage("snapshot") as stage:
+        snapshot = evidence.current()
+        failure = evidence.last_failure()
+        if failure is not None:
+            print(f"Warning: the evidence refresh at {failure['failed_at']} failed ({failure['error']}); "
+                  "serving the previous snapshot.", file=sys.stderr)
+        stage["refresh"] = None
+        if sources and not args.no_auto_update and (snapshot is None or snapshot.is_stale()):
+            # The report below is built from the current snapshot while the new one is fetched.
+            # Another run's refresh may be under way already; the lock makes this one skip it.
+            if args.wait_for_refresh:
+                refresh = evidence.refresh_in_background(sources, panel_rsids())
+                stage["refresh"] = "thread" if refresh is not None else "in_flight"
+            else:
+                process = evidence.refresh_detached(sources, panel_rsids())
+                stage["refresh"] = "detached" if process is not None else "in_flight"
+    panel_version = load_registry().digest
+    report = key = cache = None
+    if args.result_cache and not is_vcf(genome_path):
+        results_version = panel_version
+        if args.position_fallback:
+            from Gene_Analysis.genome_cache import file_digest
+            from Gene_Analysis.position_index import PANEL_LOCI_FILE
+
+            # Position matches change the results, so they get their own entries.
+            results_version = f"{panel_version}+loci-{file_digest(PANEL_LOCI_FILE)}"
+        if reference is not None:
+            results_version = f"{results_version}+ref-{reference.digest}"
+        with profiler.stage("result_cache") as stage:
+            report, key, cache = cached_report(genome_path, results_version, args.cache_dir)
+            stage["hit"] = report is not None
+    json_path, markdown_path = default_report_paths(REPO_ROOT / "analysis_reports")
+    json_path = Path(args.json_output) if args.json_output else json_path
+    markdown_path = Path(args.markdown_output) if args.markdown_output else markdown_path
+    if report is not None:
+        _stamp(report["metadata"], snapshot, refresh, profiler)
+        write_report(report, json_path, markdown_path, compact=args.compact)
+    else:
+        # The rows go to disk as the analyzers produce them; only the cache and the dataset need them all.
+        metadata = report_metadata(genome_path.resolve(), panel_version)
+        with ReportWriter(json_path, markdown_path, metadata, compact=args.compact) as writer:
+            rows = run_analysis(
+                genome_path, args, profiler, writer, reference,
+                keep_rows=cache is not None or bool(args.columnar_output),
+            )
+            _stamp(writer.metadata, snapshot, refresh, profiler)
+            summary = writer.close()
+        if rows is not None:
+            report = {
+                "metadata": {k: v for k, v in summary["metadata"].items() if k != "compact"},
+                "rows": rows,
+                "trait_summaries": summary["trait_summaries"],
+                "category_summaries": summary["category_summaries"],
+            }
+        if cache is not None:
+            try:
+                cache.put(key, report)
+            except OSError:
+                pass  # A read-only cache only costs a recompute next run.
+    if args.columnar_output:
+        from Gene_Analysis.columnar import append_reports
+
+        try:
+            append_reports(args.columnar_output, [(genome_stem(genome_path), report)], args.columnar_format)
+        except ImportError as exc:
+            print(exc, file=sys.stderr)
+            return 1
+    print(f"\nJSON report: {json_path}")
+    print(f"Markdown report: {markdown_path}")
+    if profiler.enabled:
+        print(f"\n{profiler.render()}")
+    if refresh is not None and refresh.error is not None:
+        print(f"Evidence refresh failed: {type(refresh.error).__name__}: {refresh.error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cached_report(
+    genome_path: Path,
+    panel_version: str,
+    cache_dir: str | None,
+) -> tuple[dict | None, str, ResultCache]:
+    """Look ``genome_path`` up in the result cache; return ``(report or None, key, cache)``."""
+    from Gene_Analysis.genome_cache import file_digest
+    from Gene_Analysis.result_cache import ResultCache
+
+    cache = ResultCache(cache_dir)
+    key = cache.key(file_digest(genome_path), panel_version)
+    return cache.get(key, genome_path.resolve()), key, cache
+
+
+def _stamp(
+    metadata: dict,
+    snapshot: Snapshot | None,
+    refresh: RefreshThread | None,
+    profiler: Profiler,
+) -> None:
+    """Add the run's evidence snapshot and profile to a report's ``metadata``.
+
+    A ``refresh`` the run waits for is joined first, so its wait is part of the profile.
+    """
+    if snapshot is not None:
+        # No score reads the evidence records, so the snapshot stamps the report but stays out of the cache key.
+        metadata.update(snapshot.metadata())
+    if refresh is not None:
+        print("\nWaiting for the evidence snapshot refresh...")
+        with profiler.stage("snapshot_refresh") as stage:
+            refresh.join()
+            stage["failed"] = refresh.error is not None
+    if profiler.enabled:
+        metadata["profile"] = profiler.summary()
+
+
+def run_analysis(
+    genome_path: Path,
+    args: argparse.Namespace,
+    profiler: Profiler,
+    writer: ReportWriter,
+    reference: ReferencePanel | None = None,
+    *,
+    keep_rows: bool = False,
+) -> list[dict] | None:
+    """Load the genome and stream every analyzer's rows into ``writer``.
+
+    Of each row only the fields the score intervals read are held until the
+    end, unless ``keep_rows`` asks for the rows themselves, which are then
+    returned.  The intervals and uncertainty settings are handed to
+    ``writer`` for its summaries.  With a ``reference``, its markers are
+    loaded alongside the panels and the fitted admixture proportions land in
+    ``metadata["admixture"]``.
+    """
+    from Gene_Analysis.analyzers import analyzer_rows, panel_rsids
+    from Gene_Analysis.genome_cache import load_cached_genome
+    from Gene_Analysis.uncertainty import INTERVAL_FIELDS, score_intervals, settings, trait_intervals
+    from Gene_Analysis.vcf import is_vcf, load_vcf
+
+    rsids = panel_rsids()
+    wanted = rsids | set(reference.rsids) if reference is not None else rsids
+    vcf = is_vcf(genome_path)
+    fallback = args.position_fallback and not vcf
+    with profiler.stage("load") as stage:
+        if fallback:
+            from Gene_Analysis.position_index import cached_with_fallback, stream_with_fallback
+        if vcf:
+            # Every marker is found by position through the file's index; too large to cache.
+            store = load_vcf(genome_path, wanted, cache_dir=args.cache_dir, sample=args.vcf_sample, stats=stage)
+            stage["source"] = "vcf"
+        elif args.genome_cache:
+            load = cached_with_fallback if fallback else load_cached_genome
+            store = load(genome_path, wanted, cache_dir=args.cache_dir)
+            stage["source"] = "genome_cache"
+        else:
+            load = stream_with_fallback if fallback else stream_genome
+            store = load(genome_path, wanted, stats=stage)
+            stage["source"] = "text"
+        stage["markers_requested"] = len(rsids)
+        stage["markers_found"] = len(store.lookup_many(rsids))
+        if fallback:
+            stage["markers_found_by_position"] = len(store.resolved)
+    rows = [] if keep_rows else None
+    weighted = []
+    for row in analyzer_rows(store, profiler):
+        writer.add(row)
+        if row["weight"] is not None:
+            weighted.append({field: row[field] for field in INTERVAL_FIELDS})
+        if rows is not None:
+            rows.append(row)
+    with profiler.stage("report") as stage:
+        writer.score_intervals = score_intervals(trait_intervals(weighted))
+        writer.metadata["uncertainty"] = settings()
+        stage["rows"] = writer.rows
+    if reference is not None:
+        from Gene_Analysis.admixture import admix
+
+        with profiler.stage("admixture") as stage:
+            admixture = admix(reference, store)
+            writer.metadata["admixture"] = admixture.to_dict()
+            stage["markers_used"] = admixture.markers_used
+            stage["iterations"] = admixture.iterations
+    return rows
+
+
+def cmd_analyze_batch(args: argparse.Namespace) -> int:
+    source = Path(args.source)
+    if not source.exists():
+        print(f"Batch source not found: {source}", file=sys.stderr)
+        return 1
+    from Gene_Analysis.analyzers import REPO_ROOT
+    from Gene_Analysis.batch import SUMMARY_FILE, ReportOutput, run_batch
+    from Gene_Analysis.evidence import EvidenceStore
+    from Gene_Analysis.genome_cache import load_cached_genome
+    from Gene_Analysis.result_cache import ResultCache
+
+    if args.genome_cache:
+        load = partial(load_cached_genome, cache_dir=args.cache_dir)
+    else:
+        load = stream_genome
+    output_dir = Path(args.output_dir) if args.output_dir else REPO_ROOT / "analysis_reports" / "batch"
+    workers = args.workers or os.cpu_count() or 1
+    results_cache = ResultCache(args.cache_dir) if args.result_cache else None
+    output = ReportOutput(
+        args.compact,
+        Path(args.columnar_output) if args.columnar_output else None,
+        args.columnar_format,
+    )
+    reference = None
+    if args.ancestry_reference:
+        from Gene_Analysis.admixture import ReferencePanel
+
+        try:
+            reference = ReferencePanel.load(args.ancestry_reference)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"Cannot read ancestry reference {args.ancestry_reference}: {exc}", file=sys.stderr)
+            return 1
+    snapshot = EvidenceStore(Path(args.cache_dir) / "evidence" if args.cache_dir else None).current()
+    outcomes = run_batch(
+        source,
+        output_dir,
+        load,
+        workers=workers,
+        results_cache=results_cache,
+        output=output,
+        reference=reference,
+        snapshot=snapshot,
+    )
+    failed = [o for o in outcomes if o.error is not None]
+    for outcome in failed:
+        print(f"Failed {outcome.sample_id} ({outcome.input_file}): {outcome.error}", file=sys.stderr)
+    print(f"\nAnalyzed {len(outcomes) - len(failed)}/{len(outcomes)} samples")
+    print(f"Cohort summary: {output_dir / SUMMARY_FILE}")
+    return 1 if failed else 0
+
+
+def cmd_cache(args: argparse.Namespace) -> int:
+    genome_path = Path(args.genome_file)
+    if not genome_path.is_file():
+        print(f"Genome file not found: {genome_path}", file=sys.stderr)
+        return 1
+    from Gene_Analysis.genome_cache import build_cache
+
+    cache = build_cache(genome_path, args.cache_dir)
+    print(f"Cached {len(cache)} markers in {cache.directory}")
+    return 0
+
+
+def cmd_pgs(args: argparse.Namespace) -> int:
+    genome_path = Path(args.genome_file)
+    if not genome_path.is_file():
+        print(f"Genome file not found: {genome_path}", file=sys.stderr)
+        return 1
+    import json
+
+    from Gene_Analysis.genome_cache import open_cache
+    from Gene_Analysis.pgs import GenomeIndex, score_pgs
+
+    index = GenomeIndex.from_cache(open_cache(genome_path, args.cache_dir))
+    results = []
+    for scoring_file in map(Path, args.scoring_files):
+        try:
+            result = score_pgs(scoring_file, index, match=args.match, chunk_size=args.chunk_size)
+        except (OSError, ValueError) as exc:
+            print(f"Failed {scoring_file}: {exc}", file=sys.stderr)
+            return 1
+        print(
+            f"{result.pgs_id or scoring_file.name}: score {result.score:.6g}, "
+            f"{result.variants_matched}/{result.variants_total} variants matched "
+            f"({result.coverage:.1%}; {result.matched_by_position} by position)"
+        )
+        results.append({"scoring_file": str(scoring_file), **result.to_dict()})
+    if args.json_output:
+        Path(args.json_output).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    return 0
+
+
+def cmd_rescore(args: argparse.Namespace) -> int:
+    from Gene_Analysis.rescore import rescore_file
+
+    paths = []
+    for report in map(Path, args.reports):
+        if report.is_dir():
+            paths.extend(sorted(report.glob("*.json")))
+        elif report.is_file():
+            paths.append(report)
+        else:
+            print(f"Report not found: {report}", file=sys.stderr)
+            return 1
+    load = None
+    if args.genome:
+        load = partial(stream_genome, Path(args.genome))
+    failed = 0
+    for path in paths:
+        try:
+            stats = rescore_file(path, load=load)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"Failed {path}: {exc}", file=sys.stderr)
+            failed += 1
+            continue
+        if stats is None:
+            print(f"{path}: up to date")
+        else:
+            print(
+                f"{path}: {stats['rows_rescored']} re-scored, {stats['rows_added']} added, "
+                f"{stats['rows_removed']} removed, {stats['rows_kept']} kept"
+            )
+    return 1 if failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="Gene_Analysis", description="Genome analysis toolkit.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    analyze = subparsers.add_parser("analyze", help="Run every analyzer over one genome file.")
+    analyze.add_argument(
+        "genome_file",
+        help="Path to a raw genome file (optionally .gz, .bz2 or .zip) or a VCF, bgzipped or plain.",
+    )
+    analyze.add_argument(
+        "--no-auto-update",
+        action="store_true",
+        help="Do not refresh a missing or stale evidence snapshot from the --evidence-source files.",
+    )
+    analyze.add_argument(
+        "--wait-for-refresh",
+        action="store_true",
+        help="Refresh the evidence snapshot in this process and wait for it after writing the report.",
+    )
+    analyze.add_argument(
+        "--evidence-source",
+        action="append",
+        default=[],
+        metavar="NAME=PATH",
+        help="Evidence source backed by a JSON Lines file; repeat for each source.",
+    )
+    analyze.add_argument("--json-output", default=None, help="Optional explicit JSON output path.")
+    analyze.add_argument("--markdown-output", default=None, help="Optional explicit Markdown output path.")
+    analyze.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write JSON rows as lists with shared lookup tables for repeated strings.",
+    )
+    analyze.add_argument(
+        "--columnar-output",
+        default=None,
+        help="Also append the report tables to this Parquet/Arrow dataset directory (needs pyarrow).",
+    )
+    analyze.add_argument(
+        "--columnar-format",
+        choices=("parquet", "arrow"),
+        default="parquet",
+        help="File format of the --columnar-output dataset.",
+    )
+    analyze.add_argument(
+        "--genome-cache",
+        action="store_true",
+        help="Load the genome through its binary cache, building it on first use.",
+    )
+    analyze.add_argument(
+        "--result-cache",
+        action="store_true",
+        help="Reuse the stored results of an earlier run over the same genome and panels.",
+    )
+    analyze.add_argument(
+        "--position-fallback",
+        action="store_true",
+        help="Find panel markers missing by rsid at their GRCh37 chromosome:position instead.",
+    )
+    analyze.add_argument(
+        "--vcf-sample",
+        default=None,
+        help="Sample column to read from a multi-sample VCF (default: the first).",
+    )
+    analyze.add_argument(
+        "--ancestry-reference",
+        default=None,
+        help="Fit admixture proportions against this allele-frequency table (.tsv or .npz).",
+    )
+    analyze.add_argument("--cache-dir", default=None, help="Genome and result cache directory.")
+    analyze.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record wall/CPU time, peak RSS and counts per stage in the report metadata.",
+    )
+    analyze.add_argument(
+        "--profile-output",
+        default=None,
+        help="Also write a cProfile/pstats dump of the run to this path (implies --profile).",
+    )
+    analyze.set_defaults(handler=cmd_analyze)
+
+    batch = subparsers.add_parser("analyze-batch", help="Score every genome in a directory or manifest.")
+    batch.add_argument(
+        "source",
+        help="Directory of raw genome files, or a manifest with one 'path' or 'sample_id<TAB>path' per line.",
+    )
+    batch.add_argument("--output-dir", default=None, help="Directory for per-sample reports and the cohort summary.")
+    batch.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write JSON rows as lists with shared lookup tables for repeated strings.",
+    )
+    batch.add_argument(
+        "--columnar-output",
+        default=None,
+        help="Also append the report tables to this Parquet/Arrow dataset directory (needs pyarrow).",
+    )
+    batch.add_argument(
+        "--columnar-format",
+        choices=("parquet", "arrow"),
+        default="parquet",
+        help="File format of the --columnar-output dataset.",
+    )
+    batch.add_argument(
+        "--genome-cache",
+        action="store_true",
+        help="Load each genome through its binary cache, building it on first use.",
+    )
+    batch.add_argument(
+        "--result-cache",
+        action="store_true",
+        help="Reuse stored results for genomes already analyzed against the same panels.",
+    )
+    batch.add_argument(
+        "--ancestry-reference",
+        default=None,
+        help="Fit admixture proportions against this allele-frequency table, shared by every sample.",
+    )
+    batch.add_argument("--cache-dir", default=None, help="Genome and result cache directory.")
+    batch.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes to spread samples over (0 uses every CPU core).",
+    )
+    batch.set_defaults(handler=cmd_analyze_batch)
+
+    rescore = subparsers.add_parser(
+        "rescore",
+        help="Update stored JSON reports in place after the marker panels change.",
+    )
+    rescore.add_argument("reports", nargs="+", help="Report JSON files or directories of them.")
+    rescore.add_argument(
+        "--genome",
+        default=None,
+        help="Raw genome to read newly added markers from (defaults to each report's input_file).",
+    )
+    rescore.set_defaults(handler=cmd_rescore)
+
+    pgs = subparsers.add_parser("pgs", help="Score one genome against PGS Catalog scoring files.")
+    pgs.add_argument("genome_file", help="Path to 23andMe/raw genome text file.")
+    pgs.add_argument("scoring_files", nargs="+", help="PGS Catalog scoring files (.txt or .txt.gz).")
+    pgs.add_argument(
+        "--match",
+        choices=("rsid", "position", "both"),
+        default="both",
+        help="Join variants by rsid, by chromosome:position, or by rsid with position as the fallback.",
+    )
+    pgs.add_argument("--chunk-size", type=int, default=100_000, help="Scoring-file rows read at a time.")
+    pgs.add_argument("--json-output", default=None, help="Also write the scores and coverage as JSON.")
+    pgs.add_argument("--cache-dir", default=None, help="Genome cache directory.")
+    pgs.set_defaults(handler=cmd_pgs)
+
+    cache = subparsers.add_parser("cache", help="Convert a raw genome file into its binary cache.")
+    cache.add_argument("genome_file", help="Path to 23andMe/raw genome text file.")
+    cache.add_argument("--cache-dir", default=None, help="Genome cache directory.")
+    cache.set_defaults(handler=cmd_cache)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return int(args.handler(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,138 @@
+"""Columnar Parquet / Arrow IPC copies of the report tables.
+
+Loading a cohort from per-sample JSON means parsing every ``rows`` list.
+:func:`append_reports` instead appends the ``rows``, ``trait_summaries``
+and ``category_summaries`` of any number of reports to a dataset directory
+with one sub-dataset per table::
+
+    <root>/rows/category=disease/part-<uuid>-0.parquet
+    <root>/trait_summaries/category=fitness/part-<uuid>-0.parquet
+    ...
+
+Every record carries its ``sample_id``.  Strings that repeat from sample to
+sample (sample id, trait, rsid, genotype, allele, description) are
+dictionary-encoded, and tables are hive-partitioned by ``category``.  Each
+call writes new uniquely named files and never rewrites existing ones, so
+batch chunks and concurrent workers can append to the same dataset.
+:func:`read_table` scans one table back as a single Arrow table.
+
+pyarrow is optional and is only imported when columnar output is used.
+"""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+TABLES = ("rows", "trait_summaries", "category_summaries")
+# Output format -> (pyarrow.dataset format, file extension).
+FORMATS = {"parquet": ("parquet", "parquet"), "arrow": ("ipc", "arrow")}
+PARTITION = "category"
+
+# (column, type) per table; "dict" is a dictionary-encoded string.
+COLUMNS = {
+    "rows": [
+        ("sample_id", "dict"), ("category", "dict"), ("trait", "dict"), ("rsid", "dict"),
+        ("genotype", "dict"), ("risk_allele", "dict"), ("risk_allele_count", "int32"),
+        ("weight", "float64"), ("contribution", "float64"), ("description", "dict"),
+    ],
+    "trait_summaries": [
+        ("sample_id", "dict"), ("category", "dict"), ("trait", "dict"),
+        ("markers_total", "int32"), ("markers_found", "int32"), ("score", "float64"),
+    ],
+    "category_summaries": [
+        ("sample_id", "dict"), ("category", "dict"),
+        ("traits", "int32"), ("markers_total", "int32"), ("markers_found", "int32"),
+    ],
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise ImportError("Columnar output needs pyarrow: pip install pyarrow") from None
+    return pa, ds
+
+
+def schema(table: str) -> pa.Schema:
+    """Return the Arrow schema of ``table``."""
+    pa, _ = _pyarrow()
+    types = {
+        "dict": pa.dictionary(pa.int32(), pa.string()),
+        "int32": pa.int32(),
+        "float64": pa.float64(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS[table]])
+
+
+def report_tables(reports: Iterable[tuple[str, dict]]) -> dict[str, pa.Table]:
+    """Turn ``(sample_id, report)`` pairs into one Arrow table per report table."""
+    pa, _ = _pyarrow()
+    columns = {table: {name: [] for name, _ in COLUMNS[table]} for table in TABLES}
+    for sample_id, report in reports:
+        for table in TABLES:
+            target = columns[table]
+            for record in report[table]:
+                target["sample_id"].append(sample_id)
+                for name, values in target.items():
+                    if name != "sample_id":
+                        values.append(record.get(name))
+    tables = {}
+    for table in TABLES:
+        table_schema = schema(table)
+        tables[table] = pa.table(
+            [pa.array(columns[table][field.name], type=field.type) for field in table_schema],
+            schema=table_schema,
+        )
+    return tables
+
+
+def append_reports(
+    root: str | Path,
+    reports: Iterable[tuple[str, dict]],
+    fmt: str = "parquet",
+) -> list[Path]:
+    """Append ``(sample_id, report)`` pairs to the dataset at ``root``.
+
+    Returns the table directories written to.  ``fmt`` is ``"parquet"``
+    or ``"arrow"`` (Arrow IPC).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown columnar format {fmt!r}; choose from {', '.join(FORMATS)}")
+    pa, ds = _pyarrow()
+    tables = report_tables(reports)
+    part = uuid.uuid4().hex
+    dataset_format, extension = FORMATS[fmt]
+    written = []
+    for name, table in tables.items():
+        if not table.num_rows:
+            continue
+        directory = Path(root) / name
+        ds.write_dataset(
+            table,
+            directory,
+            format=dataset_format,
+            partitioning=ds.partitioning(pa.schema([table.schema.field(PARTITION)]), flavor="hive"),
+            basename_template=f"part-{part}-{{i}}.{extension}",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        written.append(directory)
+    return written
+
+
+def read_table(root: str | Path, table: str, fmt: str = "parquet", filter=None) -> pa.Table:
+    """Scan ``table`` of the dataset at ``root``, optionally with a pyarrow ``filter``."""
+    _, ds = _pyarrow()
+    dataset = ds.dataset(
+        Path(root) / table,
+        format=FORMATS[fmt][0],
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+    )
+    return dataset.to_table(filter=filter)
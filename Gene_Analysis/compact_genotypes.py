@@ -0,0 +1,208 @@
+"""Memory-compact genotype container.
+
+A ``{rsid: genotype}`` dictionary of Python strings costs about 200 bytes per
+SNP.  :class:`CompactGenotypes` keeps the same mapping in two NumPy arrays:
+
+* ``ids``    int64, sorted -- ``rs123`` as ``123`` and ``i456`` as ``-456``
+  (see :func:`~Gene_Analysis.genome_cache.encode_rsids`)
+* ``codes``  uint8 genotype code, one byte per SNP:
+
+  ======  ==========================================================
+  bits    meaning
+  ======  ==========================================================
+  0-1     first allele (A=0, C=1, G=2, T=3)
+  2-3     second allele
+  4-5     kind: 0 two alleles, 1 one allele (haploid calls), 2 no call
+          (``--``), 3 anything else (kept in a side table)
+  ======  ==========================================================
+
+IDs that are neither ``rs`` nor ``i`` numbered and genotypes outside the
+four bases (``DI``, ``II``, ...) are rare, so they live in small side
+dictionaries.  That is 9 bytes per SNP instead of ~200.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping
+
+import numpy as np
+
+from Gene_Analysis.genome_cache import UNENCODABLE, decode_rsid, encode_rsids
+from Gene_Analysis.prs import genotype_array, genotype_calls
+
+BASES = "ACGT"
+PAIR, SINGLE, NO_CALL, OTHER = 0, 1, 2, 3
+
+# Byte value -> base code (0-3), 255 for anything else.
+_BASE_CODES = np.full(256, 255, dtype=np.uint8)
+for _code, _base in enumerate(BASES):
+    _BASE_CODES[ord(_base)] = _code
+
+
+def _build_tables() -> tuple[dict[str, int], list[str | None]]:
+    encode: dict[str, int] = {"--": NO_CALL << 4}
+    for a, first in enumerate(BASES):
+        encode[first] = SINGLE << 4 | a
+        for b, second in enumerate(BASES):
+            encode[first + second] = PAIR << 4 | b << 2 | a
+    decode: list[str | None] = [None] * 256
+    for genotype, code in encode.items():
+        decode[code] = genotype
+    return encode, decode
+
+
+ENCODE, DECODE = _build_tables()
+OTHER_CODE = OTHER << 4
+
+
+def encode_genotypes(genotypes: np.ndarray) -> np.ndarray:
+    """Encode an ``S2`` genotype array into uint8 codes (``OTHER_CODE`` if not representable).
+
+    Calls wider than two characters are encoded as no calls rather than cut
+    to their first two characters (see :func:`~Gene_Analysis.prs.genotype_array`).
+    """
+    genotypes = genotype_array(genotypes)
+    pairs = genotypes.view(np.uint8).reshape(-1, 2)
+    first, second = _BASE_CODES[pairs[:, 0]], _BASE_CODES[pairs[:, 1]]
+    codes = np.full(len(pairs), OTHER_CODE, dtype=np.uint8)
+    pair = (first < 4) & (second < 4)
+    codes[pair] = first[pair] | second[pair] << 2
+    single = (first < 4) & (pairs[:, 1] == 0)
+    codes[single] = SINGLE << 4 | first[single]
+    codes[(pairs[:, 0] == ord("-")) & (pairs[:, 1] == ord("-"))] = NO_CALL << 4
+    return codes.reshape(genotypes.shape)
+
+
+class CompactGenotypes(Mapping):
+    """Read-only ``{rsid: genotype}`` mapping backed by packed NumPy arrays.
+
+    Drop-in for :class:`~Gene_Analysis.genotype_store.GenotypeStore` wherever
+    only genotypes are looked up; iteration follows rsid order rather than
+    file order.  The first occurrence of a duplicated rsid wins.
+    """
+
+    __slots__ = ("ids", "codes", "other_genotypes", "other_ids")
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        codes: np.ndarray,
+        other_genotypes: dict[int, str] | None = None,
+        other_ids: dict[str, str] | None = None,
+    ) -> None:
+        self.ids = ids
+        self.codes = codes
+        self.other_genotypes = other_genotypes or {}
+        self.other_ids = other_ids or {}
+
+    @classmethod
+    def from_arrays(cls, ids: np.ndarray, genotypes: np.ndarray) -> CompactGenotypes:
+        """Build from encoded rsids (see ``encode_rsids``) and an ``S2`` genotype array."""
+        ids = np.asarray(ids, dtype=np.int64)
+        genotypes = genotype_array(genotypes)
+        order = np.argsort(ids, kind="stable")
+        ids, genotypes = ids[order], genotypes[order]
+        first = np.ones(len(ids), dtype=bool)
+        first[1:] = ids[1:] != ids[:-1]
+        ids, genotypes = ids[first], genotypes[first]
+        codes = encode_genotypes(genotypes)
+        other = np.flatnonzero(codes == OTHER_CODE)
+        other_genotypes = {int(ids[i]): genotypes[i].decode("ascii", "replace") for i in other}
+        return cls(ids, codes, other_genotypes)
+
+    @classmethod
+    def from_columns(cls, rsids: Iterable[str], genotypes: Iterable[str]) -> CompactGenotypes:
+        """Build from parallel rsid and genotype string columns.
+
+        Calls wider than two characters are stored as no calls, as
+        :func:`encode_genotypes` encodes them.
+        """
+        rsids = list(rsids)
+        calls, codes = genotype_calls(genotypes)
+        ids = encode_rsids(rsids)
+        keep = ids != UNENCODABLE
+        other_ids: dict[str, str] = {}
+        for rsid, call, ok in zip(rsids, calls, keep.tolist()):
+            if not ok:
+                other_ids.setdefault(rsid, call)
+        store = cls.from_arrays(ids[keep], codes[keep])
+        store.other_ids = other_ids
+        return store
+
+    @classmethod
+    def from_mapping(cls, genotypes: Mapping[str, str]) -> CompactGenotypes:
+        """Pack any ``{rsid: genotype}`` mapping, e.g. a ``GenotypeStore``."""
+        return cls.from_columns(genotypes.keys(), genotypes.values())
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held, counting the side tables at dict-entry cost."""
+        side = sum(100 + len(g) for g in self.other_genotypes.values())
+        side += sum(150 + len(r) + len(g) for r, g in self.other_ids.items())
+        return self.ids.nbytes + self.codes.nbytes + side
+
+    def _row(self, code: int) -> int:
+        row = int(np.searchsorted(self.ids, code))
+        if row < len(self.ids) and self.ids[row] == code:
+            return row
+        return -1
+
+    def _decode(self, row: int) -> str:
+        genotype = DECODE[self.codes[row]]
+        return genotype if genotype is not None else self.other_genotypes[int(self.ids[row])]
+
+    def __getitem__(self, rsid: str) -> str:
+        if rsid in self.other_ids:
+            return self.other_ids[rsid]
+        code = int(encode_rsids([rsid])[0])
+        row = self._row(code) if code != UNENCODABLE else -1
+        if row < 0:
+            raise KeyError(rsid)
+        return self._decode(row)
+
+    def __contains__(self, rsid: object) -> bool:
+        try:
+            self[rsid]
+        except (KeyError, TypeError, AttributeError):
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        for code in self.ids.tolist():
+            yield decode_rsid(code)
+        yield from self.other_ids
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.other_ids)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} markers, {self.nbytes} bytes)"
+
+    def lookup_codes(self, rsids: Iterable[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(codes, found)`` arrays for ``rsids`` in one vectorized probe.
+
+        Missing rsids get code 0 and ``found`` False; rsids kept in the side
+        tables are reported as ``OTHER_CODE``.
+        """
+        rsids = list(rsids)
+        wanted = encode_rsids(rsids)
+        codes = np.zeros(len(wanted), dtype=np.uint8)
+        found = np.zeros(len(wanted), dtype=bool)
+        if len(self.ids):
+            rows = np.searchsorted(self.ids, wanted).clip(max=len(self.ids) - 1)
+            found = (self.ids[rows] == wanted) & (wanted != UNENCODABLE)
+            codes[found] = self.codes[rows[found]]
+        for i, rsid in enumerate(rsids):
+            if rsid in self.other_ids:
+                codes[i], found[i] = OTHER_CODE, True
+        return codes, found
+
+    def lookup_many(self, rsids: Iterable[str]) -> dict[str, str]:
+        """Return ``{rsid: genotype}`` for every requested rsid that was typed."""
+        genotypes = {}
+        for rsid in rsids:
+            try:
+                genotypes[rsid] = self[rsid]
+            except KeyError:
+                continue
+        return genotypes
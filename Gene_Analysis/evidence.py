@@ -0,0 +1,509 @@
+"""Versioned evidence snapshots and their background refresh.
+
+An evidence snapshot holds, for every panel rsid, the records each upstream
+source (ClinVar, GWAS Catalog, PGS Catalog, dbSNP, gnomAD, ...) returned
+for it.  Snapshots are immutable directories under
+``<cache_dir>/evidence/snapshots/<snapshot_id>/`` and the ``CURRENT`` file
+names the one being served; reports record its id and age in their
+metadata.
+
+:meth:`EvidenceStore.refresh` builds a new snapshot with asyncio:
+
+* sources are pluggable :class:`EvidenceSource` adapters; :class:`FileSource`
+  is a local JSON Lines stand-in for tests and offline mirrors;
+* rsids are fetched in pages, at most ``concurrency`` pages per source at a
+  time;
+* every finished page is written to a staging directory of its own under
+  the job's folder (sources, rsids, page size); a later refresh of the same
+  job hard-links the pages an interrupted one left behind instead of
+  fetching them again, and concurrent refreshes never share a directory;
+* the finished snapshot is moved into place and ``CURRENT`` is switched
+  with :func:`os.replace`, so readers see either the old snapshot or the
+  new one and keep using the old one for the whole refresh.
+
+A refresh that fails is recorded in ``REFRESH_FAILED`` until the next one
+succeeds (:meth:`EvidenceStore.last_failure`).  While a refresh runs, the
+``REFRESH_RUNNING`` lock file names its process, and starting another one
+for the same directory is skipped (or raises :class:`RefreshInFlight`); a
+lock whose process is gone is taken over.
+:meth:`EvidenceStore.refresh_detached` runs a refresh in a separate process
+(``python -m Gene_Analysis.evidence``) that outlives the command which
+started it, and :meth:`EvidenceStore.refresh_in_background` runs one on an
+event loop thread of this process.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import NamedTuple, Protocol
+
+from Gene_Analysis.genome_cache import default_cache_dir
+
+DEFAULT_STALE_AFTER_DAYS = 30
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_CONCURRENCY = 4
+FAILURE_FILE = "REFRESH_FAILED"
+LOCK_FILE = "REFRESH_RUNNING"
+# Staging folders untouched for this long belong to refreshes that died and are removed.
+ABANDONED_AFTER_SECONDS = 24 * 3600
+PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+
+
+class EvidenceSource(Protocol):
+    """Adapter for one upstream evidence source."""
+
+    name: str
+
+    async def fetch(self, rsids: list[str]) -> dict[str, dict]:
+        """Return the source's record for each of ``rsids`` it knows about."""
+
+
+class FileSource:
+    """Evidence source backed by a JSON Lines file of ``{"rsid": ..., ...}`` records."""
+
+    def __init__(self, name: str, path: str | Path) -> None:
+        self.name = name
+        self.path = Path(path)
+        self._records: dict[str, dict] | None = None
+
+    def __repr__(self) -> str:
+        return f"FileSource({self.name!r}, {str(self.path)!r})"
+
+    def _load(self) -> dict[str, dict]:
+        records = {}
+        with open(self.path, encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["rsid"]] = record
+        return records
+
+    async def fetch(self, rsids: list[str]) -> dict[str, dict]:
+        if self._records is None:
+            self._records = await asyncio.to_thread(self._load)
+        return {rsid: self._records[rsid] for rsid in rsids if rsid in self._records}
+
+
+class Snapshot(NamedTuple):
+    """One immutable evidence snapshot on disk."""
+
+    snapshot_id: str
+    created_at: str
+    stale_after_days: int
+    sources: list[str]
+    directory: Path
+
+    def is_stale(self, now: datetime | None = None) -> bool:
+        created = datetime.fromisoformat(self.created_at)
+        return (now or datetime.now(timezone.utc)) - created > timedelta(days=self.stale_after_days)
+
+    def records(self, source: str) -> dict[str, dict]:
+        """Return ``{rsid: record}`` fetched from ``source``."""
+        return json.loads((self.directory / f"{_slug(source)}.json").read_text(encoding="utf-8"))
+
+    def metadata(self) -> dict:
+        """Return the ``snapshot_*`` fields recorded in report metadata."""
+        return {
+            "snapshot_id": self.snapshot_id,
+            "snapshot_created_at": self.created_at,
+            "snapshot_stale_after_days": self.stale_after_days,
+        }
+
+
+class RefreshInFlight(RuntimeError):
+    """Another process is already refreshing the evidence directory."""
+
+
+def _slug(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name.lower())
+
+
+def _write_json(path: Path, value) -> None:
+    """Write ``value`` to ``path`` atomically."""
+    fd, staging = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(value, handle, ensure_ascii=False)
+        os.replace(staging, path)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+class EvidenceStore:
+    """The snapshots under one evidence directory and the pointer to the current one."""
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        stale_after_days: int = DEFAULT_STALE_AFTER_DAYS,
+    ) -> None:
+        self.directory = Path(directory or default_cache_dir() / "evidence")
+        self.stale_after_days = stale_after_days
+
+    def __repr__(self) -> str:
+        return f"EvidenceStore({str(self.directory)!r})"
+
+    def current(self) -> Snapshot | None:
+        """Return the snapshot being served, or ``None`` before the first refresh."""
+        try:
+            snapshot_id = (self.directory / "CURRENT").read_text(encoding="utf-8").strip()
+            directory = self.directory / "snapshots" / snapshot_id
+            manifest = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return Snapshot(
+            manifest["snapshot_id"],
+            manifest["created_at"],
+            manifest["stale_after_days"],
+            manifest["sources"],
+            directory,
+        )
+
+    def needs_refresh(self) -> bool:
+        snapshot = self.current()
+        return snapshot is None or snapshot.is_stale()
+
+    def last_failure(self) -> dict | None:
+        """Return ``{"failed_at", "error"}`` of the last refresh if it failed, else ``None``."""
+        try:
+            return json.loads((self.directory / FAILURE_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def refresh_holder(self) -> int | None:
+        """Return the process id of a live refresh of this directory, if one is running."""
+        lock = self.directory / LOCK_FILE
+        try:
+            pid = int(lock.read_text(encoding="ascii"))
+            abandoned = lock.stat().st_mtime < time.time() - ABANDONED_AFTER_SECONDS
+        except (OSError, ValueError):
+            return None
+        return pid if not abandoned and _alive(pid) else None
+
+    def _lock(self) -> bool:
+        """Take the refresh lock for this process; ``False`` if another live process holds it."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock = self.directory / LOCK_FILE
+        for _ in range(3):
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                holder = self.refresh_holder()
+                if holder == os.getpid():
+                    return True
+                if holder is not None:
+                    return False
+                # Its process died without unlocking: move the stale lock aside and retry.
+                stale = lock.with_name(f".{LOCK_FILE}.{uuid.uuid4().hex}.stale")
+                try:
+                    os.replace(lock, stale)
+                except FileNotFoundError:
+                    continue
+                stale.unlink(missing_ok=True)
+                continue
+            with os.fdopen(fd, "w", encoding="ascii") as handle:
+                handle.write(str(os.getpid()))
+            return True
+        return False
+
+    def _hand_lock(self, pid: int) -> None:
+        """Name ``pid`` as the holder of the lock this process took."""
+        staging = self.directory / f".{LOCK_FILE}.{uuid.uuid4().hex}.new"
+        staging.write_text(str(pid), encoding="ascii")
+        os.replace(staging, self.directory / LOCK_FILE)
+
+    def _unlock(self) -> None:
+        try:
+            if int((self.directory / LOCK_FILE).read_text(encoding="ascii")) == os.getpid():
+                os.remove(self.directory / LOCK_FILE)
+        except (OSError, ValueError):
+            pass
+
+    def _job(self, sources: list[EvidenceSource], rsids: list[str], page_size: int) -> Path:
+        job = hashlib.sha256(
+            json.dumps([[s.name for s in sources], rsids, page_size]).encode("utf-8")
+        ).hexdigest()[:16]
+        return self.directory / "staging" / job
+
+    async def _fetch_source(
+        self,
+        source: EvidenceSource,
+        pages: list[list[str]],
+        staging: Path,
+        concurrency: int,
+    ) -> int:
+        """Fetch the pages of ``source`` not yet in ``staging``; return how many were fetched."""
+        directory = staging / _slug(source.name)
+        directory.mkdir(parents=True, exist_ok=True)
+        limit = asyncio.Semaphore(concurrency)
+        todo = [i for i in range(len(pages)) if not _adopt_page(staging, directory / f"{i}.json")]
+
+        async def fetch(i: int) -> None:
+            async with limit:
+                records = await source.fetch(pages[i])
+            await asyncio.to_thread(_write_json, directory / f"{i}.json", records)
+
+        await asyncio.gather(*(fetch(i) for i in todo))
+        return len(todo)
+
+    async def refresh(
+        self,
+        sources: Iterable[EvidenceSource],
+        rsids: Iterable[str],
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> Snapshot:
+        """Fetch every source, then publish the result as the current snapshot.
+
+        A failure is recorded for :meth:`last_failure` and re-raised.  Raises
+        :class:`RefreshInFlight` if another process is refreshing already.
+        """
+        if not self._lock():
+            raise RefreshInFlight(f"process {self.refresh_holder()} is refreshing {self.directory}")
+        try:
+            return await self._refresh(sources, rsids, page_size, concurrency)
+        finally:
+            self._unlock()
+
+    async def _refresh(
+        self,
+        sources: Iterable[EvidenceSource],
+        rsids: Iterable[str],
+        page_size: int,
+        concurrency: int,
+    ) -> Snapshot:
+        sources = list(sources)
+        rsids = sorted(set(rsids))
+        pages = [rsids[i:i + page_size] for i in range(0, len(rsids), page_size)]
+        job = self._job(sources, rsids, page_size)
+        job.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=job))
+        try:
+            await asyncio.gather(*(self._fetch_source(s, pages, staging, concurrency) for s in sources))
+            snapshot = await asyncio.to_thread(self._publish, sources, len(pages), staging)
+        except Exception as exc:
+            _write_json(self.directory / FAILURE_FILE, {
+                "failed_at": datetime.now(timezone.utc).isoformat(),
+                "error": f"{type(exc).__name__}: {exc}",
+            })
+            raise
+        try:
+            os.remove(self.directory / FAILURE_FILE)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def _publish(self, sources: list[EvidenceSource], pages: int, staging: Path) -> Snapshot:
+        snapshot_id = str(uuid.uuid4())
+        snapshots = self.directory / "snapshots"
+        snapshots.mkdir(parents=True, exist_ok=True)
+        building = Path(tempfile.mkdtemp(prefix=f".{snapshot_id}.", dir=snapshots))
+        try:
+            for source in sources:
+                records = {}
+                for i in range(pages):
+                    page = staging / _slug(source.name) / f"{i}.json"
+                    records.update(json.loads(page.read_text(encoding="utf-8")))
+                _write_json(building / f"{_slug(source.name)}.json", records)
+            created_at = datetime.now(timezone.utc).isoformat()
+            _write_json(building / "manifest.json", {
+                "snapshot_id": snapshot_id,
+                "created_at": created_at,
+                "stale_after_days": self.stale_after_days,
+                "sources": [source.name for source in sources],
+            })
+            os.replace(building, snapshots / snapshot_id)
+        finally:
+            if building.exists():
+                shutil.rmtree(building)
+        previous = self.current()
+        pointer = self.directory / "CURRENT"
+        fd, staged = tempfile.mkstemp(prefix=".CURRENT.", dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(snapshot_id + "\n")
+        os.replace(staged, pointer)
+        _clean_job(staging)
+        if previous is not None:
+            # The previous snapshot stays for readers that loaded it before the swap.
+            self._prune(older_than=previous.created_at)
+        names = [source.name for source in sources]
+        return Snapshot(snapshot_id, created_at, self.stale_after_days, names, snapshots / snapshot_id)
+
+    def _prune(self, older_than: str) -> None:
+        """Remove snapshots created before ``older_than``; newer ones may be a concurrent refresh's."""
+        for directory in (self.directory / "snapshots").iterdir():
+            if directory.name.startswith("."):
+                continue
+            try:
+                manifest = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if datetime.fromisoformat(manifest["created_at"]) < datetime.fromisoformat(older_than):
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def refresh_in_background(
+        self,
+        sources: Iterable[EvidenceSource],
+        rsids: Iterable[str],
+        **options,
+    ) -> RefreshThread | None:
+        """Start :meth:`refresh` on a daemon thread with its own event loop.
+
+        A refresh cut short when the process exits resumes from its
+        finished pages next time.  Returns ``None`` without starting one if
+        another process is refreshing already.
+        """
+        if not self._lock():
+            return None
+        thread = RefreshThread(self, list(sources), list(rsids), options)
+        thread.start()
+        return thread
+
+    def refresh_detached(self, sources: Iterable[FileSource], rsids: Iterable[str]) -> subprocess.Popen | None:
+        """Start :meth:`refresh` in a separate process that keeps running after this one exits.
+
+        Its output goes to ``refresh.log`` in the evidence directory; a
+        failure shows up in :meth:`last_failure`.  The refresh lock is taken
+        here and handed to the new process, so concurrent callers start one
+        refresh between them; the others get ``None``.
+        """
+        if not self._lock():
+            return None
+        command = [
+            sys.executable, "-m", "Gene_Analysis.evidence", str(self.directory),
+            "--stale-after-days", str(self.stale_after_days),
+            *(f"{source.name}={source.path.resolve()}" for source in sources),
+        ]
+        path = os.pathsep.join(filter(None, [str(PACKAGE_ROOT), os.environ.get("PYTHONPATH")]))
+        try:
+            with open(self.directory / "refresh.log", "ab") as log:
+                process = subprocess.Popen(
+                    command,
+                    stdin=subprocess.PIPE,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    env={**os.environ, "PYTHONPATH": path},
+                    start_new_session=True,
+                )
+            self._hand_lock(process.pid)
+        except BaseException:
+            self._unlock()
+            raise
+        process.stdin.write("\n".join(rsids).encode("utf-8"))
+        process.stdin.close()
+        return process
+
+
+class RefreshThread(threading.Thread):
+    """Daemon thread running one :meth:`EvidenceStore.refresh`.
+
+    After :meth:`join`, ``snapshot`` holds the published snapshot, or
+    ``error`` the exception that stopped the refresh.
+    """
+
+    def __init__(self, store: EvidenceStore, sources: list, rsids: list[str], options: dict) -> None:
+        super().__init__(name="evidence-refresh", daemon=True)
+        self.store = store
+        self.sources = sources
+        self.rsids = rsids
+        self.options = options
+        self.snapshot: Snapshot | None = None
+        self.error: Exception | None = None
+
+    def run(self) -> None:
+        try:
+            self.snapshot = asyncio.run(self.store.refresh(self.sources, self.rsids, **self.options))
+        except Exception as exc:
+            self.error = exc
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Running under another user.
+    return True
+
+
+def _adopt_page(staging: Path, page: Path) -> bool:
+    """Link ``page`` from a sibling staging folder of the same job; return whether it is there now."""
+    if page.is_file():
+        return True
+    relative = page.relative_to(staging)
+    for sibling in staging.parent.iterdir():
+        if sibling == staging:
+            continue
+        try:
+            os.link(sibling / relative, page)
+            return True
+        except OSError:
+            continue  # Missing there, removed meanwhile, or no hard links on this file system.
+    return False
+
+
+def _clean_job(staging: Path) -> None:
+    """Remove a published refresh's staging folder and any its job's dead refreshes left behind."""
+    shutil.rmtree(staging, ignore_errors=True)
+    cutoff = time.time() - ABANDONED_AFTER_SECONDS
+    for sibling in staging.parent.iterdir():
+        try:
+            if sibling.stat().st_mtime < cutoff:
+                shutil.rmtree(sibling, ignore_errors=True)
+        except OSError:
+            pass
+    try:
+        staging.parent.rmdir()
+    except OSError:
+        pass  # Another refresh of the job is still running.
+
+
+def parse_sources(specs: Iterable[str]) -> list[FileSource]:
+    """Parse ``NAME=PATH`` command-line specs into file-backed sources."""
+    sources = []
+    for spec in specs:
+        name, sep, path = spec.partition("=")
+        if not sep or not name or not path:
+            raise ValueError(f"Evidence source must look like NAME=PATH, got {spec!r}")
+        sources.append(FileSource(name, path))
+    return sources
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run one refresh with the rsids read from stdin; what :meth:`EvidenceStore.refresh_detached` starts."""
+    parser = argparse.ArgumentParser(prog="Gene_Analysis.evidence", description="Refresh an evidence snapshot.")
+    parser.add_argument("directory", help="Evidence directory holding the snapshots.")
+    parser.add_argument("sources", nargs="+", metavar="NAME=PATH", help="File-backed evidence sources.")
+    parser.add_argument("--stale-after-days", type=int, default=DEFAULT_STALE_AFTER_DAYS)
+    args = parser.parse_args(argv)
+    store = EvidenceStore(args.directory, args.stale_after_days)
+    if store.refresh_holder() == os.getppid():
+        store._hand_lock(os.getpid())  # Taken for us by refresh_detached.
+    try:
+        snapshot = asyncio.run(store.refresh(parse_sources(args.sources), sys.stdin.read().split()))
+    except Exception as exc:
+        print(f"{datetime.now(timezone.utc).isoformat()} refresh failed: {type(exc).__name__}: {exc}")
+        return 1
+    print(f"{snapshot.created_at} published snapshot {snapshot.snapshot_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,220 @@
+"""Compact columnar cache of parsed raw genome files.
+
+Re-scoring a genome should not mean re-parsing its text file.  A cache entry
+stores four memory-mappable ``.npy`` columns sorted by rsid:
+
+* ``rsid``       int64  -- ``rs123`` is stored as ``123`` and ``i456`` as ``-456``
+* ``chromosome`` uint8  -- 1-22, then X=23, Y=24, XY=25, MT=26 (0 if unknown)
+* ``position``   uint32
+* ``genotype``   2-byte code (``S2``), e.g. ``b"AG"``, ``b"--"`` or ``b"A"``
+
+Entries live under ``<cache_dir>/v<version>/<sha256 of the source>/`` so editing
+or replacing a raw file always produces a new key.  IDs that are neither
+``rs`` nor ``i`` prefixed are not cached since no analyzer can look them up.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from Gene_Analysis.genotype_store import GenotypeStore
+from Gene_Analysis.loader import open_raw, sniff_format
+from Gene_Analysis.prs import genotype_array
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from Gene_Analysis.compact_genotypes import CompactGenotypes
+
+CACHE_VERSION = 2
+COLUMNS = ("rsid", "chromosome", "position", "genotype")
+UNENCODABLE = np.iinfo(np.int64).min
+
+CHROMOSOME_CODES = {str(n): n for n in range(1, 23)}
+CHROMOSOME_CODES.update({"X": 23, "Y": 24, "XY": 25, "MT": 26, "M": 26})
+CHROMOSOME_NAMES = {code: name for name, code in CHROMOSOME_CODES.items() if name != "M"}
+
+
+def file_digest(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of ``path``'s contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_rsids(rsids: Iterable[str]) -> np.ndarray:
+    """Encode ``rs``/``i`` identifiers as signed integers.
+
+    IDs in any other form become :data:`UNENCODABLE`.
+    """
+    encoded = []
+    for rsid in rsids:
+        if rsid.startswith("rs") and rsid[2:].isdigit():
+            encoded.append(int(rsid[2:]))
+        elif rsid.startswith("i") and rsid[1:].isdigit():
+            encoded.append(-int(rsid[1:]))
+        else:
+            encoded.append(UNENCODABLE)
+    return np.asarray(encoded, dtype=np.int64)
+
+
+def decode_rsid(code: int) -> str:
+    """Invert :func:`encode_rsids` for a single value."""
+    return f"rs{code}" if code > 0 else f"i{-code}"
+
+
+class GenomeCache:
+    """Read-only view over one memory-mapped cache entry."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.metadata = json.loads((self.directory / "metadata.json").read_text())
+        columns = {name: np.load(self.directory / f"{name}.npy", mmap_mode="r") for name in COLUMNS}
+        self.rsid = columns["rsid"]
+        self.chromosome = columns["chromosome"]
+        self.position = columns["position"]
+        self.genotype = columns["genotype"]
+
+    def __len__(self) -> int:
+        return len(self.rsid)
+
+    def _rows(self, rsids: Iterable[str]) -> tuple[list[str], np.ndarray]:
+        """Binary-search the sorted rsid column for each requested rsid."""
+        requested = list(dict.fromkeys(rsids))
+        if not requested or not len(self):
+            return [], np.empty(0, dtype=np.intp)
+        codes = encode_rsids(requested)
+        rows = np.searchsorted(self.rsid, codes).clip(max=len(self) - 1)
+        hit = self.rsid[rows] == codes
+        return [rsid for rsid, ok in zip(requested, hit) if ok], rows[hit]
+
+    def lookup_many(self, rsids: Iterable[str]) -> dict[str, str]:
+        """Return ``{rsid: genotype}`` for the requested rsids present in the cache."""
+        found, rows = self._rows(rsids)
+        return {rsid: code.decode("ascii") for rsid, code in zip(found, self.genotype[rows])}
+
+    def to_compact(self) -> CompactGenotypes:
+        """Return every genotype as a :class:`CompactGenotypes` without decoding strings."""
+        from Gene_Analysis.compact_genotypes import CompactGenotypes
+
+        return CompactGenotypes.from_arrays(self.rsid, self.genotype)
+
+    def to_store(self, rsids: Iterable[str] | None = None, *, with_loci: bool = False) -> GenotypeStore:
+        """Materialize a :class:`GenotypeStore` for ``rsids`` (all rows if ``None``)."""
+        if rsids is None:
+            rows = np.arange(len(self))
+            found = [decode_rsid(int(code)) for code in self.rsid]
+        else:
+            found, rows = self._rows(rsids)
+        genotypes = [code.decode("ascii") for code in self.genotype[rows]]
+        if not with_loci:
+            return GenotypeStore.from_columns(found, genotypes)
+        chromosomes = [CHROMOSOME_NAMES.get(int(code), "") for code in self.chromosome[rows]]
+        return GenotypeStore.from_columns(found, genotypes, chromosomes, self.position[rows].tolist())
+
+
+def _encode_frame(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    rsid = encode_rsids(df["rsid"])
+    keep = rsid != UNENCODABLE
+    df, rsid = df[keep], rsid[keep]
+    # Stable sort keeps the first occurrence of a duplicated rsid first.
+    order = np.argsort(rsid, kind="stable")
+    rsid = rsid[order]
+    first = np.ones(len(rsid), dtype=bool)
+    first[1:] = rsid[1:] != rsid[:-1]
+    order, rsid = order[first], rsid[first]
+    df = df.iloc[order]
+    return {
+        "rsid": rsid,
+        "chromosome": df["chromosome"].map(CHROMOSOME_CODES).fillna(0).to_numpy(dtype=np.uint8),
+        "position": df["position"].to_numpy(dtype=np.uint32),
+        "genotype": genotype_array(df["genotype"].to_numpy()),
+    }
+
+
+def default_cache_dir() -> Path:
+    """Return ``$GENE_ANALYSIS_CACHE``, or ``~/.cache/gene_analysis`` when it is unset.
+
+    It is read on every call, so the variable can be set after import.
+    """
+    return Path(os.environ.get("GENE_ANALYSIS_CACHE", Path.home() / ".cache" / "gene_analysis"))
+
+
+def cache_path(source: str | Path, cache_dir: str | Path | None = None, digest: str | None = None) -> Path:
+    """Return the entry directory that ``source`` maps to."""
+    digest = digest or file_digest(source)
+    return Path(cache_dir or default_cache_dir()) / f"v{CACHE_VERSION}" / digest
+
+
+def build_cache(
+    source: str | Path,
+    cache_dir: str | Path | None = None,
+    digest: str | None = None,
+) -> GenomeCache:
+    """Parse ``source`` and publish its cache entry atomically.
+
+    An entry that already exists (for instance one a concurrent builder
+    published first) is kept as is and returned.
+    """
+    digest = digest or file_digest(source)
+    target = cache_path(source, cache_dir, digest)
+    raw_format = sniff_format(source)
+    with open_raw(source, "rb") as handle:
+        # Only building an entry parses text (with pandas); reads are numpy-only.
+        df = raw_format.read_frame(handle, True)
+    columns = _encode_frame(df)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{digest}.", dir=target.parent))
+    try:
+        for name in COLUMNS:
+            np.save(staging / f"{name}.npy", columns[name])
+        (staging / "metadata.json").write_text(json.dumps({
+            "version": CACHE_VERSION,
+            "sha256": digest,
+            "source": str(Path(source).resolve()),
+            "rows": int(len(columns["rsid"])),
+            "skipped": int(len(df) - len(columns["rsid"])),
+            "format": raw_format.name,
+        }, indent=2))
+        try:
+            os.replace(staging, target)
+        except OSError:
+            # Entries are content-addressed, so a complete entry that another
+            # builder published first holds the same columns; keep it.
+            if not (target / "metadata.json").is_file():
+                raise
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging)
+    return GenomeCache(target)
+
+
+def open_cache(source: str | Path, cache_dir: str | Path | None = None) -> GenomeCache:
+    """Return the cache entry for ``source``, building it on first use."""
+    digest = file_digest(source)
+    target = cache_path(source, cache_dir, digest)
+    if (target / "metadata.json").is_file():
+        return GenomeCache(target)
+    return build_cache(source, cache_dir, digest)
+
+
+def load_cached_genome(
+    source: str | Path,
+    rsids: Iterable[str] | None = None,
+    *,
+    cache_dir: str | Path | None = None,
+    with_loci: bool = False,
+) -> GenotypeStore:
+    """Load ``source`` through its binary cache, keeping only ``rsids`` if given."""
+    return open_cache(source, cache_dir).to_store(rsids, with_loci=with_loci)
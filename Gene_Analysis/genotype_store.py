@@ -0,0 +1,103 @@
+"""Hash-indexed genotype lookups shared by every analyzer.
+
+The analyzers used to scan the whole genome DataFrame with
+``df[df['rsid'] == rsid]`` once per marker.  ``GenotypeStore`` is built once
+per genome and answers each lookup with a dictionary probe instead.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping
+from typing import NamedTuple
+
+
+class GenotypeRecord(NamedTuple):
+    """A single genotyped marker from a raw genome file."""
+
+    rsid: str
+    chromosome: str
+    position: int
+    genotype: str
+
+
+class GenotypeStore(Mapping):
+    """Read-only mapping of rsid to genotype with locus information.
+
+    Behaves like ``Dict[str, str]`` so it can be passed anywhere a plain
+    genotype dictionary was used before.  When a raw file lists an rsid more
+    than once the first occurrence wins, matching the old ``.iloc[0]`` lookup.
+    """
+
+    def __init__(self, records: Iterable[tuple[str, str, int, str]] = ()) -> None:
+        self._genotypes: dict[str, str] = {}
+        self._loci: dict[str, tuple[str, int]] = {}
+        for rsid, chromosome, position, genotype in records:
+            if rsid in self._genotypes:
+                continue
+            self._genotypes[rsid] = genotype
+            self._loci[rsid] = (str(chromosome), int(position))
+
+    @classmethod
+    def from_columns(
+        cls,
+        rsids: Iterable[str],
+        genotypes: Iterable[str],
+        chromosomes: Iterable[str] | None = None,
+        positions: Iterable[int] | None = None,
+    ) -> GenotypeStore:
+        """Build a store from parallel column sequences.
+
+        ``chromosomes`` and ``positions`` are optional; analyzers that only
+        look markers up by rsid can skip them to save memory.
+        """
+        if chromosomes is None or positions is None:
+            store = cls()
+            for rsid, genotype in zip(rsids, genotypes):
+                store._genotypes.setdefault(rsid, genotype)
+            return store
+        return cls(zip(rsids, chromosomes, positions, genotypes))
+
+    @classmethod
+    def from_dataframe(cls, df) -> GenotypeStore:
+        """Build a store from a ``rsid/chromosome/position/genotype`` frame."""
+        if "chromosome" not in df or "position" not in df:
+            return cls.from_columns(df["rsid"], df["genotype"])
+        return cls.from_columns(df["rsid"], df["genotype"], df["chromosome"], df["position"])
+
+    @classmethod
+    def from_genotypes(cls, genotypes: Mapping[str, str]) -> GenotypeStore:
+        """Build a store from a plain ``{rsid: genotype}`` mapping without loci."""
+        store = cls()
+        store._genotypes = dict(genotypes)
+        return store
+
+    def __getitem__(self, rsid: str) -> str:
+        return self._genotypes[rsid]
+
+    def __contains__(self, rsid: object) -> bool:
+        return rsid in self._genotypes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._genotypes)
+
+    def __len__(self) -> int:
+        return len(self._genotypes)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} markers)"
+
+    def record(self, rsid: str) -> GenotypeRecord | None:
+        """Return the full record for ``rsid`` or ``None`` if it was not typed."""
+        genotype = self._genotypes.get(rsid)
+        if genotype is None:
+            return None
+        chromosome, position = self._loci.get(rsid, ("", 0))
+        return GenotypeRecord(rsid, chromosome, position, genotype)
+
+    def lookup_many(self, rsids: Iterable[str]) -> dict[str, str]:
+        """Return ``{rsid: genotype}`` for every requested rsid that was typed.
+
+        Missing rsids are omitted; the result keeps the order of ``rsids``.
+        """
+        genotypes = self._genotypes
+        return {rsid: genotypes[rsid] for rsid in rsids if rsid in genotypes}
@@ -0,0 +1,208 @@
+"""Parse a raw genome file once and share it across every analyzer.
+
+Each analysis script used to read ``Genome.txt`` on its own, so a full run
+parsed the same file once per module.  :func:`load_genome` reads it a single
+time into a :class:`GenotypeStore` that is handed to every analyzer.
+
+The analyzers only score a few hundred markers, so :func:`stream_genome`
+goes further and keeps just the lines for the requested panel rsids.
+
+Vendors ship raw data as ``.zip`` or ``.txt.gz``.  :func:`open_raw` sniffs
+gzip, bzip2 and zip archives by their magic bytes and decompresses them as a
+stream straight into the parser, without extracting to disk.  A zip's genome
+member is picked by :func:`genome_member`.  :func:`sniff_format` then reads
+the first few KB to tell the vendor layout (see :mod:`Gene_Analysis.raw_formats`).
+"""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import io
+import zipfile
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import IO, TYPE_CHECKING
+
+from Gene_Analysis.genotype_store import GenotypeStore
+from Gene_Analysis.raw_formats import FORMATS, SNIFF_BYTES, RawFormat, detect_format
+
+if TYPE_CHECKING:
+    from Gene_Analysis.compact_genotypes import CompactGenotypes
+
+DEFAULT_GENOME_FILE = "Genome.txt"
+COMPRESSION_MAGIC = {b"\x1f\x8b": "gzip", b"BZh": "bz2", b"PK\x03\x04": "zip"}
+COMPRESSED_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".zip": "zip"}
+# Archive members that are never the raw data file.
+IGNORED_MEMBERS = ("__macosx/", "readme", "license")
+
+
+def compression(path: str | Path) -> str | None:
+    """Return ``"gzip"``, ``"bz2"`` or ``"zip"`` from the file's magic bytes, ``None`` for plain text."""
+    with open(path, "rb") as handle:
+        head = handle.read(4)
+    for magic, kind in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def genome_stem(path: str | Path) -> str:
+    """Return the file name without its compression and format suffixes (``a.txt.gz`` -> ``a``)."""
+    path = Path(path)
+    if path.suffix.lower() in COMPRESSED_SUFFIXES:
+        path = path.with_suffix("")
+    return path.stem
+
+
+def genome_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    """Return the member of ``archive`` holding the raw genotypes.
+
+    Directories, macOS resource forks and readme/license files are skipped;
+    of the rest, the largest ``.txt``/``.tsv``/``.csv`` file wins, or the
+    largest file of any kind when there is none.
+    """
+    candidates = [
+        info for info in archive.infolist()
+        if not info.is_dir() and not any(part in info.filename.lower() for part in IGNORED_MEMBERS)
+    ]
+    if not candidates:
+        raise ValueError(f"{archive.filename} holds no genome file")
+    text = [info for info in candidates if Path(info.filename).suffix.lower() in {".txt", ".tsv", ".csv"}]
+    return max(text or candidates, key=lambda info: info.file_size)
+
+
+@contextmanager
+def open_raw(path: str | Path, mode: str = "rt") -> Iterator[IO]:
+    """Open a raw genome file, decompressing gzip, bzip2 and zip archives on the fly.
+
+    ``mode`` is ``"rt"`` for decoded text or ``"rb"`` for bytes (what pandas
+    parses fastest).  Nothing is extracted to disk.
+    """
+    if mode not in ("rt", "rb"):
+        raise ValueError(f"mode must be 'rt' or 'rb', got {mode!r}")
+    kind = compression(path)
+    with ExitStack() as stack:
+        if kind == "gzip":
+            handle = stack.enter_context(gzip.open(path, "rb"))
+        elif kind == "bz2":
+            handle = stack.enter_context(bz2.open(path, "rb"))
+        elif kind == "zip":
+            archive = stack.enter_context(zipfile.ZipFile(path))
+            handle = stack.enter_context(archive.open(genome_member(archive)))
+        else:
+            handle = stack.enter_context(open(path, "rb"))
+        if mode == "rt":
+            handle = stack.enter_context(io.TextIOWrapper(handle, encoding="utf-8", errors="replace"))
+        yield handle
+
+
+def sniff_format(path: str | Path) -> RawFormat:
+    """Return the vendor layout of ``path`` from its first :data:`SNIFF_BYTES` characters."""
+    with open_raw(path) as handle:
+        return detect_format(handle.read(SNIFF_BYTES))
+
+
+def load_genome(
+    path: str | Path = DEFAULT_GENOME_FILE,
+    *,
+    with_loci: bool = False,
+    compact: bool = False,
+    raw_format: RawFormat | None = None,
+) -> GenotypeStore | CompactGenotypes:
+    """Read a raw genome file of any supported vendor, compressed or not.
+
+    The analyzers only need rsid and genotype, so chromosome and position
+    are dropped at parse time unless ``with_loci`` is set.  ``compact``
+    returns a :class:`CompactGenotypes` instead, at a tenth of the memory.
+    The layout is sniffed unless ``raw_format`` is given.
+    """
+    if compact and with_loci:
+        raise ValueError("Compact genomes do not keep loci")
+    raw_format = raw_format or sniff_format(path)
+    with open_raw(path, "rb") as handle:
+        df = raw_format.read_frame(handle, with_loci)
+    if compact:
+        from Gene_Analysis.compact_genotypes import CompactGenotypes
+
+        return CompactGenotypes.from_columns(df["rsid"], df["genotype"])
+    return GenotypeStore.from_dataframe(df)
+
+
+def filter_genome_lines(
+    lines: Iterable[str],
+    rsids: Iterable[str],
+    *,
+    with_loci: bool = False,
+    loci: Iterable[tuple[str, int]] | None = None,
+    stats: dict | None = None,
+    raw_format: RawFormat = FORMATS["23andme"],
+) -> GenotypeStore:
+    """Keep only the raw-file lines whose rsid is in ``rsids``.
+
+    Stops consuming ``lines`` as soon as every requested rsid has been seen,
+    so memory is bounded by the panel size rather than the genome size.
+    Lines typed at one of the ``(chromosome, position)`` pairs in ``loci``
+    are kept too, whatever their rsid.  When ``stats`` is given,
+    ``stats["rows_parsed"]`` is set to the number of non-comment lines
+    consumed.  ``raw_format`` is the vendor layout of ``lines``.
+    """
+    wanted = set(rsids)
+    wanted_loci = {(str(chromosome), str(position)) for chromosome, position in loci or ()}
+    records: list[tuple[str, str, int, str]] = []
+    parsed = 0
+    if not wanted and not wanted_loci:
+        if stats is not None:
+            stats["rows_parsed"] = 0
+        return GenotypeStore()
+    unquote = raw_format.delimiter == ","
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        parsed += 1
+        if unquote:
+            line = line.replace('"', "").replace(",", " ")
+        parts = line.split(None, 1)
+        if not parts or (parts[0] not in wanted and not wanted_loci):
+            continue
+        record = raw_format.parse_fields(parts[1].split() if len(parts) > 1 else [])
+        if record is None:
+            continue
+        chromosome, position, genotype = record
+        locus = (chromosome, position)
+        if parts[0] not in wanted and locus not in wanted_loci:
+            continue
+        wanted.discard(parts[0])
+        wanted_loci.discard(locus)
+        records.append((parts[0], chromosome, int(position) if with_loci else 0, genotype))
+        if not wanted and not wanted_loci:
+            break
+    if stats is not None:
+        stats["rows_parsed"] = parsed
+    if with_loci:
+        return GenotypeStore(records)
+    return GenotypeStore.from_columns([r[0] for r in records], [r[3] for r in records])
+
+
+def stream_genome(
+    path: str | Path,
+    rsids: Iterable[str],
+    *,
+    with_loci: bool = False,
+    loci: Iterable[tuple[str, int]] | None = None,
+    stats: dict | None = None,
+    raw_format: RawFormat | None = None,
+) -> GenotypeStore:
+    """Stream ``path`` and return a store holding only the panel ``rsids`` (and ``loci``).
+
+    The layout is sniffed unless ``raw_format`` is given; ``stats["format"]``
+    records which one was used.
+    """
+    raw_format = raw_format or sniff_format(path)
+    if stats is not None:
+        stats["format"] = raw_format.name
+    with open_raw(path) as handle:
+        return filter_genome_lines(
+            handle, rsids, with_loci=with_loci, loci=loci, stats=stats, raw_format=raw_format
+        )
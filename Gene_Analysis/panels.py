@@ -0,0 +1,231 @@
+"""Compiled registry of every analyzer's marker panel.
+
+The panels are defined once in ``panels.json`` as ``(trait, rsid, allele,
+weight, description, group)`` rows.  :func:`compile_registry` turns them into
+flat arrays shared by all panels:
+
+* ``rsids``           unique rsid index; ``entry_rsid`` points into it
+* ``entry_allele``    risk/effect allele code per entry (``b""`` if none)
+* ``entry_weight``    weight vector (``0.0`` for unweighted panels)
+* ``trait_offsets``   entries of trait ``t`` are ``trait_offsets[t]:trait_offsets[t + 1]``
+* ``panel_offsets``   traits of panel ``p`` are ``panel_offsets[p]:panel_offsets[p + 1]``
+
+The compiled arrays are saved as an ``.npz`` keyed by the SHA-256 of the
+definitions, so later starts skip compilation and editing ``panels.json``
+simply produces a new entry.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from Gene_Analysis.genome_cache import default_cache_dir
+from Gene_Analysis.prs import Encoder, PRSEngine, allele_dosage
+
+PANEL_FILE = Path(__file__).with_name("panels.json")
+REGISTRY_VERSION = 1
+ARRAYS = (
+    "rsids", "entry_rsid", "entry_allele", "entry_weight", "entry_description", "entry_group",
+    "trait_names", "trait_offsets", "panel_names", "panel_categories", "panel_scored", "panel_offsets",
+)
+
+
+class Marker(NamedTuple):
+    """One panel entry; ``weight`` is ``None`` for unscored panels."""
+
+    trait: str
+    rsid: str
+    allele: str
+    weight: float | None
+    description: str
+    group: str
+
+
+class Panel:
+    """View of one panel inside a :class:`PanelRegistry`."""
+
+    def __init__(self, registry: PanelRegistry, index: int) -> None:
+        self.registry = registry
+        self.name = str(registry.panel_names[index])
+        self.category = str(registry.panel_categories[index])
+        self.scored = bool(registry.panel_scored[index])
+        self._traits = range(int(registry.panel_offsets[index]), int(registry.panel_offsets[index + 1]))
+        self.traits = [str(registry.trait_names[t]) for t in self._traits]
+
+    def __len__(self) -> int:
+        offsets = self.registry.trait_offsets
+        return int(offsets[self._traits.stop] - offsets[self._traits.start])
+
+    def __repr__(self) -> str:
+        return f"Panel({self.name!r}, traits={len(self.traits)}, markers={len(self)})"
+
+    def _entries(self, trait: str | None) -> range:
+        offsets = self.registry.trait_offsets
+        if trait is None:
+            return range(int(offsets[self._traits.start]), int(offsets[self._traits.stop]))
+        t = self._traits.start + self.traits.index(trait)
+        return range(int(offsets[t]), int(offsets[t + 1]))
+
+    def markers(self, trait: str | None = None) -> list[Marker]:
+        """Return the entries of ``trait`` (or of the whole panel) in definition order."""
+        r = self.registry
+        return [
+            Marker(
+                str(r.trait_names[r.entry_trait[e]]),
+                str(r.rsids[r.entry_rsid[e]]),
+                r.entry_allele[e].decode("ascii"),
+                float(r.entry_weight[e]) if self.scored else None,
+                str(r.entry_description[e]),
+                str(r.entry_group[e]),
+            )
+            for e in self._entries(trait)
+        ]
+
+    def rsids(self) -> list[str]:
+        """Return the panel's unique rsids in first-seen order."""
+        entries = self._entries(None)
+        index = self.registry.entry_rsid[entries.start:entries.stop]
+        return [str(self.registry.rsids[i]) for i in dict.fromkeys(index.tolist())]
+
+    def models(self) -> dict[str, list[tuple[str, str, float]]]:
+        """Return ``{trait: [(rsid, allele, weight), ...]}`` for :class:`PRSEngine`."""
+        r = self.registry
+        models = {}
+        for trait in self.traits:
+            entries = self._entries(trait)
+            models[trait] = [
+                (str(r.rsids[r.entry_rsid[e]]), r.entry_allele[e].decode("ascii"), float(r.entry_weight[e]))
+                for e in entries
+            ]
+        return models
+
+    def engine(self, encoder: Encoder = allele_dosage) -> PRSEngine:
+        """Build a :class:`PRSEngine` over this panel's traits."""
+        return PRSEngine(self.models(), encoder=encoder)
+
+
+class PanelRegistry:
+    """Every marker panel compiled into shared flat arrays."""
+
+    def __init__(self, arrays: dict[str, np.ndarray], digest: str) -> None:
+        self.digest = digest
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.entry_trait = np.repeat(np.arange(len(self.trait_names)), np.diff(self.trait_offsets))
+        self._index = {str(name): i for i, name in enumerate(self.panel_names)}
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __repr__(self) -> str:
+        return f"PanelRegistry(panels={list(self._index)}, rsids={len(self.rsids)}, digest={self.digest[:12]})"
+
+    def panel(self, name: str) -> Panel:
+        """Return the panel called ``name``."""
+        return Panel(self, self._index[name])
+
+    def rsids_for(self, *names: str) -> set[str]:
+        """Return the union of the named panels' rsids (all panels if none given)."""
+        rsids: set[str] = set()
+        for name in names or self._index:
+            rsids.update(self.panel(name).rsids())
+        return rsids
+
+
+def compile_registry(definitions: dict, digest: str = "") -> PanelRegistry:
+    """Compile parsed ``panels.json`` definitions into a :class:`PanelRegistry`."""
+    rsid_index: dict[str, int] = {}
+    entry_rsid, alleles, weights, descriptions, groups = [], [], [], [], []
+    trait_names, trait_offsets = [], [0]
+    panel_names, categories, scored, panel_offsets = [], [], [], [0]
+    for name, panel in definitions["panels"].items():
+        panel_names.append(name)
+        categories.append(panel["category"])
+        scored.append(panel["scored"])
+        current = None
+        for trait, rsid, allele, weight, description, group in panel["markers"]:
+            if trait != current:
+                if current is not None:
+                    trait_offsets.append(len(entry_rsid))
+                if trait in trait_names[panel_offsets[-1]:]:
+                    raise ValueError(f"Trait {trait!r} of panel {name!r} is not contiguous")
+                trait_names.append(trait)
+                current = trait
+            entry_rsid.append(rsid_index.setdefault(rsid, len(rsid_index)))
+            alleles.append(allele)
+            weights.append(0.0 if weight is None else weight)
+            descriptions.append(description)
+            groups.append(group)
+        if current is not None:
+            trait_offsets.append(len(entry_rsid))
+        panel_offsets.append(len(trait_names))
+    arrays = {
+        "rsids": np.asarray(list(rsid_index), dtype=str),
+        "entry_rsid": np.asarray(entry_rsid, dtype=np.int32),
+        "entry_allele": np.asarray(alleles, dtype="S1"),
+        "entry_weight": np.asarray(weights, dtype=np.float64),
+        "entry_description": np.asarray(descriptions, dtype=str),
+        "entry_group": np.asarray(groups, dtype=str),
+        "trait_names": np.asarray(trait_names, dtype=str),
+        "trait_offsets": np.asarray(trait_offsets, dtype=np.int64),
+        "panel_names": np.asarray(panel_names, dtype=str),
+        "panel_categories": np.asarray(categories, dtype=str),
+        "panel_scored": np.asarray(scored, dtype=bool),
+        "panel_offsets": np.asarray(panel_offsets, dtype=np.int64),
+    }
+    return PanelRegistry(arrays, digest)
+
+
+def registry_path(digest: str, cache_dir: str | Path | None = None) -> Path:
+    return Path(cache_dir or default_cache_dir()) / "panels" / f"v{REGISTRY_VERSION}" / f"{digest}.npz"
+
+
+def _save(registry: PanelRegistry, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, staging = tempfile.mkstemp(prefix=f".{target.stem}.", suffix=".npz", dir=target.parent)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            np.savez(handle, **{name: getattr(registry, name) for name in ARRAYS})
+        os.replace(staging, target)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+_registries: dict[tuple[Path, Path | None], PanelRegistry] = {}
+
+
+def load_registry(path: str | Path = PANEL_FILE, cache_dir: str | Path | None = None) -> PanelRegistry:
+    """Return the compiled registry for ``path``, compiling and caching it on first use.
+
+    Registries are memoized per process; the compiled ``.npz`` is reused
+    across processes as long as the definitions are unchanged.
+    """
+    key = (Path(path), Path(cache_dir) if cache_dir else None)
+    registry = _registries.get(key)
+    if registry is not None:
+        return registry
+    raw = Path(path).read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    target = registry_path(digest, cache_dir)
+    try:
+        with np.load(target, allow_pickle=False) as data:
+            registry = PanelRegistry({name: data[name] for name in ARRAYS}, digest)
+    except (OSError, KeyError, ValueError):
+        registry = compile_registry(json.loads(raw), digest)
+        try:
+            _save(registry, target)
+        except OSError:
+            pass  # A read-only cache only costs a recompile next start.
+    _registries[key] = registry
+    return registry
@@ -0,0 +1,206 @@
+"""Streaming evaluation of PGS Catalog scoring files.
+
+A PGS Catalog scoring file is a (usually gzipped) tab-separated table with a
+``#key=value`` header and one row per variant: ``rsID``, ``chr_name``,
+``chr_position``, ``effect_allele``, ``effect_weight`` and, in harmonized
+files, ``hm_rsID``/``hm_chr``/``hm_pos``.  Files run to millions of rows, so
+:func:`score_pgs` never holds one in memory:
+
+* the file is read ``chunk_size`` rows at a time;
+* every chunk is joined against a :class:`GenomeIndex` -- the sorted columns of
+  a genome cache entry plus a :class:`PositionIndex` -- by rsid, by
+  ``chromosome:position``, or by rsid first with position as the fallback;
+* ``dosage x weight`` and the coverage counters are added to running totals
+  and the chunk is dropped.
+
+Memory is bounded by the genome index plus one chunk.  Harmonized columns
+are preferred when present.  Effect alleles longer than one base (indels)
+cannot be read off array genotypes and are counted as unscorable.
+"""
+
+from __future__ import annotations
+
+import gzip
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from Gene_Analysis.genome_cache import CHROMOSOME_CODES, GenomeCache, encode_rsids
+from Gene_Analysis.position_index import PositionIndex
+from Gene_Analysis.prs import allele_dosage
+
+DEFAULT_CHUNK_SIZE = 100_000
+MATCH_MODES = ("rsid", "position", "both")
+# Scoring-file column -> harmonized column that overrides it when filled in.
+HARMONIZED = {"rsID": "hm_rsID", "chr_name": "hm_chr", "chr_position": "hm_pos"}
+SCORING_COLUMNS = ("rsID", "chr_name", "chr_position", "effect_allele", "effect_weight", *HARMONIZED.values())
+
+
+def _open_text(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def read_header(path: str | Path) -> dict[str, str]:
+    """Return the ``#key=value`` metadata at the top of a scoring file."""
+    header = {}
+    with _open_text(Path(path)) as handle:
+        for line in handle:
+            if not line.startswith("#"):
+                break
+            key, sep, value = line[1:].strip().partition("=")
+            if sep:
+                header[key.strip()] = value.strip()
+    return header
+
+
+class GenomeIndex:
+    """rsid and ``chromosome:position`` lookups over one genome's typed variants."""
+
+    def __init__(
+        self,
+        rsid: np.ndarray,
+        chromosome: np.ndarray,
+        position: np.ndarray,
+        genotype: np.ndarray,
+    ) -> None:
+        self.rsid = rsid
+        self.genotype = genotype
+        self.loci = PositionIndex(chromosome, position, rsid, genotype)
+
+    @classmethod
+    def from_cache(cls, cache: GenomeCache) -> GenomeIndex:
+        return cls(cache.rsid, cache.chromosome, cache.position, cache.genotype)
+
+    def __len__(self) -> int:
+        return len(self.rsid)
+
+    def rows_for_rsids(self, codes: np.ndarray) -> np.ndarray:
+        """Return the row of each encoded rsid, ``-1`` where it was not typed."""
+        if not len(self.rsid):
+            return np.full(len(codes), -1, dtype=np.int64)
+        at = np.searchsorted(self.rsid, codes).clip(max=len(self.rsid) - 1)
+        return np.where(self.rsid[at] == codes, at, -1)
+
+    def rows_for_loci(self, chromosomes: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Return the row typed at each ``chromosome:position``, ``-1`` where none was."""
+        return self.loci.rows(chromosomes, positions)
+
+
+@dataclass
+class PGSResult:
+    """Score and coverage of one genome against one scoring file."""
+
+    pgs_id: str | None
+    trait: str | None
+    genome_build: str | None
+    score: float = 0.0
+    variants_total: int = 0
+    variants_matched: int = 0
+    matched_by_rsid: int = 0
+    matched_by_position: int = 0
+    variants_unscorable: int = 0
+    chunks: int = 0
+    header: dict[str, str] = field(default_factory=dict, repr=False)
+
+    @property
+    def coverage(self) -> float:
+        return self.variants_matched / self.variants_total if self.variants_total else 0.0
+
+    def to_dict(self) -> dict:
+        result = asdict(self)
+        del result["header"]
+        result["coverage"] = self.coverage
+        return result
+
+
+def _column(chunk, name: str) -> np.ndarray:
+    """Return scoring-file column ``name`` as strings, harmonized values first."""
+    values = chunk[name].to_numpy(dtype=object) if name in chunk else np.full(len(chunk), "", dtype=object)
+    harmonized = HARMONIZED.get(name)
+    if harmonized in chunk:
+        override = chunk[harmonized].to_numpy(dtype=object)
+        values = np.where(override != "", override, values)
+    return values
+
+
+def _score_chunk(chunk, index: GenomeIndex, match: str, result: PGSResult) -> None:
+    import pandas as pd
+
+    n = len(chunk)
+    rows = np.full(n, -1, dtype=np.int64)
+    if match in ("rsid", "both"):
+        rows = index.rows_for_rsids(encode_rsids(_column(chunk, "rsID")))
+        result.matched_by_rsid += int((rows >= 0).sum())
+    if match in ("position", "both"):
+        chromosomes = pd.Series(_column(chunk, "chr_name")).str.removeprefix("chr")
+        chromosomes = chromosomes.map(CHROMOSOME_CODES).fillna(0).to_numpy(dtype=np.int64)
+        positions = pd.to_numeric(pd.Series(_column(chunk, "chr_position")), errors="coerce")
+        # A variant without a position cannot be matched by locus.
+        chromosomes = np.where(positions.isna().to_numpy(), 0, chromosomes)
+        positions = positions.fillna(0).to_numpy(dtype=np.int64)
+        fallback = rows < 0
+        by_locus = index.rows_for_loci(chromosomes[fallback], positions[fallback])
+        rows[fallback] = by_locus
+        result.matched_by_position += int((by_locus >= 0).sum())
+
+    alleles = chunk["effect_allele"].to_numpy(dtype=object)
+    weights = pd.to_numeric(chunk["effect_weight"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    single_base = pd.Series(alleles).str.len().to_numpy() == 1
+    found = rows >= 0
+    genotypes = np.zeros(n, dtype="S2")
+    genotypes[found] = index.genotype[rows[found]]
+    called = found & (genotypes != b"") & (genotypes != b"--")
+    scored = called & single_base
+    dosage = allele_dosage(genotypes[scored], alleles[scored].astype("S1"))
+
+    result.score += float(dosage @ weights[scored])
+    result.variants_total += n
+    result.variants_matched += int(scored.sum())
+    result.variants_unscorable += int((called & ~single_base).sum())
+    result.chunks += 1
+
+
+def score_pgs(
+    path: str | Path,
+    index: GenomeIndex,
+    *,
+    match: str = "both",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> PGSResult:
+    """Stream the scoring file at ``path`` and score the genome behind ``index``.
+
+    ``match`` is ``"rsid"``, ``"position"`` or ``"both"`` (rsid, then
+    ``chromosome:position`` for the variants whose rsid was not typed).
+    Variants count as matched when the genome has a call for them.
+    """
+    if match not in MATCH_MODES:
+        raise ValueError(f"match must be one of {', '.join(MATCH_MODES)}, got {match!r}")
+    import pandas as pd  # Only scoring-file parsing needs pandas.
+
+    path = Path(path)
+    header = read_header(path)
+    result = PGSResult(
+        pgs_id=header.get("pgs_id"),
+        trait=header.get("trait_reported"),
+        genome_build=header.get("HmPOS_build") or header.get("genome_build"),
+        header=header,
+    )
+    chunks = pd.read_csv(
+        path,
+        sep="\t",
+        comment="#",
+        usecols=lambda column: column in SCORING_COLUMNS,
+        dtype=str,
+        na_filter=False,
+        chunksize=chunk_size,
+        compression="infer",
+    )
+    with chunks:
+        for chunk in chunks:
+            if "effect_allele" not in chunk or "effect_weight" not in chunk:
+                raise ValueError(f"{path} is not a PGS scoring file: no effect_allele/effect_weight columns")
+            _score_chunk(chunk, index, match, result)
+    return result
@@ -0,0 +1,216 @@
+"""Chromosome:position index over typed variants.
+
+Raw files from different vendors and builds do not always agree on rsids,
+but they do agree on where a variant sits.  :class:`PositionIndex` keeps, for
+every chromosome, the typed positions as a sorted array, so a point lookup
+or a ``start..end`` window is a binary search rather than a table scan.
+
+:class:`LocusFallback` puts the index behind a genotype store: a panel rsid
+the store does not have is looked up at its coordinates from
+``panel_loci.tsv`` instead.  :func:`stream_with_fallback` and
+:func:`cached_with_fallback` load a genome that way and can be used anywhere
+``stream_genome``/``load_cached_genome`` are.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+
+import numpy as np
+
+from Gene_Analysis.genome_cache import CHROMOSOME_CODES, CHROMOSOME_NAMES, GenomeCache, decode_rsid, open_cache
+from Gene_Analysis.genotype_store import GenotypeRecord, GenotypeStore
+from Gene_Analysis.loader import stream_genome
+
+PANEL_LOCI_FILE = Path(__file__).with_name("panel_loci.tsv")
+
+
+def chromosome_code(name: str) -> int:
+    """Return the chromosome code of ``name`` (``chr`` prefix allowed), ``0`` if unknown."""
+    name = str(name)
+    return CHROMOSOME_CODES.get(name[3:] if name.lower().startswith("chr") else name, 0)
+
+
+def load_panel_loci(path: str | Path = PANEL_LOCI_FILE) -> dict[str, tuple[str, int]]:
+    """Read ``rsid<TAB>chromosome<TAB>position`` lines into ``{rsid: (chromosome, position)}``."""
+    loci = {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            fields = line.split()
+            if len(fields) < 3 or line.startswith("#"):
+                continue
+            code = chromosome_code(fields[1])
+            if code:
+                loci[fields[0]] = (CHROMOSOME_NAMES[code], int(fields[2]))
+    return loci
+
+
+class PositionIndex:
+    """Per-chromosome sorted positions of a genome's typed variants.
+
+    ``rsids`` holds rsid strings or cache-encoded integers; rows whose
+    chromosome is unknown are not indexed.
+    """
+
+    def __init__(
+        self,
+        chromosomes: np.ndarray,
+        positions: np.ndarray,
+        rsids: np.ndarray,
+        genotypes: np.ndarray,
+    ) -> None:
+        self.rsids = rsids
+        self.genotypes = genotypes
+        self.chromosomes = chromosomes = np.asarray(chromosomes, dtype=np.uint8)
+        self.positions = positions = np.asarray(positions, dtype=np.int64)
+        self._chromosomes: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        order = np.lexsort((positions, chromosomes))
+        ordered = chromosomes[order]
+        bounds = np.flatnonzero(np.diff(ordered)) + 1
+        for rows in np.split(order, bounds):
+            code = int(chromosomes[rows[0]]) if len(rows) else 0
+            if code:
+                self._chromosomes[code] = (positions[rows], rows)
+
+    @classmethod
+    def from_cache(cls, cache: GenomeCache) -> PositionIndex:
+        return cls(cache.chromosome, cache.position, cache.rsid, cache.genotype)
+
+    @classmethod
+    def from_store(cls, store: GenotypeStore) -> PositionIndex:
+        """Index the records of a store loaded ``with_loci``."""
+        records = [store.record(rsid) for rsid in store]
+        return cls(
+            np.array([chromosome_code(r.chromosome) for r in records], dtype=np.uint8),
+            np.array([r.position for r in records], dtype=np.int64),
+            np.array([r.rsid for r in records], dtype=object),
+            np.array([r.genotype for r in records], dtype=object),
+        )
+
+    def __len__(self) -> int:
+        return sum(len(rows) for _, rows in self._chromosomes.values())
+
+    def __repr__(self) -> str:
+        return f"PositionIndex({len(self)} variants, {len(self._chromosomes)} chromosomes)"
+
+    def record(self, row: int) -> GenotypeRecord:
+        """Return the variant at ``row`` of the indexed columns."""
+        rsid, genotype = self.rsids[row], self.genotypes[row]
+        return GenotypeRecord(
+            decode_rsid(int(rsid)) if isinstance(rsid, np.integer) else str(rsid),
+            CHROMOSOME_NAMES[int(self.chromosomes[row])],
+            int(self.positions[row]),
+            genotype.decode("ascii") if isinstance(genotype, bytes) else str(genotype),
+        )
+
+    def rows(self, chromosomes: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Return the row typed at each ``(chromosome code, position)``, ``-1`` where none was."""
+        chromosomes = np.asarray(chromosomes, dtype=np.int64)
+        positions = np.asarray(positions, dtype=np.int64)
+        found = np.full(len(positions), -1, dtype=np.int64)
+        for code in np.unique(chromosomes).tolist():
+            if code not in self._chromosomes:
+                continue
+            typed, rows = self._chromosomes[code]
+            wanted = np.flatnonzero(chromosomes == code)
+            at = np.searchsorted(typed, positions[wanted]).clip(max=len(typed) - 1)
+            hit = typed[at] == positions[wanted]
+            found[wanted[hit]] = rows[at[hit]]
+        return found
+
+    def lookup(self, chromosome: str, position: int) -> GenotypeRecord | None:
+        """Return the variant typed at ``chromosome:position``, or ``None``."""
+        [row] = self.rows([chromosome_code(chromosome)], [position])
+        return self.record(int(row)) if row >= 0 else None
+
+    def range(self, chromosome: str, start: int, end: int) -> list[GenotypeRecord]:
+        """Return every variant typed in ``start..end`` (inclusive) on ``chromosome``, by position."""
+        typed, rows = self._chromosomes.get(chromosome_code(chromosome), (np.empty(0), np.empty(0)))
+        window = slice(np.searchsorted(typed, start, "left"), np.searchsorted(typed, end, "right"))
+        return [self.record(int(row)) for row in rows[window]]
+
+
+class LocusFallback(Mapping):
+    """Genotype mapping that finds rsids missing from ``store`` by position.
+
+    Every rsid of ``loci`` the store lacks is resolved against ``index`` once,
+    up front; :attr:`resolved` lists the ones found that way.
+    """
+
+    def __init__(self, store: Mapping[str, str], index: PositionIndex, loci: Mapping[str, tuple[str, int]]) -> None:
+        self.store = store
+        self.index = index
+        missing = [rsid for rsid in loci if rsid not in store]
+        rows = index.rows(
+            [chromosome_code(loci[rsid][0]) for rsid in missing],
+            [loci[rsid][1] for rsid in missing],
+        )
+        self.resolved: dict[str, GenotypeRecord] = {
+            rsid: index.record(int(row)) for rsid, row in zip(missing, rows.tolist()) if row >= 0
+        }
+
+    def __getitem__(self, rsid: str) -> str:
+        if rsid in self.store:
+            return self.store[rsid]
+        return self.resolved[rsid].genotype
+
+    def __contains__(self, rsid: object) -> bool:
+        return rsid in self.store or rsid in self.resolved
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.store
+        yield from self.resolved
+
+    def __len__(self) -> int:
+        return len(self.store) + len(self.resolved)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} markers, {len(self.resolved)} by position)"
+
+    def record(self, rsid: str) -> GenotypeRecord | None:
+        """Return the typed record for ``rsid``; position matches carry the file's own id."""
+        if rsid in self.resolved:
+            return self.resolved[rsid]
+        return self.store.record(rsid) if hasattr(self.store, "record") else None
+
+    def lookup_many(self, rsids: Iterable[str]) -> dict[str, str]:
+        rsids = list(rsids)
+        typed = self.store.lookup_many(rsids) if hasattr(self.store, "lookup_many") else {
+            rsid: self.store[rsid] for rsid in rsids if rsid in self.store
+        }
+        return {
+            rsid: typed[rsid] if rsid in typed else self.resolved[rsid].genotype
+            for rsid in rsids
+            if rsid in typed or rsid in self.resolved
+        }
+
+
+def stream_with_fallback(
+    path: str | Path,
+    rsids: Iterable[str],
+    *,
+    loci: Mapping[str, tuple[str, int]] | None = None,
+    stats: dict | None = None,
+) -> LocusFallback:
+    """Stream ``path`` keeping the panel ``rsids`` and any variant typed at their ``loci``."""
+    rsids = list(rsids)
+    loci = load_panel_loci() if loci is None else loci
+    panel_loci = {rsid: loci[rsid] for rsid in rsids if rsid in loci}
+    store = stream_genome(path, rsids, loci=panel_loci.values(), with_loci=True, stats=stats)
+    return LocusFallback(store, PositionIndex.from_store(store), panel_loci)
+
+
+def cached_with_fallback(
+    path: str | Path,
+    rsids: Iterable[str],
+    *,
+    loci: Mapping[str, tuple[str, int]] | None = None,
+    cache_dir: str | Path | None = None,
+) -> LocusFallback:
+    """Load the panel ``rsids`` through the genome cache, falling back to their ``loci``."""
+    rsids = list(rsids)
+    loci = load_panel_loci() if loci is None else loci
+    cache = open_cache(path, cache_dir)
+    panel_loci = {rsid: loci[rsid] for rsid in rsids if rsid in loci}
+    return LocusFallback(cache.to_store(rsids, with_loci=True), PositionIndex.from_cache(cache), panel_loci)
@@ -0,0 +1,82 @@
+"""Opt-in per-stage timing for the ``analyze`` pipeline.
+
+``analyze --profile`` wraps each pipeline stage (genome load, every
+analyzer together with writing its rows, report assembly) in
+:meth:`Profiler.stage`, which records wall time, CPU time, the process
+peak RSS after the stage and any counts the stage reports.  The stages are stored under
+``metadata["profile"]`` of the report; a disabled profiler costs nothing
+beyond the ``with`` statement.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float | None:
+    """Return the process's peak resident set size in MiB, if the OS reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+class Profiler:
+    """Collect one record per pipeline stage."""
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.stages: list[dict] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[dict]:
+        """Time the body of the ``with`` block; counts set on the yielded dict are kept."""
+        counts: dict = {}
+        if not self.enabled:
+            yield counts
+            return
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield counts
+        finally:
+            self.stages.append({
+                "stage": name,
+                "wall_seconds": round(time.perf_counter() - wall, 6),
+                "cpu_seconds": round(time.process_time() - cpu, 6),
+                "peak_rss_mb": _round(peak_rss_mb()),
+                **counts,
+            })
+
+    def summary(self) -> dict:
+        """Return the ``metadata["profile"]`` block."""
+        return {
+            "stages": list(self.stages),
+            "total_wall_seconds": round(sum(s["wall_seconds"] for s in self.stages), 6),
+            "total_cpu_seconds": round(sum(s["cpu_seconds"] for s in self.stages), 6),
+            "peak_rss_mb": _round(peak_rss_mb()),
+        }
+
+    def render(self) -> str:
+        """Format the stages as a plain-text table."""
+        lines = [f"{'Stage':<18}{'Wall (s)':>10}{'CPU (s)':>10}{'Peak RSS (MB)':>15}  Counts"]
+        for s in self.stages:
+            counts = ", ".join(
+                f"{k}={v}" for k, v in s.items()
+                if k not in ("stage", "wall_seconds", "cpu_seconds", "peak_rss_mb")
+            )
+            rss = "n/a" if s["peak_rss_mb"] is None else f"{s['peak_rss_mb']:.1f}"
+            lines.append(f"{s['stage']:<18}{s['wall_seconds']:>10.4f}{s['cpu_seconds']:>10.4f}{rss:>15}  {counts}")
+        return "\n".join(lines)
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 2)
@@ -0,0 +1,262 @@
+"""Vectorized polygenic score engine.
+
+Every trait model is a list of ``(rsid, effect_allele, weight)`` entries.
+The engine deduplicates the ``(rsid, effect_allele)`` pairs of all models
+into one variant axis, stores the models as a sparse trait x variant weight
+matrix in CSR form, encodes a genome as one value per variant (the effect
+allele dosage by default) and scores every trait with a single sparse
+matrix-vector product.  A cohort is scored the same way from a
+``(samples, variants)`` matrix in one pass.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+
+# Maps (genotypes as S2, effect alleles as S1) to one float per variant.
+Encoder = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+def genotype_array(genotypes) -> np.ndarray:
+    """Return ``genotypes`` as an ``S2`` array, reading wider calls as no calls (``--``).
+
+    A plain ``S2`` cast would keep the first two characters of a call such as
+    ``"AGT"`` and score it as ``AG``.
+    """
+    values = np.asarray(genotypes)
+    if values.dtype.kind == "O":
+        values = values.astype("U")
+    width = values.dtype.itemsize // 4 if values.dtype.kind == "U" else values.dtype.itemsize
+    if values.dtype.kind in "SU" and width > 2:
+        wide = np.char.str_len(values) > 2
+        if wide.any():
+            values = np.where(wide, b"--" if values.dtype.kind == "S" else "--", values)
+    return np.ascontiguousarray(values, dtype="S2")
+
+
+def genotype_calls(calls: Iterable[str | None]) -> tuple[list[str | None], np.ndarray]:
+    """Normalize looked-up calls with :func:`genotype_array` for the analyzer scripts.
+
+    Returns the calls as strings (``None`` for untyped markers, as
+    ``lookup_many(...).get`` gives them) and as the ``S2`` array the kernels
+    take, so a report row shows the same ``--`` the engine scores.
+    """
+    calls = list(calls)
+    codes = genotype_array([call or "" for call in calls])
+    return [None if call is None else code.decode("ascii") for call, code in zip(calls, codes.tolist())], codes
+
+
+def _pairs(genotypes: np.ndarray) -> np.ndarray:
+    """View ``S2`` genotypes as ``(..., 2)`` bytes; an absent allele is ``0``."""
+    genotypes = genotype_array(genotypes)
+    return genotypes.view(np.uint8).reshape(genotypes.shape + (2,))
+
+
+def _allele_bytes(alleles: np.ndarray) -> np.ndarray:
+    """View ``S1`` alleles as bytes; the empty allele is ``0``."""
+    return np.ascontiguousarray(alleles, dtype="S1").view(np.uint8)
+
+
+def allele_dosage(genotypes: np.ndarray, alleles: np.ndarray) -> np.ndarray:
+    """Count copies of each effect allele, like ``genotype.count(allele)``.
+
+    ``genotypes`` may have any shape; ``alleles`` broadcasts against it.
+    """
+    pairs, allele = _pairs(genotypes), _allele_bytes(alleles)[..., None]
+    length = (pairs != 0).sum(axis=-1)
+    count = ((pairs == allele) & (allele != 0)).sum(axis=-1)
+    # ``str.count("")`` is one more than the length.
+    return np.where(allele[..., 0] == 0, length + 1, count).astype(np.float64)
+
+
+def allele_present(genotypes: np.ndarray, alleles: np.ndarray) -> np.ndarray:
+    """Return whether each genotype carries its allele, like ``allele in genotype``."""
+    pairs, allele = _pairs(genotypes), _allele_bytes(alleles)[..., None]
+    return ((pairs == allele) & (allele != 0)).any(axis=-1) | (allele[..., 0] == 0)
+
+
+def longevity_effect(genotypes: np.ndarray, alleles: np.ndarray) -> np.ndarray:
+    """Return the longevity panels' effect of each genotype for its risk allele.
+
+    0.0 for two risk alleles, 0.5 for one, 1.0 for ``GG`` against an ``A``
+    risk allele and 0.3 for anything else (including haploid and no calls).
+    """
+    pairs, allele = _pairs(genotypes), _allele_bytes(alleles)
+    first, second = pairs[..., 0], pairs[..., 1]
+    diploid = second != 0
+    # ``risk * 2 == genotype`` also matches the empty genotype when risk is "".
+    homozygous = (first == allele) & (second == allele)
+    carrier = diploid & ((first == allele) | (second == allele) | (allele == 0))
+    protective = (allele == ord("A")) & (first == ord("G")) & (second == ord("G"))
+    return np.select([homozygous, carrier, protective], [0.0, 0.5, 1.0], default=0.3)
+
+
+def scalar_encoder(effect: Callable[[str, str], float]) -> Encoder:
+    """Wrap a scalar ``effect(genotype, allele)`` function as an :data:`Encoder`."""
+    def encode(genotypes: np.ndarray, alleles: np.ndarray) -> np.ndarray:
+        alleles = np.broadcast_to(alleles, genotypes.shape)
+        return np.array([
+            effect(g.decode("ascii"), a.decode("ascii"))
+            for g, a in zip(genotypes.ravel(), alleles.ravel())
+        ], dtype=np.float64).reshape(genotypes.shape)
+    return encode
+
+
+class Contribution(NamedTuple):
+    """One model entry as scored for a genome."""
+
+    rsid: str
+    genotype: str | None
+    effect_allele: str
+    weight: float
+    value: float
+    contribution: float
+
+
+@dataclass
+class PRSResult:
+    """Scores for every trait of one genome plus the per-entry breakdown."""
+
+    traits: list[str]
+    scores: np.ndarray
+    markers_found: np.ndarray
+    markers_total: np.ndarray
+    engine: PRSEngine
+    codes: np.ndarray
+    found: np.ndarray
+    values: np.ndarray
+    entry_contributions: np.ndarray
+
+    def score(self, trait: str) -> float:
+        return float(self.scores[self.traits.index(trait)])
+
+    def genotype(self, variant: int) -> str | None:
+        """Return the genotype behind ``variant`` or ``None`` if it was not typed."""
+        return self.codes[variant].decode("ascii") if self.found[variant] else None
+
+    def contributions(self, trait: str) -> list[Contribution]:
+        """Return the scored entries of ``trait`` in model order."""
+        engine = self.engine
+        t = self.traits.index(trait)
+        rows = []
+        for entry in range(engine.indptr[t], engine.indptr[t + 1]):
+            variant = engine.indices[entry]
+            rows.append(Contribution(
+                engine.variant_rsids[variant],
+                self.genotype(variant),
+                engine.variant_alleles[variant],
+                float(engine.weights[entry]),
+                float(self.values[variant]),
+                float(self.entry_contributions[entry]),
+            ))
+        return rows
+
+
+@dataclass
+class CohortPRSResult:
+    """Scores for every trait of every sample, as ``(samples, traits)`` arrays."""
+
+    traits: list[str]
+    scores: np.ndarray
+    markers_found: np.ndarray
+    markers_total: np.ndarray
+    engine: PRSEngine
+    codes: np.ndarray
+    found: np.ndarray
+    values: np.ndarray
+    entry_contributions: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def sample(self, index: int) -> PRSResult:
+        """Return the single-genome view of sample ``index``."""
+        return PRSResult(
+            self.traits,
+            self.scores[index],
+            self.markers_found[index],
+            self.markers_total,
+            self.engine,
+            self.codes[index],
+            self.found[index],
+            self.values[index],
+            self.entry_contributions[index],
+        )
+
+
+class PRSEngine:
+    """Sparse weight matrix over a shared variant axis."""
+
+    def __init__(
+        self,
+        models: Mapping[str, Iterable[tuple[str, str, float]]],
+        encoder: Encoder = allele_dosage,
+    ) -> None:
+        self.traits = list(models)
+        self.encoder = encoder
+        variant_index: dict[tuple[str, str], int] = {}
+        indptr = [0]
+        indices: list[int] = []
+        weights: list[float] = []
+        for trait in self.traits:
+            for rsid, allele, weight in models[trait]:
+                indices.append(variant_index.setdefault((rsid, allele), len(variant_index)))
+                weights.append(weight)
+            indptr.append(len(indices))
+        self.variant_rsids = [rsid for rsid, _ in variant_index]
+        self.variant_alleles = [allele for _, allele in variant_index]
+        self.rsids = list(dict.fromkeys(self.variant_rsids))
+        rsid_column = {rsid: i for i, rsid in enumerate(self.rsids)}
+        # Column of ``rsids`` that holds the genotype of each variant.
+        self.variant_columns = np.asarray([rsid_column[r] for r in self.variant_rsids], dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        # Row (trait) index of every stored entry, for the bincount product.
+        self.entry_traits = np.repeat(np.arange(len(self.traits)), np.diff(self.indptr))
+        self._allele_codes = np.asarray(self.variant_alleles, dtype="S1")
+
+    def genotype_matrix(self, genomes: Iterable[Mapping[str, str]]) -> np.ndarray:
+        """Return a ``(samples, rsids)`` ``S2`` matrix; ``b""`` marks untyped markers."""
+        rows = []
+        for genome in genomes:
+            typed = genome.lookup_many(self.rsids) if hasattr(genome, "lookup_many") else genome
+            rows.append([typed.get(rsid) or "" for rsid in self.rsids])
+        return genotype_array(rows).reshape(len(rows), len(self.rsids))
+
+    def _trait_totals(self, per_entry: np.ndarray) -> np.ndarray:
+        """Sum a ``(samples, entries)`` array into ``(samples, traits)`` totals."""
+        samples, n = per_entry.shape[0], len(self.traits)
+        bins = (np.arange(samples)[:, None] * n + self.entry_traits).ravel()
+        totals = np.bincount(bins, weights=per_entry.ravel(), minlength=samples * n)
+        return totals.reshape(samples, n)
+
+    def score_matrix(self, genotypes: np.ndarray) -> CohortPRSResult:
+        """Score every trait for every row of a :meth:`genotype_matrix`."""
+        codes = genotypes[:, self.variant_columns]
+        found = codes != b""
+        values = np.where(found, self.encoder(codes, self._allele_codes), 0.0)
+        contributions = self.weights * values[:, self.indices]
+        return CohortPRSResult(
+            traits=self.traits,
+            scores=self._trait_totals(contributions),
+            markers_found=self._trait_totals(found[:, self.indices]).astype(int),
+            markers_total=np.diff(self.indptr),
+            engine=self,
+            codes=codes,
+            found=found,
+            values=values,
+            entry_contributions=contributions,
+        )
+
+    def score_many(self, genomes: Iterable[Mapping[str, str]]) -> CohortPRSResult:
+        """Score every trait for a cohort of genomes in one vectorized pass."""
+        return self.score_matrix(self.genotype_matrix(genomes))
+
+    def score(self, genotypes: Mapping[str, str]) -> PRSResult:
+        """Score every trait for one genome."""
+        return self.score_many([genotypes]).sample(0)
@@ -0,0 +1,194 @@
+"""Vendor layouts of raw genotype downloads.
+
+Every vendor writes the same information -- rsid, chromosome, position and
+the two called alleles -- in its own layout:
+
+* ``23andme``    -- 23andMe v3/v5: tab-separated ``rsid chromosome position
+  genotype`` with ``#`` comments and no column row.  Files without a vendor
+  header in this layout are read the same way.
+* ``ancestry``   -- AncestryDNA: tab-separated with a column row and the two
+  alleles in separate columns; chromosomes 23-26 stand for X, Y, the
+  pseudoautosomal XY region and MT, and ``0`` marks a no-call.
+* ``myheritage`` / ``ftdna`` -- quoted CSV with an ``RSID,CHROMOSOME,
+  POSITION,RESULT`` column row.
+* ``pairs``      -- whitespace-separated ``rsid genotype`` lines without loci.
+
+:func:`detect_format` picks the layout from the first few KB of a file.
+Each :class:`RawFormat` carries a dedicated pandas reader for whole-file
+parses and a line parser for streaming, and both produce the 23andMe
+``rsid/chromosome/position/genotype`` columns, with no-calls as ``--``.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from typing import IO, TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+SNIFF_BYTES = 8192
+NO_CALL = "--"
+ANCESTRY_COLUMNS = ["rsid", "chromosome", "position", "allele1", "allele2"]
+ANCESTRY_CHROMOSOMES = {"23": "X", "24": "Y", "25": "XY", "26": "MT"}
+CSV_HEADER = "RSID,CHROMOSOME,POSITION,RESULT"
+RAW_COLUMNS = ["rsid", "chromosome", "position", "genotype"]
+
+# Tail fields of one line (everything after the rsid) -> (chromosome, position, genotype).
+LineParser = Callable[[list[str]], "tuple[str, str, str] | None"]
+
+
+class RawFormat(NamedTuple):
+    """How to parse one vendor's raw download."""
+
+    name: str
+    delimiter: str
+    parse_fields: LineParser
+    read_frame: Callable[[IO[bytes], bool], "pd.DataFrame"]
+
+
+def _locus_fields(fields: list[str]) -> tuple[str, str, str] | None:
+    if len(fields) < 3 or not fields[1].isdigit():
+        return None
+    return fields[0], fields[1], fields[2]
+
+
+def _ancestry_fields(fields: list[str]) -> tuple[str, str, str] | None:
+    if len(fields) < 4 or not fields[1].isdigit():
+        return None
+    genotype = fields[2] + fields[3]
+    return ANCESTRY_CHROMOSOMES.get(fields[0], fields[0]), fields[1], NO_CALL if genotype == "00" else genotype
+
+
+def _pair_fields(fields: list[str]) -> tuple[str, str, str] | None:
+    return ("", "0", fields[0]) if fields else None
+
+
+def _read_23andme(handle: IO[bytes], with_loci: bool) -> pd.DataFrame:
+    import pandas as pd
+
+    return pd.read_csv(
+        handle,
+        sep="\t",
+        comment="#",
+        header=None,
+        usecols=[0, 1, 2, 3] if with_loci else [0, 3],
+        names=RAW_COLUMNS,
+        dtype={"rsid": str, "chromosome": str, "position": "int64", "genotype": str},
+        na_filter=False,
+    )
+
+
+def _read_ancestry(handle: IO[bytes], with_loci: bool) -> pd.DataFrame:
+    import pandas as pd
+
+    df = pd.read_csv(
+        handle,
+        sep="\t",
+        comment="#",
+        header=0,
+        names=ANCESTRY_COLUMNS,
+        dtype={"rsid": str, "chromosome": str, "position": "int64", "allele1": str, "allele2": str},
+        na_filter=False,
+    )
+    genotype = df.pop("allele1") + df.pop("allele2")
+    df["genotype"] = genotype.where(genotype != "00", NO_CALL)
+    if not with_loci:
+        return df[["rsid", "genotype"]]
+    df["chromosome"] = df["chromosome"].replace(ANCESTRY_CHROMOSOMES)
+    return df
+
+
+def _read_csv(handle: IO[bytes], with_loci: bool) -> pd.DataFrame:
+    import pandas as pd
+
+    df = pd.read_csv(
+        handle,
+        sep=",",
+        comment="#",
+        header=None,
+        names=RAW_COLUMNS,
+        dtype=str,
+        na_filter=False,
+    )
+    # Drops the column row, wherever it sits.
+    df = df[df["position"].str.isdigit()].reset_index(drop=True)
+    if not with_loci:
+        return df[["rsid", "genotype"]]
+    df["position"] = df["position"].astype("int64")
+    return df
+
+
+def _read_pairs(handle: IO[bytes], with_loci: bool) -> pd.DataFrame:
+    import pandas as pd
+
+    df = pd.read_csv(
+        handle,
+        sep=r"\s+",
+        comment="#",
+        header=None,
+        usecols=[0, 1],
+        names=["rsid", "genotype"],
+        dtype=str,
+        na_filter=False,
+    )
+    if with_loci:
+        df.insert(1, "chromosome", "")
+        df.insert(2, "position", 0)
+    return df
+
+
+FORMATS = {
+    "23andme": RawFormat("23andme", "\t", _locus_fields, _read_23andme),
+    "ancestry": RawFormat("ancestry", "\t", _ancestry_fields, _read_ancestry),
+    "myheritage": RawFormat("myheritage", ",", _locus_fields, _read_csv),
+    "ftdna": RawFormat("ftdna", ",", _locus_fields, _read_csv),
+    "pairs": RawFormat("pairs", " ", _pair_fields, _read_pairs),
+}
+
+
+def detect_format(head: str) -> RawFormat:
+    """Return the layout of a raw file whose first characters are ``head``.
+
+    Vendor banners in the ``#`` comments decide first, then the column row,
+    then the shape of the first data line.  A file with no data lines is
+    taken as 23andMe.
+    """
+    if head.startswith("##fileformat=VCF"):
+        raise ValueError("VCF files are not raw downloads; analyze reads them with Gene_Analysis.vcf")
+    lines = head.splitlines()
+    if len(head) >= SNIFF_BYTES and len(lines) > 1:
+        lines.pop()  # Probably cut short.
+    comments = "\n".join(line for line in lines if line.startswith("#")).lower()
+    data = [line for line in lines if line.strip() and not line.startswith("#")]
+    first = data[0] if data else ""
+    if "ancestrydna" in comments or first.lower().startswith("rsid\tchromosome\tposition\tallele1"):
+        return FORMATS["ancestry"]
+    if first.replace('"', "").upper().startswith(CSV_HEADER) or ("," in first and "\t" not in first):
+        return FORMATS["myheritage" if "myheritage" in comments else "ftdna"]
+    if "23andme" in comments or not first:
+        return FORMATS["23andme"]
+    columns = len(first.split())
+    if columns == 2:
+        return FORMATS["pairs"]
+    if columns == 5 and "\t" in first:
+        return FORMATS["ancestry"]
+    if columns >= 4:
+        return FORMATS["23andme"]
+    raise ValueError(f"Unrecognized raw genome layout: {first[:80]!r}")
+
+
+def parse_lines(lines: Iterable[str], raw_format: RawFormat) -> Iterator[tuple[str, str, str, str]]:
+    """Yield ``(rsid, chromosome, position, genotype)`` for each data line, position as text."""
+    unquote = raw_format.delimiter == ","
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        if unquote:
+            line = line.replace('"', "").replace(",", " ")
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        record = raw_format.parse_fields(fields[1:])
+        if record is not None:
+            yield (fields[0], *record)
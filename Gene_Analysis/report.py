@@ -0,0 +1,416 @@
+"""Structured JSON and Markdown reports for a full genome analysis.
+
+Every analyzer returns a list of per-marker rows built with
+:func:`marker_row`.  The rows are grouped into trait and category summaries
+and written in the same ``metadata`` / ``rows`` / ``trait_summaries`` /
+``category_summaries`` layout as the files in ``analysis_reports/``.
+:class:`ReportWriter` streams the rows to disk as they are produced.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TextIO
+
+REPORT_DIR = "analysis_reports"
+DISCLAIMER = (
+    "Educational/research-only genomic interpretation. "
+    "Not diagnostic and not a substitute for medical care."
+)
+NOTES = [
+    "Scores are relative genetic indices, not medical diagnoses.",
+    "Markers missing from the raw file do not contribute to a score.",
+    "Educational/research use only; discuss medical decisions with licensed clinicians.",
+]
+# Row fields whose repeated strings compact reports store once, in ``lookups``.
+LOOKUP_FIELDS = ("category", "trait", "description", "source", "bias_note", "gene", "snp_type")
+
+
+def marker_row(
+    category: str,
+    trait: str,
+    rsid: str,
+    genotype: str | None,
+    description: str,
+    risk_allele: str | None = None,
+    weight: float | None = None,
+    contribution: float | None = None,
+) -> dict:
+    """Return one report row for a marker looked up by an analyzer."""
+    risk_allele_count = None
+    if genotype is not None and risk_allele is not None:
+        risk_allele_count = genotype.count(risk_allele)
+    return {
+        "category": category,
+        "trait": trait,
+        "rsid": rsid,
+        "genotype": genotype,
+        "risk_allele": risk_allele,
+        "risk_allele_count": risk_allele_count,
+        "weight": weight,
+        "contribution": contribution,
+        "description": description,
+    }
+
+
+def _add_to_summary(summaries: dict[tuple[str, str], dict], row: dict) -> None:
+    key = (row["category"], row["trait"])
+    summary = summaries.get(key)
+    if summary is None:
+        summary = summaries[key] = {
+            "category": row["category"],
+            "trait": row["trait"],
+            "markers_total": 0,
+            "markers_found": 0,
+            "score": None,
+        }
+    summary["markers_total"] += 1
+    if row["genotype"] is not None:
+        summary["markers_found"] += 1
+    if row["contribution"] is not None:
+        summary["score"] = (summary["score"] or 0.0) + row["contribution"]
+
+
+def _finish_summaries(summaries: dict[tuple[str, str], dict]) -> list[dict]:
+    for summary in summaries.values():
+        if summary["score"] is not None:
+            summary["score"] = round(summary["score"], 4)
+    return sorted(summaries.values(), key=lambda s: (s["category"], s["trait"]))
+
+
+def summarize_traits(rows: Iterable[dict]) -> list[dict]:
+    """Group rows by ``(category, trait)`` and total their contributions."""
+    summaries: dict[tuple[str, str], dict] = {}
+    for row in rows:
+        _add_to_summary(summaries, row)
+    return _finish_summaries(summaries)
+
+
+def summarize_categories(trait_summaries: list[dict]) -> list[dict]:
+    """Roll trait summaries up to one entry per category."""
+    categories: dict[str, dict] = {}
+    for trait in trait_summaries:
+        summary = categories.setdefault(trait["category"], {
+            "category": trait["category"],
+            "traits": 0,
+            "markers_total": 0,
+            "markers_found": 0,
+        })
+        summary["traits"] += 1
+        summary["markers_total"] += trait["markers_total"]
+        summary["markers_found"] += trait["markers_found"]
+    return sorted(categories.values(), key=lambda s: s["category"])
+
+
+def report_metadata(input_file: str | Path, panel_version: str | None = None) -> dict:
+    """Return the ``metadata`` block of a new report; the marker counts start at zero."""
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "total_markers": 0,
+        "markers_found": 0,
+        "input_file": str(input_file),
+        "panel_version": panel_version,
+        "educational_use_only": True,
+        "disclaimer": DISCLAIMER,
+    }
+
+
+def build_report(rows: list[dict], input_file: str | Path, panel_version: str | None = None) -> dict:
+    """Assemble the full report document for one genome.
+
+    ``panel_version`` identifies the marker panels the rows were scored
+    against (the registry digest), so a stored report can be re-scored
+    incrementally when the panels change.
+    """
+    trait_summaries = summarize_traits(rows)
+    metadata = report_metadata(input_file, panel_version)
+    metadata["total_markers"] = len(rows)
+    metadata["markers_found"] = sum(1 for row in rows if row["genotype"] is not None)
+    return {
+        "metadata": metadata,
+        "rows": rows,
+        "trait_summaries": trait_summaries,
+        "category_summaries": summarize_categories(trait_summaries),
+    }
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "n/a"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value).replace("|", "\\|")
+
+
+def _markdown_head(metadata: dict, trait_summaries: list[dict]) -> list[str]:
+    lines = [
+        "# Gene Deep-Dive Report",
+        "",
+        f"Generated: {metadata['generated_at']}",
+        f"Markers analyzed: {metadata['total_markers']}",
+        f"Markers found: {metadata['markers_found']}",
+        "",
+        "## Trait Summary",
+        "",
+        "| Category | Trait | SNPs Found | Score |",
+        "|---|---|---:|---:|",
+    ]
+    for trait in trait_summaries:
+        score = _cell(trait["score"])
+        if "score_interval" in trait:
+            lower, upper = trait["score_interval"]
+            score = f"{score} ({lower} to {upper})"
+        lines.append(
+            f"| {trait['category']} | {_cell(trait['trait'])} "
+            f"| {trait['markers_found']}/{trait['markers_total']} | {score} |"
+        )
+    admixture = metadata.get("admixture")
+    if admixture and admixture["proportions"]:
+        lines += [
+            "",
+            "## Ancestry Admixture",
+            "",
+            f"Reference: {_cell(admixture['reference'])}, "
+            f"{admixture['markers_used']}/{admixture['markers_total']} markers used",
+            "",
+            "| Population | Proportion |",
+            "|---|---:|",
+        ]
+        lines += [f"| {_cell(population)} | {q:.1%} |" for population, q in admixture["proportions"].items()]
+    lines += [
+        "",
+        "## SNP-Level Detail",
+        "",
+        "| Trait | rsID | Genotype | Risk Allele | Risk Allele Count | Weight | Contribution | Description |",
+        "|---|---|---|---|---:|---:|---:|---|",
+    ]
+    return lines
+
+
+def _markdown_row(row: dict) -> str:
+    return (
+        f"| {_cell(row['trait'])} | {row['rsid']} | {_cell(row['genotype'])} "
+        f"| {_cell(row['risk_allele'])} | {_cell(row['risk_allele_count'])} "
+        f"| {_cell(row['weight'])} | {_cell(row['contribution'])} | {_cell(row['description'])} |"
+    )
+
+
+MARKDOWN_FOOTER = "\n".join(["", "## Notes", "", *(f"- {note}" for note in NOTES)]) + "\n"
+
+
+def render_markdown(report: dict) -> str:
+    """Render a report document as Markdown."""
+    lines = _markdown_head(report["metadata"], report["trait_summaries"])
+    lines += [_markdown_row(row) for row in report["rows"]]
+    return "\n".join(lines) + "\n" + MARKDOWN_FOOTER
+
+
+def default_report_paths(directory: str | Path = REPORT_DIR) -> tuple[Path, Path]:
+    """Return timestamped ``gene_report_*.json`` / ``.md`` paths."""
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    base = Path(directory) / f"gene_report_{stamp}"
+    return base.with_suffix(".json"), base.with_suffix(".md")
+
+
+def _indented(value, prefix: str) -> str:
+    """``json.dumps(value, indent=2)`` as it appears nested under ``prefix``."""
+    return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n" + prefix)
+
+
+class ReportWriter:
+    """Write a report to JSON and Markdown while its rows are still being produced.
+
+    Rows passed to :meth:`add` are serialized straight away into temporary
+    spool files, and only the trait totals stay in memory.  :meth:`close`
+    writes the metadata and summaries, which have to come first in both
+    files, and then copies the spooled rows after them.  The output is
+    byte-for-byte what :func:`render_markdown` and ``json.dumps(report,
+    indent=2)`` would produce.
+
+    ``compact`` replaces each row object in the JSON with a list under the
+    shared ``columns`` header, and replaces the strings of :data:`LOOKUP_FIELDS`
+    with indexes into ``lookups``.  :func:`expand_compact` turns such a
+    document back into the usual layout.  Targets may be paths or open
+    text files; a path is only replaced once its file is complete, so an
+    interrupted run leaves the previous report in place.  ``score_intervals`` maps ``(category, trait)`` to the
+    ``score_interval`` to add to that trait's summary.  It and ``metadata``
+    are only read by :meth:`close`, so both can still be filled in after the
+    last row.
+    """
+
+    def __init__(
+        self,
+        json_out: str | Path | TextIO,
+        markdown_out: str | Path | TextIO | None,
+        metadata: dict,
+        *,
+        compact: bool = False,
+        score_intervals: dict[tuple[str, str], list[float]] | None = None,
+    ) -> None:
+        self.json_out = json_out
+        self.markdown_out = markdown_out
+        self.metadata = dict(metadata)
+        self.compact = compact
+        self.score_intervals = score_intervals or {}
+        self.columns: list[str] | None = None
+        self.lookups: dict[str, dict[str, int]] = {}
+        self.rows = 0
+        self.found = 0
+        self._summaries: dict[tuple[str, str], dict] = {}
+        self._json_rows = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self._markdown_rows = tempfile.TemporaryFile("w+", encoding="utf-8") if markdown_out is not None else None
+
+    def __enter__(self) -> ReportWriter:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self._discard()
+        elif not self._json_rows.closed:
+            self.close()
+
+    def add(self, row: dict) -> None:
+        """Append one :func:`marker_row` to the report."""
+        if self.compact:
+            if self.columns is None:
+                self.columns = list(row)
+                self.lookups = {field: {} for field in self.columns if field in LOOKUP_FIELDS}
+            encoded = [
+                self.lookups[field].setdefault(value, len(self.lookups[field]))
+                if field in self.lookups and value is not None else value
+                for field, value in ((field, row[field]) for field in self.columns)
+            ]
+            text = "    " + json.dumps(encoded, ensure_ascii=False)
+        else:
+            text = "    " + _indented(row, "    ")
+        self._json_rows.write(("" if not self.rows else ",\n") + text)
+        if self._markdown_rows is not None:
+            self._markdown_rows.write(_markdown_row(row) + "\n")
+        self.rows += 1
+        self.found += row["genotype"] is not None
+        _add_to_summary(self._summaries, row)
+
+    def extend(self, rows: Iterable[dict]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def close(self) -> dict:
+        """Write both files and return the report without its rows."""
+        self.metadata["total_markers"] = self.rows
+        self.metadata["markers_found"] = self.found
+        if self.compact:
+            self.metadata["compact"] = True
+        trait_summaries = _finish_summaries(self._summaries)
+        for trait in trait_summaries:
+            interval = self.score_intervals.get((trait["category"], trait["trait"]))
+            if interval is not None:
+                trait["score_interval"] = interval
+        summary = {
+            "metadata": self.metadata,
+            "trait_summaries": trait_summaries,
+            "category_summaries": summarize_categories(trait_summaries),
+        }
+        try:
+            with _open_target(self.json_out) as handle:
+                handle.write("{\n  \"metadata\": " + _indented(self.metadata, "  ") + ",\n")
+                if self.compact:
+                    lookups = {field: list(values) for field, values in self.lookups.items()}
+                    handle.write('  "columns": ' + json.dumps(self.columns or [], ensure_ascii=False) + ",\n")
+                    handle.write('  "lookups": ' + _indented(lookups, "  ") + ",\n")
+                handle.write('  "rows": [')
+                if self.rows:
+                    handle.write("\n")
+                    self._json_rows.seek(0)
+                    shutil.copyfileobj(self._json_rows, handle)
+                    handle.write("\n  ")
+                handle.write("],\n")
+                handle.write('  "trait_summaries": ' + _indented(trait_summaries, "  ") + ",\n")
+                handle.write('  "category_summaries": ' + _indented(summary["category_summaries"], "  ") + "\n}\n")
+            if self.markdown_out is not None:
+                with _open_target(self.markdown_out) as handle:
+                    handle.write("\n".join(_markdown_head(self.metadata, trait_summaries)) + "\n")
+                    self._markdown_rows.seek(0)
+                    shutil.copyfileobj(self._markdown_rows, handle)
+                    handle.write(MARKDOWN_FOOTER)
+        finally:
+            self._discard()
+        return summary
+
+    def _discard(self) -> None:
+        self._json_rows.close()
+        if self._markdown_rows is not None:
+            self._markdown_rows.close()
+
+
+@contextmanager
+def _open_target(target: str | Path | TextIO) -> Iterator[TextIO]:
+    """Yield ``target`` itself, or for a path a staging file that replaces it on success."""
+    if hasattr(target, "write"):
+        yield target
+        return
+    path = Path(target)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, staging = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            yield handle
+        os.replace(staging, path)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+def expand_compact(document: dict) -> dict:
+    """Return the ordinary report layout for a document written with ``compact``."""
+    if not document["metadata"].get("compact"):
+        return document
+    columns = document["columns"]
+    lookups = document["lookups"]
+    rows = []
+    for values in document["rows"]:
+        row = dict(zip(columns, values))
+        for field, table in lookups.items():
+            if row[field] is not None:
+                row[field] = table[row[field]]
+        rows.append(row)
+    metadata = {k: v for k, v in document["metadata"].items() if k != "compact"}
+    return {
+        "metadata": metadata,
+        "rows": rows,
+        "trait_summaries": document["trait_summaries"],
+        "category_summaries": document["category_summaries"],
+    }
+
+
+def summary_intervals(trait_summaries: Iterable[dict]) -> dict[tuple[str, str], list[float]]:
+    """Map ``(category, trait)`` to each summary's ``score_interval``, for :class:`ReportWriter`."""
+    return {
+        (trait["category"], trait["trait"]): trait["score_interval"]
+        for trait in trait_summaries
+        if "score_interval" in trait
+    }
+
+
+def write_report(
+    report: dict,
+    json_path: str | Path,
+    markdown_path: str | Path,
+    *,
+    compact: bool = False,
+) -> None:
+    """Write ``report`` as JSON and Markdown, creating parent directories."""
+    with ReportWriter(
+        json_path,
+        markdown_path,
+        report["metadata"],
+        compact=compact,
+        score_intervals=summary_intervals(report["trait_summaries"]),
+    ) as writer:
+        writer.extend(report["rows"])
@@ -0,0 +1,192 @@
+"""Patch stored reports when the marker panels change.
+
+A report row records everything that defines its marker: category, trait,
+rsid, risk allele, weight and description.  :func:`rescore_report` diffs
+those against the current panel registry and re-scores only the entries
+that were added or changed.  It reuses the genotypes already stored in the
+report and reads the genome only for rsids the report has never looked up.
+Rows of removed markers are dropped, and only the affected trait summaries
+are recomputed.  Reports whose ``panel_version`` matches the registry
+digest are left untouched.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Callable, Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+
+from Gene_Analysis.analyzers import panel_encoder
+from Gene_Analysis.batch import CohortPanel, sample_rows, score_cohort
+from Gene_Analysis.genotype_store import GenotypeStore
+from Gene_Analysis.loader import stream_genome
+from Gene_Analysis.panels import Marker, PanelRegistry, load_registry
+from Gene_Analysis.prs import PRSEngine, genotype_array
+from Gene_Analysis.report import (
+    ReportWriter,
+    expand_compact,
+    summarize_categories,
+    summarize_traits,
+    summary_intervals,
+)
+from Gene_Analysis.uncertainty import annotate_report
+
+RowKey = tuple[str, str, str]
+# rsids -> store for the rsids a report has never looked up.
+GenotypeLoader = Callable[[Iterable[str]], GenotypeStore]
+
+
+def _row_key(row: dict) -> RowKey:
+    return row["category"], row["trait"], row["rsid"]
+
+
+def _row_spec(row: dict) -> tuple:
+    return row["risk_allele"], row["weight"], row["description"]
+
+
+def _marker_spec(marker: Marker) -> tuple:
+    return marker.allele or None, marker.weight, marker.description
+
+
+def _delta_rows(
+    name: str,
+    registry: PanelRegistry,
+    markers: list[Marker],
+    genotypes: dict[str, str | None],
+) -> list[dict]:
+    """Score just ``markers`` of panel ``name`` and return their report rows."""
+    panel = registry.panel(name)
+    models: dict[str, list[tuple[str, str, float]]] = {}
+    for marker in markers:
+        models.setdefault(marker.trait, []).append((marker.rsid, marker.allele, marker.weight or 0.0))
+    delta = CohortPanel(
+        panel.category,
+        PRSEngine(models, panel_encoder(name)),
+        [marker.description for marker in markers],
+        scored=panel.scored,
+    )
+    rsids = delta.engine.rsids
+    matrix = genotype_array([[genotypes.get(rsid) or "" for rsid in rsids]])
+    return sample_rows([delta], score_cohort(matrix, rsids, [delta]), 0)
+
+
+def rescore_report(
+    report: dict,
+    registry: PanelRegistry | None = None,
+    load: GenotypeLoader | None = None,
+) -> dict:
+    """Return ``report`` brought up to date with ``registry``.
+
+    ``load`` is only called when an added marker's rsid does not appear
+    anywhere in the report; it defaults to streaming the report's
+    ``input_file``.  The counts of kept, re-scored, added and removed rows
+    are recorded in ``metadata["rescore"]``.
+    """
+    registry = registry or load_registry()
+    old_rows = {_row_key(row): row for row in report["rows"]}
+    genotypes = {row["rsid"]: row["genotype"] for row in report["rows"]}
+
+    order: list[RowKey] = []
+    changed: dict[str, list[Marker]] = {}
+    for name in registry:
+        panel = registry.panel(name)
+        for marker in panel.markers():
+            key = (panel.category, marker.trait, marker.rsid)
+            order.append(key)
+            old = old_rows.get(key)
+            if old is None or _row_spec(old) != _marker_spec(marker):
+                changed.setdefault(name, []).append(marker)
+
+    unseen = {m.rsid for markers in changed.values() for m in markers if m.rsid not in genotypes}
+    if unseen:
+        if load is None:
+            input_file = Path(report["metadata"]["input_file"])
+            if not input_file.is_file():
+                raise FileNotFoundError(
+                    f"Genome {input_file} is needed to score {len(unseen)} new markers"
+                )
+            load = lambda rsids: stream_genome(input_file, rsids)  # noqa: E731
+        store = load(unseen)
+        genotypes.update({rsid: store.get(rsid) for rsid in unseen})
+
+    fresh = {}
+    for name, markers in changed.items():
+        for row in _delta_rows(name, registry, markers, genotypes):
+            fresh[_row_key(row)] = row
+    rows = [fresh.get(key) or old_rows[key] for key in order]
+    removed = old_rows.keys() - set(order)
+
+    touched = {key[:2] for key in fresh} | {key[:2] for key in removed}
+    summaries = {(s["category"], s["trait"]): s for s in report["trait_summaries"]}
+    live = {_row_key(row)[:2] for row in rows}
+    stale = touched | (live - summaries.keys())
+    summaries.update(
+        ((s["category"], s["trait"]), s)
+        for s in summarize_traits([row for row in rows if _row_key(row)[:2] in stale])
+    )
+    trait_summaries = sorted(
+        (summaries[key] for key in live),
+        key=lambda s: (s["category"], s["trait"]),
+    )
+
+    added = sum(1 for key in fresh if key not in old_rows)
+    metadata = dict(report["metadata"])
+    metadata.update({
+        "total_markers": len(rows),
+        "markers_found": sum(1 for row in rows if row["genotype"] is not None),
+        "panel_version": registry.digest,
+        "rescored_at": datetime.now(timezone.utc).isoformat(),
+        "rescore": {
+            "previous_panel_version": report["metadata"].get("panel_version"),
+            "rows_kept": len(rows) - len(fresh),
+            "rows_rescored": len(fresh) - added,
+            "rows_added": added,
+            "rows_removed": len(removed),
+            "traits_rescored": len(stale & live),
+        },
+    })
+    patched = {
+        **report,
+        "metadata": metadata,
+        "rows": rows,
+        "trait_summaries": trait_summaries,
+        "category_summaries": summarize_categories(trait_summaries),
+    }
+    if "uncertainty" in metadata:
+        # Intervals span every marker of a trait, so re-draw them with the report's settings.
+        settings = metadata["uncertainty"]
+        patched["trait_summaries"] = [dict(summary) for summary in trait_summaries]
+        annotate_report(patched, draws=settings["draws"], seed=settings["seed"], level=settings["level"])
+    return patched
+
+
+
+def rescore_file(
+    json_path: str | Path,
+    registry: PanelRegistry | None = None,
+    load: GenotypeLoader | None = None,
+) -> dict | None:
+    """Patch the report at ``json_path`` in place; return its rescore stats.
+
+    The sibling ``.md`` report is re-rendered when it exists and compact
+    reports stay compact.  Returns ``None`` when the report already matches
+    the current panels.
+    """
+    registry = registry or load_registry()
+    json_path = Path(json_path)
+    document = json.loads(json_path.read_text(encoding="utf-8"))
+    if document["metadata"].get("panel_version") == registry.digest:
+        return None
+    compact = bool(document["metadata"].get("compact"))
+    patched = rescore_report(expand_compact(document), registry, load)
+    markdown_path = json_path.with_suffix(".md")
+    with ReportWriter(
+        json_path,
+        markdown_path if markdown_path.is_file() else None,
+        patched["metadata"],
+        compact=compact,
+        score_intervals=summary_intervals(patched["trait_summaries"]),
+    ) as writer:
+        writer.extend(patched["rows"])
+    return patched["metadata"]["rescore"]
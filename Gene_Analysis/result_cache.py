@@ -0,0 +1,126 @@
+"""Persistent cache of finished analysis results.
+
+Re-running every analyzer over a genome that was already analyzed against the
+same panels gives the same rows and summaries, so the structured report is
+stored under a key derived from the genome's SHA-256 and the panel registry
+digest.  The evidence snapshot is not part of the key, since no score reads
+the evidence records.  Entries are single JSON files under
+``<cache_dir>/results/v<version>/``:
+
+* writes go to a temporary file that is moved into place with
+  :func:`os.replace`, so concurrent workers never see a partial entry and the
+  last writer of identical content simply wins;
+* a hit refreshes the entry's modification time, and after every write the
+  least recently used entries are removed until the cache fits in
+  ``max_bytes`` and ``max_entries``.
+
+Only run-specific metadata (timestamp, input path, profile, evidence
+snapshot) differs between a cached and a fresh report; it is filled in again
+on every hit.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from Gene_Analysis.genome_cache import default_cache_dir
+
+RESULT_CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 256 << 20
+# Metadata that belongs to one run rather than to the results.  No score reads the
+# evidence records, so the snapshot a run was served from is stamped per run too.
+RUN_METADATA = (
+    "generated_at", "input_file", "profile", "snapshot_id", "snapshot_created_at", "snapshot_stale_after_days",
+)
+
+
+def result_key(genome_digest: str, panel_version: str) -> str:
+    """Return the cache key for one genome scored against one panel version."""
+    return hashlib.sha256(f"{genome_digest}\0{panel_version}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded, LRU-evicted store of report documents."""
+
+    def __init__(
+        self,
+        cache_dir: str | Path | None = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int | None = None,
+    ) -> None:
+        self.directory = Path(cache_dir or default_cache_dir()) / "results" / f"v{RESULT_CACHE_VERSION}"
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+    def __repr__(self) -> str:
+        return f"ResultCache({str(self.directory)!r}, max_bytes={self.max_bytes})"
+
+    def key(self, genome_digest: str, panel_version: str) -> str:
+        """Return the key of a genome scored against ``panel_version``."""
+        return result_key(genome_digest, panel_version)
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str, input_file: str | Path) -> dict | None:
+        """Return the cached report for ``key`` re-stamped for ``input_file``, or ``None``."""
+        path = self.path(key)
+        try:
+            report = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            return None  # Unreadable entries are recomputed and overwritten.
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # Evicted by another worker meanwhile; the copy we read is still valid.
+        report["metadata"].update({
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "input_file": str(input_file),
+        })
+        return report
+
+    def put(self, key: str, report: dict) -> Path:
+        """Store ``report`` under ``key`` atomically and evict old entries."""
+        metadata = {k: v for k, v in report["metadata"].items() if k not in RUN_METADATA}
+        text = json.dumps({**report, "metadata": metadata}, ensure_ascii=False)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.path(key)
+        fd, staging = tempfile.mkstemp(prefix=f".{key}.", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                handle.write(text)
+            os.replace(staging, target)
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
+        self.evict()
+        return target
+
+    def evict(self) -> int:
+        """Remove least recently used entries beyond the limits; return how many went."""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort(reverse=True)
+        removed = total = 0
+        for count, (_, size, path) in enumerate(entries, 1):
+            total += size
+            if total <= self.max_bytes and (self.max_entries is None or count <= self.max_entries):
+                continue
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
@@ -0,0 +1,163 @@
+"""Monte Carlo credible intervals for trait scores.
+
+A trait score is ``sum(weight x value)`` over its markers.  Two things make
+it uncertain:
+
+* the weights are estimates.  Each one is drawn from a normal distribution
+  whose 95% interval is ``ci_lower..ci_upper`` when those bounds are known,
+  and ``weight x (1 +/- DEFAULT_WEIGHT_CI)`` otherwise;
+* markers missing from the raw file contribute nothing to the reported
+  score.  Here each one gets a genotype imputed from its effect allele
+  frequency under Hardy-Weinberg (``DEFAULT_ALLELE_FREQUENCY`` when unknown).
+  The other allele is taken as the transition partner (A/G, C/T), and the
+  genotype is scored with the panel's own encoder.
+
+Every draw of every marker is generated in one seeded NumPy call, and all
+traits are totalled with a single ``reduceat``.  10,000 draws over the full
+panel set take a few tens of milliseconds.  :func:`annotate_report` adds the
+resulting ``score_interval`` to each weighted trait summary.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+
+import numpy as np
+
+DEFAULT_DRAWS = 10_000
+DEFAULT_SEED = 0
+DEFAULT_LEVEL = 0.95
+# Half-width of a weight's 95% interval relative to the weight, when no bounds are known.
+DEFAULT_WEIGHT_CI = 0.2
+DEFAULT_ALLELE_FREQUENCY = 0.5
+Z_95 = 1.959963984540054
+TRANSITION = {"A": "G", "G": "A", "C": "T", "T": "C"}
+# The row fields :func:`trait_intervals` reads; a streamed report keeps only these.
+INTERVAL_FIELDS = ("category", "trait", "rsid", "genotype", "risk_allele", "weight")
+
+
+def _encoders() -> dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]]:
+    """Return the genotype encoder of every scored registry panel, by category."""
+    from Gene_Analysis.analyzers import panel_encoder
+    from Gene_Analysis.panels import load_registry
+
+    registry = load_registry()
+    encoders = {}
+    for name in registry.panel_names:
+        panel = registry.panel(str(name))
+        if panel.scored:
+            encoders[panel.category] = panel_encoder(panel.name)
+    return encoders
+
+
+def _values(
+    rows: list[dict],
+    encoders: Mapping[str, Callable],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return each row's value and its three imputation candidates ``[aa, ao, oo]``."""
+    from Gene_Analysis.prs import allele_dosage, genotype_array
+
+    values = np.zeros(len(rows))
+    candidates = np.zeros((len(rows), 3))
+    by_category: dict[str, list[int]] = {}
+    for i, row in enumerate(rows):
+        by_category.setdefault(row["category"], []).append(i)
+    for category, members in by_category.items():
+        encode = encoders.get(category, allele_dosage)
+        alleles = [rows[i]["risk_allele"] or "" for i in members]
+        others = [TRANSITION.get(a, "N") for a in alleles]
+        genotypes = genotype_array([rows[i]["genotype"] or "" for i in members])
+        allele_codes = np.array(alleles, dtype="S1")
+        values[members] = encode(genotypes, allele_codes)
+        canonical = np.array(
+            [[a + a, a + o, o + o] for a, o in zip(alleles, others)], dtype="S2"
+        ).reshape(len(members), 3)
+        candidates[members] = encode(canonical, allele_codes[:, None])
+    return values, candidates
+
+
+def trait_intervals(
+    rows: Iterable[dict],
+    *,
+    draws: int = DEFAULT_DRAWS,
+    seed: int = DEFAULT_SEED,
+    level: float = DEFAULT_LEVEL,
+    bounds: Mapping[str, tuple[float, float]] | None = None,
+    frequencies: Mapping[str, float] | None = None,
+    encoders: Mapping[str, Callable] | None = None,
+) -> dict[tuple[str, str], tuple[float, float, float]]:
+    """Return ``{(category, trait): (lower, median, upper)}`` for every weighted trait.
+
+    ``bounds`` maps an rsid to the ``(ci_lower, ci_upper)`` of its weight and
+    ``frequencies`` to its effect allele frequency.
+    """
+    rows = sorted(
+        (row for row in rows if row["weight"] is not None),
+        key=lambda row: (row["category"], row["trait"]),
+    )
+    if not rows:
+        return {}
+    bounds = bounds or {}
+    frequencies = frequencies or {}
+    keys = [(row["category"], row["trait"]) for row in rows]
+    starts = np.flatnonzero([i == 0 or keys[i] != keys[i - 1] for i in range(len(keys))])
+
+    weights = np.array([row["weight"] for row in rows], dtype=np.float64)
+    spread = np.array([
+        (bounds[row["rsid"]][1] - bounds[row["rsid"]][0]) / 2 if row["rsid"] in bounds
+        else abs(row["weight"]) * DEFAULT_WEIGHT_CI
+        for row in rows
+    ]) / Z_95
+    values, candidates = _values(rows, _encoders() if encoders is None else encoders)
+    missing = np.flatnonzero([row["genotype"] is None for row in rows])
+    frequency = np.array([frequencies.get(rows[i]["rsid"], DEFAULT_ALLELE_FREQUENCY) for i in missing])
+
+    rng = np.random.default_rng(seed)
+    sampled = weights + spread * rng.standard_normal((draws, len(rows)))
+    sampled_values = np.broadcast_to(values, sampled.shape).copy()
+    if len(missing):
+        risk_copies = rng.binomial(2, frequency, size=(draws, len(missing)))
+        sampled_values[:, missing] = candidates[missing, 2 - risk_copies]
+    totals = np.add.reduceat(sampled * sampled_values, starts, axis=1)
+    tail = (1 - level) / 2
+    lower, median, upper = np.quantile(totals, [tail, 0.5, 1 - tail], axis=0)
+    return {
+        keys[start]: (float(lo), float(mid), float(hi))
+        for start, lo, mid, hi in zip(starts.tolist(), lower, median, upper)
+    }
+
+
+def score_intervals(
+    intervals: Mapping[tuple[str, str], tuple[float, float, float]],
+) -> dict[tuple[str, str], list[float]]:
+    """Return the rounded ``score_interval`` of each trait in ``intervals``."""
+    return {key: [round(lower, 4), round(upper, 4)] for key, (lower, _, upper) in intervals.items()}
+
+
+def settings(draws: int = DEFAULT_DRAWS, seed: int = DEFAULT_SEED, level: float = DEFAULT_LEVEL) -> dict:
+    """Return the ``metadata["uncertainty"]`` block for these settings."""
+    return {"method": "monte_carlo", "draws": draws, "seed": seed, "level": level}
+
+
+def annotate_report(
+    report: dict,
+    *,
+    draws: int = DEFAULT_DRAWS,
+    seed: int = DEFAULT_SEED,
+    level: float = DEFAULT_LEVEL,
+    **options,
+) -> dict:
+    """Add ``score_interval`` to the weighted trait summaries of ``report`` in place.
+
+    The settings are recorded under ``metadata["uncertainty"]``; the same
+    seed always gives the same intervals.
+    """
+    intervals = score_intervals(
+        trait_intervals(report["rows"], draws=draws, seed=seed, level=level, **options)
+    )
+    for summary in report["trait_summaries"]:
+        interval = intervals.get((summary["category"], summary["trait"]))
+        if interval is not None:
+            summary["score_interval"] = interval
+    report["metadata"]["uncertainty"] = settings(draws, seed, level)
+    return report
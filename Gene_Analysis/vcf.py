@@ -0,0 +1,566 @@
+"""Indexed random access to whole-genome VCF files.
+
+A whole-genome VCF holds tens of millions of records, and the analyzers need
+a few hundred of them.  :func:`load_vcf` therefore never reads such a file
+from start to end.  It seeks straight to the GRCh37 ``chromosome:position``
+of each panel marker (from ``panel_loci.tsv``) and decompresses only the
+blocks around it:
+
+* a bgzipped file (``bgzip``) with a tabix ``.tbi`` index next to it is
+  read through that index;
+* a bgzipped or plain file without one gets a :class:`BlockIndex`, built in
+  one pass over the blocks -- the first record of every block and of every
+  chromosome, with its offset -- and stored under the cache directory, so
+  later runs go straight to the seeks;
+* an ordinary gzip file cannot be seeked into and is scanned once instead.
+
+The VCF must be sorted by position within each chromosome, as tabix
+requires.  Calls are converted to raw-file genotypes (``AG``, ``--`` for a
+no-call, ``I``/``D`` at indel sites).  Panel markers without known
+coordinates are looked up by the VCF ``ID`` column instead: one pass over
+the file finds their positions, which are cached next to the block index so
+later runs seek to them too.  Markers found neither way are reported as
+``markers_without_locus``.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import re
+import struct
+import zlib
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+
+import numpy as np
+
+from Gene_Analysis.genome_cache import default_cache_dir
+from Gene_Analysis.genotype_store import GenotypeStore
+from Gene_Analysis.loader import compression, open_raw
+from Gene_Analysis.position_index import chromosome_code, load_panel_loci
+
+VCF_SUFFIXES = (".vcf", ".vcf.gz", ".vcf.bgz")
+INDEX_VERSION = 1
+PLAIN_BLOCK_SIZE = 1 << 16
+# Decompressed blocks kept per reader; the seeks for nearby markers share them.
+BLOCK_CACHE_SIZE = 64
+TABIX_MAGIC = b"TBI\x01"
+TABIX_WINDOW_SHIFT = 14
+GT_SEPARATOR = re.compile(r"[/|]")
+
+
+def is_vcf(path: str | Path) -> bool:
+    """Return whether ``path`` is a VCF file, by suffix or by its ``##fileformat`` line."""
+    if str(path).lower().endswith(VCF_SUFFIXES):
+        return True
+    try:
+        with open_raw(path) as handle:
+            return handle.readline().startswith("##fileformat=VCF")
+    except (OSError, EOFError, ValueError):
+        return False
+
+
+def is_bgzf(path: str | Path) -> bool:
+    """Return whether ``path`` is block-gzipped (a gzip member with a ``BC`` extra field)."""
+    with open(path, "rb") as handle:
+        header = handle.read(18)
+    return len(header) == 18 and header[:4] == b"\x1f\x8b\x08\x04" and header[12:14] == b"BC"
+
+
+class BGZFReader:
+    """Random access to a BGZF file by virtual offset (``block << 16 | within``)."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.size = self.path.stat().st_size
+        self.blocks_read = 0
+        self._handle = open(self.path, "rb")
+        self._cache: dict[int, tuple[bytes, int]] = {}
+
+    def __enter__(self) -> BGZFReader:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._handle.close()
+
+    @staticmethod
+    def virtual(block: int, within: int) -> int:
+        return block << 16 | within
+
+    def block(self, offset: int) -> tuple[bytes, int]:
+        """Return the decompressed block at file ``offset`` and the offset of the next one."""
+        if offset not in self._cache:
+            if len(self._cache) >= BLOCK_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[offset] = self._decompress(offset)
+            self.blocks_read += 1
+        return self._cache[offset]
+
+    def blocks(self) -> Iterator[tuple[int, bytes]]:
+        """Yield ``(offset, data)`` for every block, start to end, without caching them."""
+        offset = 0
+        while offset < self.size:
+            data, following = self._decompress(offset)
+            yield offset, data
+            offset = following
+
+    def _decompress(self, offset: int) -> tuple[bytes, int]:
+        self._handle.seek(offset)
+        header = self._handle.read(12)
+        if len(header) < 12:
+            return b"", self.size
+        extra = self._handle.read(struct.unpack_from("<H", header, 10)[0])
+        size = None
+        at = 0
+        while at + 4 <= len(extra):
+            length = struct.unpack_from("<H", extra, at + 2)[0]
+            if extra[at:at + 2] == b"BC":
+                size = struct.unpack_from("<H", extra, at + 4)[0] + 1
+            at += 4 + length
+        if size is None:
+            raise ValueError(f"{self.path} is not BGZF: block at {offset} has no size field")
+        body = self._handle.read(size - 12 - len(extra))
+        return zlib.decompress(header + extra + body, 31), offset + size
+
+    def lines(self, voffset: int) -> Iterator[bytes]:
+        """Yield the lines from virtual offset ``voffset`` on, without their newline."""
+        offset, within = voffset >> 16, voffset & 0xFFFF
+        pending = b""
+        while offset < self.size:
+            data, offset = self.block(offset)
+            pieces = (pending + data[within:]).split(b"\n")
+            pending = pieces.pop()
+            yield from pieces
+            within = 0
+        if pending:
+            yield pending
+
+
+class PlainReader:
+    """The :class:`BGZFReader` interface over an uncompressed file; offsets are byte offsets."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.size = self.path.stat().st_size
+        self.blocks_read = 0
+        self._handle = open(self.path, "rb")
+
+    def __enter__(self) -> PlainReader:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._handle.close()
+
+    @staticmethod
+    def virtual(block: int, within: int) -> int:
+        return block + within
+
+    def blocks(self) -> Iterator[tuple[int, bytes]]:
+        self._handle.seek(0)
+        offset = 0
+        for data in iter(lambda: self._handle.read(PLAIN_BLOCK_SIZE), b""):
+            yield offset, data
+            offset += len(data)
+
+    def lines(self, voffset: int) -> Iterator[bytes]:
+        self.blocks_read += 1
+        self._handle.seek(voffset)
+        for line in self._handle:
+            yield line.rstrip(b"\r\n")
+
+
+def _reg2bins(beg: int, end: int) -> list[int]:
+    """Return the tabix bins overlapping the 0-based half-open interval ``beg..end``."""
+    end -= 1
+    bins = [0]
+    for shift, first in ((26, 1), (23, 9), (20, 73), (17, 585), (14, 4681)):
+        bins.extend(range(first + (beg >> shift), first + (end >> shift) + 1))
+    return bins
+
+
+class TabixIndex:
+    """The parts of a tabix ``.tbi`` index needed to seek to one position."""
+
+    def __init__(self, references: dict[int, tuple[dict[int, np.ndarray], np.ndarray]]) -> None:
+        # chromosome code -> ({bin: (n, 2) chunk offsets}, linear index)
+        self.references = references
+
+    @classmethod
+    def read(cls, path: str | Path) -> TabixIndex:
+        data = gzip.decompress(Path(path).read_bytes())  # BGZF is a series of gzip members.
+        if data[:4] != TABIX_MAGIC:
+            raise ValueError(f"{path} is not a tabix index")
+        n_ref = struct.unpack_from("<i", data, 4)[0]
+        names_length = struct.unpack_from("<i", data, 32)[0]
+        names = data[36:36 + names_length].split(b"\0")[:n_ref]
+        at = 36 + names_length
+        references = {}
+        for name in names:
+            bins = {}
+            (n_bin,) = struct.unpack_from("<i", data, at)
+            at += 4
+            for _ in range(n_bin):
+                number, n_chunk = struct.unpack_from("<Ii", data, at)
+                at += 8
+                bins[number] = np.frombuffer(data, "<u8", 2 * n_chunk, at).reshape(n_chunk, 2)
+                at += 16 * n_chunk
+            (n_intv,) = struct.unpack_from("<i", data, at)
+            at += 4
+            linear = np.frombuffer(data, "<u8", n_intv, at)
+            at += 8 * n_intv
+            code = chromosome_code(name.decode("ascii", "replace"))
+            if code:
+                references[code] = (bins, linear)
+        return cls(references)
+
+    def start(self, code: int, position: int) -> int | None:
+        """Return the virtual offset to scan from for ``position`` (1-based), ``None`` if no records."""
+        if code not in self.references:
+            return None
+        bins, linear = self.references[code]
+        window = (position - 1) >> TABIX_WINDOW_SHIFT
+        floor = int(linear[min(window, len(linear) - 1)]) if len(linear) else 0
+        starts = [
+            max(int(begin), floor)
+            for number in _reg2bins(position - 1, position)
+            for begin, end in bins.get(number, ())
+            if end > floor
+        ]
+        return min(starts) if starts else None
+
+
+class BlockIndex:
+    """Offsets of the first record of every block and of every chromosome, in file order."""
+
+    def __init__(self, chromosomes: np.ndarray, positions: np.ndarray, offsets: np.ndarray) -> None:
+        self.chromosomes = chromosomes
+        self.positions = positions
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @classmethod
+    def build(cls, reader: BGZFReader | PlainReader) -> BlockIndex:
+        """Index ``reader`` in one pass over its blocks."""
+        entries: list[tuple[int, int, int]] = []
+
+        def add(line: bytes, offset: int, first: bool) -> int:
+            """Record ``line`` if it opens the block or a chromosome; return its chromosome code."""
+            code = _chromosome(line)
+            if first or code != entries[-1][0]:
+                entries.append((code, int(line.split(b"\t", 2)[1]), offset))
+            return code
+
+        tail, tail_offset = b"", 0
+        for block, data in reader.blocks():
+            # buffer always begins at a line start: the carried-over partial line, or this block.
+            buffer = tail + data
+            carried = len(tail)
+            last_newline = buffer.rfind(b"\n")
+            if last_newline < 0:
+                tail, tail_offset = buffer, tail_offset if tail else reader.virtual(block, 0)
+                continue
+            last_code = _chromosome(buffer[buffer.rfind(b"\n", 0, last_newline) + 1:last_newline])
+            at, first = 0, True
+            while at < last_newline:
+                end = buffer.index(b"\n", at)
+                if end > at and buffer[at] != ord("#"):
+                    offset = (tail_offset if carried else reader.virtual(block, 0)) if at == 0 else (
+                        reader.virtual(block, at - carried)
+                    )
+                    code = add(buffer[at:end], offset, first)
+                    if first and code == last_code:
+                        break  # Sorted, so the whole block is on this chromosome.
+                    first = False
+                at = end + 1
+            tail = buffer[last_newline + 1:]
+            tail_offset = reader.virtual(block, last_newline + 1 - carried)
+        if tail.strip() and not tail.startswith(b"#"):
+            add(tail, tail_offset, not entries)
+        columns = np.array(entries, dtype=np.int64).reshape(-1, 3)
+        return cls(
+            columns[:, 0].astype(np.uint8),
+            columns[:, 1],
+            columns[:, 2].astype(np.uint64),
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> BlockIndex:
+        with np.load(path) as columns:
+            return cls(columns["chromosomes"], columns["positions"], columns["offsets"])
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = path.with_name(f".{path.name}.tmp.npz")
+        np.savez(staging, chromosomes=self.chromosomes, positions=self.positions, offsets=self.offsets)
+        staging.replace(path)
+
+    def start(self, code: int, position: int) -> int | None:
+        """Return the offset to scan from for ``position``, ``None`` if the chromosome has no records."""
+        rows = np.flatnonzero(self.chromosomes == code)
+        if not len(rows):
+            return None
+        before = rows[self.positions[rows] < position]
+        return int(self.offsets[before[-1] if len(before) else rows[0]])
+
+
+def _chromosome(line: bytes) -> int:
+    return chromosome_code(line.split(b"\t", 1)[0].decode("ascii", "replace"))
+
+
+def index_path(path: str | Path, cache_dir: str | Path | None = None) -> Path:
+    """Return where the :class:`BlockIndex` of ``path`` is cached.
+
+    The key is the resolved path, size and modification time, since hashing
+    a whole-genome file would cost as much as reading it.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    key = hashlib.sha256(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode()).hexdigest()
+    return Path(cache_dir or default_cache_dir()) / "vcf_index" / f"v{INDEX_VERSION}" / f"{key}.npz"
+
+
+def _locate_ids(reader: BGZFReader | PlainReader, rsids: Iterable[str]) -> dict[str, tuple[int, int]]:
+    """Find the ``(chromosome code, position)`` of ``rsids`` by the ``ID`` column, in one pass over the blocks."""
+    alternatives = b"|".join(re.escape(rsid.encode()) for rsid in sorted(rsids, key=len, reverse=True))
+    pattern = re.compile(rb"^([^\t\n#][^\t\n]*)\t(\d+)\t(?:[^\t\n;]*;)*(" + alternatives + rb")[;\t]", re.M)
+    found: dict[str, tuple[int, int]] = {}
+
+    def search(lines: bytes) -> None:
+        for match in pattern.finditer(lines):
+            found.setdefault(match[3].decode(), (chromosome_code(match[1].decode("ascii", "replace")), int(match[2])))
+
+    tail = b""
+    for _, data in reader.blocks():
+        buffer = tail + data
+        end = buffer.rfind(b"\n") + 1
+        search(buffer[:end])
+        tail = buffer[end:]
+    search(tail)
+    return found
+
+
+def id_loci(
+    reader: BGZFReader | PlainReader,
+    path: str | Path,
+    rsids: Iterable[str],
+    cache_dir: str | Path | None = None,
+) -> dict[str, tuple[int, int]]:
+    """Return the loci of ``rsids`` found by the VCF ``ID`` column, searching each rsid once per file.
+
+    The rsids searched for and the loci found are cached beside the
+    :class:`BlockIndex` of ``path``, so a miss is not searched for again.
+    """
+    rsids = list(rsids)
+    cached = index_path(path, cache_dir).with_suffix(".ids.json")
+    try:
+        data = json.loads(cached.read_text())
+        searched = set(data["searched"])
+        loci = {rsid: (code, position) for rsid, (code, position) in data["loci"].items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        searched, loci = set(), {}
+    missing = [rsid for rsid in rsids if rsid not in searched]
+    if missing:
+        loci.update(_locate_ids(reader, missing))
+        searched.update(missing)
+        try:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            staging = cached.with_name(f".{cached.name}.tmp")
+            staging.write_text(json.dumps({"searched": sorted(searched), "loci": loci}))
+            staging.replace(cached)
+        except OSError:
+            pass  # A read-only cache only costs another search next run.
+    return {rsid: loci[rsid] for rsid in rsids if rsid in loci}
+
+
+def call_genotype(fields: list[str], sample_column: int) -> str:
+    """Return the raw-file genotype of one VCF record's sample, ``--`` for a no-call."""
+    if len(fields) <= sample_column:
+        return "--"
+    keys = fields[8].split(":")
+    if "GT" not in keys:
+        return "--"
+    values = fields[sample_column].split(":")
+    position = keys.index("GT")
+    calls = GT_SEPARATOR.split(values[position]) if position < len(values) else ["."]
+    if any(not call.isdigit() for call in calls):
+        return "--"
+    alleles = [fields[3], *fields[4].split(",")]
+    chosen = [alleles[int(call)] if int(call) < len(alleles) else "<>" for call in calls]
+    if any(allele.startswith("<") or allele == "*" for allele in chosen):
+        return "--"
+    sequences = [allele for allele in alleles if not allele.startswith("<") and allele != "*"]
+    if all(len(allele) == 1 for allele in sequences):
+        return "".join(chosen)
+    shortest = min(len(allele) for allele in sequences)
+    return "".join("D" if len(allele) == shortest else "I" for allele in chosen)
+
+
+def _sample_column(header: Iterable[bytes], sample: str | None, path: Path) -> int:
+    for line in header:
+        if line.startswith(b"#CHROM"):
+            samples = line.decode("utf-8", "replace").split("\t")[9:]
+            if not samples:
+                raise ValueError(f"{path} has no sample columns")
+            if sample is None:
+                return 9
+            if sample not in samples:
+                raise ValueError(f"{path} has no sample {sample!r}; it has {', '.join(samples)}")
+            return 9 + samples.index(sample)
+        if not line.startswith(b"#"):
+            break
+    raise ValueError(f"{path} has no #CHROM header line")
+
+
+def _best(records: list[list[str]], rsid: str) -> list[str] | None:
+    """Pick the record for ``rsid`` among those at its position: same id, then SNV, then first."""
+    if not records:
+        return None
+    for record in records:
+        if rsid in record[2].split(";"):
+            return record
+    for record in records:
+        if len(record[3]) == 1 and all(len(alt) == 1 for alt in record[4].split(",")):
+            return record
+    return records[0]
+
+
+def _scan(lines: Iterator[bytes], code: int, position: int) -> list[list[str]]:
+    """Return the records at ``position`` from ``lines``, stopping once past it."""
+    found = []
+    for line in lines:
+        if not line or line.startswith(b"#"):
+            continue
+        head = line.split(b"\t", 2)
+        if len(head) < 3 or _chromosome(line) != code:
+            break
+        at = int(head[1])
+        if at > position:
+            break
+        if at == position:
+            found.append(line.decode("utf-8", "replace").split("\t"))
+    return found
+
+
+def load_vcf(
+    path: str | Path,
+    rsids: Iterable[str],
+    *,
+    loci: Mapping[str, tuple[str, int]] | None = None,
+    cache_dir: str | Path | None = None,
+    sample: str | None = None,
+    stats: dict | None = None,
+) -> GenotypeStore:
+    """Return a store with the panel ``rsids`` typed in the VCF at ``path``, found by position.
+
+    ``loci`` maps rsids to GRCh37 ``(chromosome, position)`` and defaults to
+    ``panel_loci.tsv``; rsids without a locus are found by the ``ID`` column
+    (see :func:`id_loci`).  ``sample`` picks a sample column by name (the
+    first one by default).  ``stats`` receives ``format``, ``access``
+    (``tabix``, ``index`` or ``scan``), ``blocks_read``,
+    ``markers_located_by_id`` and ``markers_without_locus``.
+    """
+    path = Path(path)
+    rsids = list(dict.fromkeys(rsids))
+    loci = load_panel_loci() if loci is None else loci
+    targets = {rsid: (chromosome_code(loci[rsid][0]), int(loci[rsid][1])) for rsid in rsids if rsid in loci}
+    unplaced = [rsid for rsid in rsids if rsid not in targets]
+    located_by_id = 0
+
+    bgzf = is_bgzf(path)
+    if bgzf or compression(path) is None:
+        with BGZFReader(path) if bgzf else PlainReader(path) as reader:
+            column = _sample_column(reader.lines(0), sample, path)
+            tabix = Path(f"{path}.tbi")
+            if bgzf and tabix.is_file():
+                index, access = TabixIndex.read(tabix), "tabix"
+            else:
+                cached = index_path(path, cache_dir)
+                if cached.is_file():
+                    index = BlockIndex.load(cached)
+                else:
+                    index = BlockIndex.build(reader)
+                    try:
+                        index.save(cached)
+                    except OSError:
+                        pass  # A read-only cache only costs a rebuild next run.
+                access = "index"
+            if unplaced:
+                by_id = id_loci(reader, path, unplaced, cache_dir)
+                targets.update(by_id)
+                located_by_id = len(by_id)
+            reader.blocks_read = 0
+            records = []
+            for rsid, (code, position) in targets.items():
+                start = index.start(code, position)
+                found = _scan(reader.lines(start), code, position) if start is not None else []
+                record = _best(found, rsid)
+                if record is not None:
+                    records.append((rsid, record[0].removeprefix("chr"), position, call_genotype(record, column)))
+            blocks_read = reader.blocks_read
+    else:
+        records = _scan_all(path, targets, sample, unplaced)
+        located_by_id = sum(1 for rsid, *_ in records if rsid not in targets)
+        access, blocks_read = "scan", 0
+    if stats is not None:
+        stats["format"] = "vcf"
+        stats["access"] = access
+        stats["blocks_read"] = blocks_read
+        stats["markers_located_by_id"] = located_by_id
+        stats["markers_without_locus"] = len(unplaced) - located_by_id
+    return GenotypeStore(records)
+
+
+def _scan_all(
+    path: Path,
+    targets: Mapping[str, tuple[int, int]],
+    sample: str | None,
+    unplaced: Iterable[str] = (),
+) -> list[tuple[str, str, int, str]]:
+    """Read a VCF that cannot be seeked into from start to end, keeping the ``targets``.
+
+    ``unplaced`` rsids are matched by the ``ID`` column on the same pass.
+    """
+    by_locus: dict[tuple[int, int], list[str]] = {}
+    for rsid, locus in targets.items():
+        by_locus.setdefault(locus, []).append(rsid)
+    found: dict[tuple[int, int], list[list[str]]] = {}
+    wanted_ids = set(unplaced)
+    found_by_id: dict[str, list[str]] = {}
+    column = None
+    with open_raw(path) as handle:
+        for line in handle:
+            if line.startswith("#"):
+                if line.startswith("#CHROM"):
+                    column = _sample_column([line.rstrip("\n").encode()], sample, path)
+                continue
+            head = line.split("\t", 2)
+            if len(head) < 3 or not head[1].isdigit():
+                continue
+            locus = (chromosome_code(head[0]), int(head[1]))
+            if locus in by_locus:
+                found.setdefault(locus, []).append(line.rstrip("\n").split("\t"))
+            if wanted_ids:
+                for rsid in wanted_ids.intersection(head[2].split("\t", 1)[0].split(";")):
+                    found_by_id.setdefault(rsid, line.rstrip("\n").split("\t"))
+    if column is None:
+        raise ValueError(f"{path} has no #CHROM header line")
+    records = []
+    for locus, rsids in by_locus.items():
+        for rsid in rsids:
+            record = _best(found.get(locus, []), rsid)
+            if record is not None:
+                records.append((rsid, record[0].removeprefix("chr"), locus[1], call_genotype(record, column)))
+    for rsid, record in found_by_id.items():
+        records.append((rsid, record[0].removeprefix("chr"), int(record[1]), call_genotype(record, column)))
+    return records
@@ -5,68 +5,72 @@ calculates a simple longevity probability based on those markers.
 """
 
 import sys
-import subprocess
+from pathlib import Path
 
-try:
-    import pandas as pd
-except ImportError:  # pragma: no cover - handled in runtime
-    print("pandas not found. Installing pandas...")
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "pandas"])
-    import pandas as pd
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from Gene_Analysis.genotype_store import GenotypeStore
+from Gene_Analysis.loader import stream_genome
+from Gene_Analysis.panels import load_registry
+from Gene_Analysis.prs import genotype_calls, longevity_effect
+from Gene_Analysis.report import marker_row
 
 
 def load_data():
-    """Load ``Genome.txt`` as a DataFrame."""
-    df = pd.read_csv("Genome.txt", sep="\t", comment="#", header=None)
-    df.columns = ["rsid", "chromosome", "position", "genotype"]
-    return df
+    """Load ``Genome.txt`` into a :class:`GenotypeStore`."""
+    return stream_genome("Genome.txt", panel_rsids())
 
 
-# Major longevity markers with simple weights
-LONGEVITY_SNPS = {
-    'rs2736100': {'risk': ['A'], 'weight': 0.15, 'description': 'TERT – Telomere maintenance'},
-    'rs7726159': {'risk': ['A'], 'weight': 0.12, 'description': 'TERT – Telomere length'},
-    'rs1317082': {'risk': ['A'], 'weight': 0.10, 'description': 'TERC – Telomere regulation'},
-    'rs1801133': {'risk': ['A'], 'weight': 0.19, 'description': 'MTHFR – Methylation cycle'},
-    'rs1042522': {'risk': ['C'], 'weight': 0.10, 'description': 'TP53 – DNA repair'},
-}
+def longevity_snps() -> list:
+    """Return the major longevity markers, with simple weights, of the shared panel registry."""
+    return [m for m in load_registry().panel('longevity').markers() if m.group == 'major']
 
 
-def genotype_effect(genotype: str, risk_allele: str) -> float:
-    """Calculate the effect of a genotype for a given risk allele."""
-    if risk_allele * 2 == genotype:
-        return 0.0
-    if risk_allele in genotype and len(genotype) == 2:
-        return 0.5
-    if genotype == risk_allele.replace('A', 'G') * 2:
-        return 1.0
-    return 0.3
+def panel_rsids() -> set:
+    """Return the rsids scored by this report."""
+    return {m.rsid for m in longevity_snps()}
 
 
-def main() -> None:
-    df = load_data()
+def main(store: GenotypeStore = None) -> list:
+    if store is None:
+        store = load_data()
 
     print("\n==============================")
     print("LONGEVITY MARKER SUMMARY")
     print("==============================\n")
 
-    total_weight = sum(snp['weight'] for snp in LONGEVITY_SNPS.values())
+    markers = longevity_snps()
+    total_weight = sum(snp.weight for snp in markers)
     score = 0.0
 
-    for rsid, info in LONGEVITY_SNPS.items():
-        row = df[df['rsid'] == rsid]
-        if not row.empty:
-            genotype = row.iloc[0]['genotype']
-            effect = genotype_effect(genotype, info['risk'][0])
-            contribution = effect * info['weight']
+    genotypes = store.lookup_many(m.rsid for m in markers)
+    calls, codes = genotype_calls(genotypes.get(m.rsid) for m in markers)
+    effects = longevity_effect(
+        codes,
+        np.array([m.allele for m in markers], dtype='S1'),
+    ).tolist()
+    rows = []
+    for info, genotype, effect in zip(markers, calls, effects):
+        rsid = info.rsid
+        if genotype is not None:
+            contribution = effect * info.weight
+            rows.append(marker_row('longevity', 'Longevity', rsid, genotype, info.description,
+                                   info.allele, info.weight, contribution))
             score += contribution
-            print(f"SNP: {rsid}  Genotype: {genotype}  Effect: {contribution:.3f}  {info['description']}")
+            print(f"SNP: {rsid}  Genotype: {genotype}  Effect: {contribution:.3f}  {info.description}")
         else:
-            print(f"SNP: {rsid} - NOT FOUND  {info['description']}")
+            rows.append(marker_row('longevity', 'Longevity', rsid, None, info.description,
+                                   info.allele, info.weight))
+            print(f"SNP: {rsid} - NOT FOUND  {info.description}")
 
     probability = (score / total_weight) * 100 if total_weight else 0
     print(f"\nLongevity probability: {probability:.1f}%")
     print("(Higher percentage suggests genetics associated with longer lifespan)")
+    return rows
 
 
 if __name__ == "__main__":  # pragma: no cover - manual execution
@@ -3,18 +3,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Iterable, Mapping, Optional
 
-
-def _effect(genotype: str, risk_allele: str) -> float:
-    """Return effect value for a given genotype."""
-    if risk_allele * 2 == genotype:
-        return 0.0
-    if risk_allele in genotype and len(genotype) == 2:
-        return 0.5
-    if genotype == risk_allele.replace('A', 'G') * 2:
-        return 1.0
-    return 0.3
+from Gene_Analysis.loader import open_raw, sniff_format
+from Gene_Analysis.prs import PRSEngine, genotype_array, longevity_effect
+from Gene_Analysis.raw_formats import parse_lines
 
 
 @dataclass
@@ -42,25 +35,55 @@ class LongevityAgingAnalyzer:
             }
 
     @staticmethod
-    def load_genome_data(file_path: str) -> Dict[str, str]:
-        """Load genotype file into a dictionary."""
+    def load_genome_data(
+        file_path: str,
+        rsids: Optional[Iterable[str]] = None,
+        compact: bool = False,
+    ) -> Mapping[str, str]:
+        """Load genotype file into a dictionary.
+
+        When ``rsids`` is given only those markers are kept and reading stops
+        once all of them have been seen.  Gzip, bzip2 and zip files are
+        decompressed as they are read, and the vendor layout is sniffed.
+        ``compact`` returns a ``CompactGenotypes`` mapping instead of a dict,
+        for whole genomes.
+        """
+        wanted = set(rsids) if rsids is not None else None
+        raw_format = sniff_format(file_path)
+        if compact:
+            from Gene_Analysis.compact_genotypes import CompactGenotypes
+
+            ids, genotypes = [], []
+            with open_raw(file_path) as f:
+                for rsid, _, _, genotype in parse_lines(f, raw_format):
+                    if wanted is not None and rsid not in wanted:
+                        continue
+                    ids.append(rsid)
+                    genotypes.append(genotype)
+            return CompactGenotypes.from_columns(ids, genotypes)
         data: Dict[str, str] = {}
-        with open(file_path, 'r') as f:
-            for line in f:
-                if not line.strip() or line.startswith('#'):
-                    continue
-                parts = line.split()
-                if len(parts) >= 2:
-                    data[parts[0]] = parts[1].strip()
+        with open_raw(file_path) as f:
+            for rsid, _, _, genotype in parse_lines(f, raw_format):
+                if wanted is not None:
+                    if rsid not in wanted:
+                        continue
+                    wanted.discard(rsid)
+                data[rsid] = genotype
+                if wanted is not None and not wanted:
+                    break
         return data
 
+    def panel_rsids(self) -> set:
+        """Return every rsid scored by this analyzer."""
+        return set(self.telomere_markers) | set(self.polygenic_markers)
+
     def analyze_telomere_length(self, genome: Dict[str, str]) -> Dict[str, float]:
+        typed = [snp for snp in self.telomere_markers if snp in genome]
+        effects = longevity_effect(genotype_array([genome[snp] for snp in typed]), b'A')
         score = 0.0
-        found = 0
-        for snp, weight in self.telomere_markers.items():
-            if snp in genome:
-                score += _effect(genome[snp], 'A') * weight
-                found += 1
+        for snp, effect in zip(typed, effects.tolist()):
+            score += effect * self.telomere_markers[snp]
+        found = len(typed)
         risk_level = 'Low'
         if score < 0.4:
             risk_level = 'High'
@@ -74,10 +97,11 @@ class LongevityAgingAnalyzer:
         }
 
     def calculate_polygenic_risk_score(self, genome: Dict[str, str]) -> Dict[str, float]:
-        score = 0.0
-        for snp, weight in self.polygenic_markers.items():
-            if snp in genome:
-                score += _effect(genome[snp], 'A' if snp != 'rs1042522' else 'C') * weight
+        engine = PRSEngine({'aging': [
+            (snp, 'A' if snp != 'rs1042522' else 'C', weight)
+            for snp, weight in self.polygenic_markers.items()
+        ]}, encoder=longevity_effect)
+        score = float(engine.score(genome).scores[0])
         normalized = score / self.total_markers
         risk = 'Low'
         if normalized < 0.4:
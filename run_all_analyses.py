@@ -31,6 +31,11 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Disable automatic evidence refresh when snapshot is stale.",
     )
+    parser.add_argument(
+        "--wait-for-refresh",
+        action="store_true",
+        help="Refresh evidence in this process and wait for it after writing the report.",
+    )
     parser.add_argument(
         "--json-output",
         default=None,
@@ -41,6 +46,33 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Optional explicit Markdown output path.",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record per-stage timings in the report metadata.",
+    )
+    parser.add_argument(
+        "--profile-output",
+        default=None,
+        help="Optional cProfile/pstats dump path (implies --profile).",
+    )
+    parser.add_argument(
+        "--evidence-source",
+        action="append",
+        default=[],
+        metavar="NAME=PATH",
+        help="Evidence source backed by a JSON Lines file; repeat for each source.",
+    )
+    parser.add_argument(
+        "--result-cache",
+        action="store_true",
+        help="Reuse stored results for a genome already analyzed against the same panels.",
+    )
+    parser.add_argument(
+        "--position-fallback",
+        action="store_true",
+        help="Find panel markers missing by rsid at their GRCh37 chromosome:position instead.",
+    )
     return parser
 
 
@@ -49,10 +81,22 @@ def main(argv: list[str] | None = None) -> int:
     cli_args = ["analyze", args.genome_file]
     if args.no_auto_update:
         cli_args.append("--no-auto-update")
+    if args.wait_for_refresh:
+        cli_args.append("--wait-for-refresh")
     if args.json_output:
         cli_args.extend(["--json-output", args.json_output])
     if args.markdown_output:
         cli_args.extend(["--markdown-output", args.markdown_output])
+    if args.profile:
+        cli_args.append("--profile")
+    if args.profile_output:
+        cli_args.extend(["--profile-output", args.profile_output])
+    for source in args.evidence_source:
+        cli_args.extend(["--evidence-source", source])
+    if args.result_cache:
+        cli_args.append("--result-cache")
+    if args.position_fallback:
+        cli_args.append("--position-fallback")
 
     cli_main = _load_cli_main()
     return int(cli_main(cli_args))
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache(tmp_path_factory, monkeypatch):
+    """Point the default cache folder away from the real ``~/.cache/gene_analysis``."""
+    monkeypatch.setenv('GENE_ANALYSIS_CACHE', str(tmp_path_factory.mktemp('default_cache')))
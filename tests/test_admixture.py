@@ -0,0 +1,104 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import json
+import time
+from unittest import mock
+
+import numpy as np
+import pytest
+from Gene_Analysis import batch, cli
+from Gene_Analysis.admixture import ReferencePanel, admix, admix_matrix
+
+POPULATIONS = ['AFR', 'EUR', 'EAS']
+
+
+def _reference(markers, seed=0):
+    rng = np.random.default_rng(seed)
+    frequencies = rng.beta(0.5, 0.5, size=(markers, len(POPULATIONS)))
+    return ReferencePanel([f'rs{900000 + j}' for j in range(markers)], ['A'] * markers, POPULATIONS, frequencies)
+
+
+def _genotypes(reference, proportions, seed=1):
+    """Draw one genome per row of ``proportions``, counting allele A against G."""
+    rng = np.random.default_rng(seed)
+    p = np.asarray(proportions) @ reference.frequencies.T
+    dosages = rng.binomial(2, p)
+    return np.array(['GG', 'AG', 'AA'], dtype='S2')[dosages]
+
+
+def test_recovers_proportions_of_a_cohort_quickly():
+    reference = _reference(20000)
+    truth = [[0.6, 0.3, 0.1], [0.0, 1.0, 0.0], [0.25, 0.25, 0.5]]
+    genotypes = _genotypes(reference, truth)
+    genotypes[0, :5000] = b'--'
+    start = time.perf_counter()
+    results = admix_matrix(reference, genotypes)
+    assert time.perf_counter() - start < 1.0
+    assert np.abs(np.array([r.proportions for r in results]) - truth).max() < 0.03
+    assert [r.markers_used for r in results] == [15000, 20000, 20000]
+    assert all(r.converged for r in results)
+    # A genome without any reference marker gets no estimate rather than the uniform start.
+    empty = admix(reference, {'rs1': 'AA'})
+    assert empty.proportions is None and empty.to_dict()['proportions'] is None
+
+
+def test_reference_tsv_and_npz_agree(tmp_path):
+    path = tmp_path / 'reference.tsv'
+    path.write_text('# toy panel\nrsid\tallele\tAFR\tEUR\nrs1\tA\t0.9\t0.1\nrs2\tC\t0.2\t0.7\n')
+    reference = ReferencePanel.load(path)
+    assert reference.populations == ['AFR', 'EUR'] and reference.rsids == ['rs1', 'rs2']
+    reference.save(tmp_path / 'reference.npz')
+    packed = ReferencePanel.load(tmp_path / 'reference.npz')
+    assert packed.rsids == reference.rsids and packed.alleles.tolist() == [b'A', b'C']
+    assert np.array_equal(packed.frequencies, reference.frequencies)
+    assert admix(packed, {'rs1': 'AA', 'rs2': 'GG'}).proportions[0] > 0.5
+
+    bad = tmp_path / 'bad.tsv'
+    bad.write_text('marker\tAFR\nrs1\t0.5\n')
+    with pytest.raises(ValueError):
+        ReferencePanel.load(bad)
+
+
+def _write_reference_and_genomes(tmp_path, samples):
+    reference = _reference(300)
+    path = tmp_path / 'reference.npz'
+    reference.save(path)
+    genomes = tmp_path / 'genomes'
+    genomes.mkdir()
+    for (name, proportions), row in zip(samples.items(), _genotypes(reference, list(samples.values()))):
+        lines = [f'{rsid}\t1\t{1000 + j}\t{g.decode()}\n' for j, (rsid, g) in enumerate(zip(reference.rsids, row))]
+        (genomes / f'{name}.txt').write_text('rs1426654\t15\t48134287\tAA\n' + ''.join(lines))
+    return path, genomes
+
+
+def test_analyze_reports_admixture(tmp_path):
+    reference, genomes = _write_reference_and_genomes(tmp_path, {'eur': [0.0, 1.0, 0.0]})
+    argv = ['analyze', str(genomes / 'eur.txt'), '--ancestry-reference', str(reference), '--profile',
+            '--json-output', str(tmp_path / 'r.json'), '--markdown-output', str(tmp_path / 'r.md')]
+    with mock.patch('builtins.print'):
+        assert cli.main(argv) == 0
+    report = json.loads((tmp_path / 'r.json').read_text())
+    admixture = report['metadata']['admixture']
+    assert admixture['reference'] == 'reference.npz' and admixture['markers_used'] == 300
+    assert admixture['proportions']['EUR'] > 0.9
+    stages = {s['stage']: s for s in report['metadata']['profile']['stages']}
+    assert stages['admixture']['markers_used'] == 300 and stages['load']['markers_found'] == 1
+    assert '## Ancestry Admixture' in (tmp_path / 'r.md').read_text()
+
+
+def test_batch_shares_the_reference_across_workers(tmp_path):
+    reference, genomes = _write_reference_and_genomes(
+        tmp_path, {'afr': [1.0, 0.0, 0.0], 'eas': [0.0, 0.0, 1.0], 'mix': [0.5, 0.5, 0.0]}
+    )
+    argv = ['analyze-batch', str(genomes), '--output-dir', str(tmp_path / 'out'),
+            '--ancestry-reference', str(reference), '--workers', '2']
+    with mock.patch('builtins.print'):
+        assert cli.main(argv) == 0
+    proportions = {
+        name: json.loads((tmp_path / 'out' / f'{name}.json').read_text())['metadata']['admixture']['proportions']
+        for name in ('afr', 'eas', 'mix')
+    }
+    assert proportions['afr']['AFR'] > 0.9 and proportions['eas']['EAS'] > 0.9
+    assert abs(proportions['mix']['AFR'] - 0.5) < 0.15
+    # Without a reference the reports carry no estimate.
+    batch.run_batch(genomes, tmp_path / 'plain')
+    assert 'admixture' not in json.loads((tmp_path / 'plain' / 'afr.json').read_text())['metadata']
@@ -0,0 +1,141 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import csv
+import functools
+import json
+from unittest import mock
+
+from Gene_Analysis import batch, cli
+from Gene_Analysis.loader import stream_genome
+
+GENOMES = {
+    'alice': """rs1815739\t11\t66560624\tCT
+rs429358\t19\t44908684\tCT
+rs1426654\t15\t48134287\tAA
+rs2736100\t5\t1286401\tGG
+""",
+    'bob': """rs1815739\t11\t66560624\tCC
+rs7412\t19\t44908822\tCC
+rs4988235\t2\t135851076\tAG
+""",
+}
+
+
+def _write_cohort(tmp_path):
+    directory = tmp_path / 'genomes'
+    directory.mkdir()
+    for sample, text in GENOMES.items():
+        (directory / f'{sample}.txt').write_text(text)
+    return directory
+
+
+def test_discover_genomes_from_manifest(tmp_path):
+    directory = _write_cohort(tmp_path)
+    manifest = tmp_path / 'cohort.tsv'
+    manifest.write_text('# cohort\nP1\tgenomes/alice.txt\n\ngenomes/bob.txt\n')
+    assert batch.discover_genomes(manifest) == [
+        ('P1', directory / 'alice.txt'),
+        ('bob', directory / 'bob.txt'),
+    ]
+    assert [s for s, _ in batch.discover_genomes(directory)] == ['alice', 'bob']
+
+
+def test_rerun_into_the_input_folder_skips_the_summary(tmp_path):
+    directory = _write_cohort(tmp_path)
+    batch.run_batch(directory, directory)
+    outcomes = batch.run_batch(directory, directory)
+    assert [o.sample_id for o in outcomes] == ['alice', 'bob']
+    assert [r['sample_id'] for r in _read_summary(directory)] == ['alice', 'bob']
+
+
+def test_batch_rows_match_single_analyze(tmp_path):
+    directory = _write_cohort(tmp_path)
+    out = tmp_path / 'out'
+    with mock.patch('builtins.print'):
+        assert cli.main(['analyze-batch', str(directory), '--output-dir', str(out)]) == 0
+        for sample in GENOMES:
+            cli.main([
+                'analyze', str(directory / f'{sample}.txt'),
+                '--json-output', str(tmp_path / f'{sample}.json'),
+                '--markdown-output', str(tmp_path / f'{sample}.md'),
+            ])
+    for sample in GENOMES:
+        single = json.loads((tmp_path / f'{sample}.json').read_text())
+        cohort = json.loads((out / f'{sample}.json').read_text())
+        assert cohort['rows'] == single['rows']
+        assert cohort['trait_summaries'] == single['trait_summaries']
+        assert (out / f'{sample}.md').is_file()
+
+
+def _read_summary(out):
+    with open(out / batch.SUMMARY_FILE, newline='') as handle:
+        return list(csv.DictReader(handle, delimiter='\t'))
+
+
+def test_cohort_summary_has_one_row_per_sample(tmp_path):
+    directory = _write_cohort(tmp_path)
+    batch.run_batch(directory, tmp_path / 'out')
+    rows = _read_summary(tmp_path / 'out')
+    assert [r['sample_id'] for r in rows] == ['alice', 'bob']
+    assert rows[0]['markers_found'] == '12'
+    assert float(rows[0]['fitness:Power & Strength']) == 0.4
+    assert float(rows[1]['fitness:Power & Strength']) == 0.8
+
+
+def test_process_pool_matches_serial_and_isolates_failures(tmp_path):
+    directory = _write_cohort(tmp_path)
+    manifest = tmp_path / 'cohort.tsv'
+    manifest.write_text('genomes/alice.txt\nghost\tgenomes/missing.txt\ngenomes/bob.txt\n')
+    serial = batch.run_batch(manifest, tmp_path / 'serial')
+    pooled = batch.run_batch(manifest, tmp_path / 'pooled', workers=2, chunk_size=1)
+    assert pooled == serial
+    assert [o.sample_id for o in pooled if o.error] == ['ghost']
+    assert 'FileNotFoundError' in pooled[1].error
+    rows = _read_summary(tmp_path / 'pooled')
+    assert [r['status'] for r in rows] == ['ok', 'failed', 'ok']
+    assert rows[1]['error'] == pooled[1].error
+    assert not (tmp_path / 'pooled' / 'ghost.json').exists()
+
+
+def test_cli_batch_reports_failures(tmp_path, capsys):
+    _write_cohort(tmp_path)
+    manifest = tmp_path / 'cohort.tsv'
+    manifest.write_text('genomes/alice.txt\nghost\tgenomes/missing.txt\n')
+    status = cli.main(['analyze-batch', str(manifest), '--output-dir', str(tmp_path / 'out'), '--workers', '2'])
+    assert status == 1
+    assert 'Failed ghost' in capsys.readouterr().err
+    assert [r['status'] for r in _read_summary(tmp_path / 'out')] == ['ok', 'failed']
+
+
+def _crashing_loader(crash_on, path, rsids):
+    if path.stem == crash_on:
+        os._exit(1)  # A worker dying outright, as under the OOM killer.
+    return stream_genome(path, rsids)
+
+
+def test_worker_crash_fails_only_its_chunk(tmp_path):
+    directory = _write_cohort(tmp_path)
+    for sample in ('carol', 'dave', 'erin'):
+        (directory / f'{sample}.txt').write_text(GENOMES['alice'])
+    load = functools.partial(_crashing_loader, 'carol')
+    outcomes = batch.run_batch(directory, tmp_path / 'out', load, workers=2, chunk_size=1)
+    assert [o.sample_id for o in outcomes] == ['alice', 'bob', 'carol', 'dave', 'erin']
+    assert [o.sample_id for o in outcomes if o.error] == ['carol']
+    assert 'BrokenProcessPool' in outcomes[2].error
+    assert outcomes[3].scores == outcomes[4].scores == outcomes[0].scores
+    assert [r['status'] for r in _read_summary(tmp_path / 'out')] == ['ok', 'ok', 'failed', 'ok', 'ok']
+
+
+def test_wide_calls_are_no_calls_in_analyze_and_batch(tmp_path):
+    directory = tmp_path / 'genomes'
+    directory.mkdir()
+    (directory / 'wide.txt').write_text(GENOMES['alice'] + 'rs7903146\t10\t114758349\tCTT\nrs1333049\t9\t22125503\tCCG\n')
+    with mock.patch('builtins.print'):
+        assert cli.main(['analyze-batch', str(directory), '--output-dir', str(tmp_path / 'out')]) == 0
+        assert cli.main(['analyze', str(directory / 'wide.txt'), '--json-output', str(tmp_path / 'wide.json'),
+                         '--markdown-output', str(tmp_path / 'wide.md')]) == 0
+    single = json.loads((tmp_path / 'wide.json').read_text())
+    cohort = json.loads((tmp_path / 'out' / 'wide.json').read_text())
+    assert cohort['rows'] == single['rows']
+    wide = [row for row in single['rows'] if row['rsid'] in ('rs7903146', 'rs1333049')]
+    assert {row['category'] for row in wide} >= {'disease'}
+    assert all(row['genotype'] == '--' and row['risk_allele_count'] in (0, None) for row in wide)
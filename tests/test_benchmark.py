@@ -0,0 +1,34 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import json
+from unittest import mock
+
+from Gene_Analysis import benchmark
+from Gene_Analysis.analyzers import panel_rsids
+from Gene_Analysis.loader import load_genome
+
+
+def test_synthetic_genome_holds_every_panel_marker(tmp_path):
+    genome = benchmark.write_synthetic_genome(tmp_path / 'genome.txt', 3000, panel_rsids(), seed=1)
+    store = load_genome(genome)
+    assert len(store) == 3000
+    assert panel_rsids() <= set(store)
+
+
+def test_find_regressions_uses_threshold():
+    result = benchmark.StageResult(0.2, 0.12, 10, 'rows/s', 5.0)
+    baseline = {'stages': {'load': {'seconds': 0.1, 'cpu_seconds': 0.1, 'peak_mb': 5.0}}}
+    assert benchmark.find_regressions({'load': result}, baseline, threshold=0.25) == []
+    assert len(benchmark.find_regressions({'load': result}, baseline, threshold=0.1)) == 1
+
+
+def test_baseline_round_trip(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    args = ['--rows', '2000', '--repeat', '1', '--workdir', str(tmp_path), '--baseline', str(baseline)]
+    with mock.patch('builtins.print'):
+        assert benchmark.main(args + ['--update-baseline']) == 0
+        recorded = json.loads(baseline.read_text())
+        assert {'load_stream', 'lookup', 'score_fitness', 'report'} <= set(recorded['stages'])
+        for stage in recorded['stages'].values():
+            stage['cpu_seconds'] = 1e-9
+        baseline.write_text(json.dumps(recorded))
+        assert benchmark.main(args) == 1
@@ -0,0 +1,172 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import json
+import subprocess
+from unittest import mock
+
+
+from Gene_Analysis import cli
+
+GENOME = """# rsid\tchromosome\tposition\tgenotype
+rs1815739\t11\t66560624\tCT
+rs429358\t19\t44908684\tCT
+rs1426654\t15\t48134287\tAA
+rs2736100\t5\t1286401\tGG
+"""
+
+
+def _write_genome(tmp_path):
+    genome = tmp_path / 'Genome.txt'
+    genome.write_text(GENOME)
+    return genome
+
+
+def test_analyze_parses_genome_once(tmp_path):
+    genome = _write_genome(tmp_path)
+    with mock.patch.object(cli, 'stream_genome', wraps=cli.stream_genome) as stream, \
+            mock.patch('builtins.print'):
+        status = cli.main([
+            'analyze', str(genome),
+            '--json-output', str(tmp_path / 'report.json'),
+            '--markdown-output', str(tmp_path / 'report.md'),
+        ])
+    assert status == 0
+    assert stream.call_count == 1
+    assert 'rs1815739' in stream.call_args.args[1]
+
+
+def test_analyze_writes_report(tmp_path):
+    genome = _write_genome(tmp_path)
+    with mock.patch('builtins.print'):
+        cli.main([
+            'analyze', str(genome),
+            '--json-output', str(tmp_path / 'report.json'),
+            '--markdown-output', str(tmp_path / 'report.md'),
+        ])
+    report = json.loads((tmp_path / 'report.json').read_text())
+    assert report['metadata']['markers_found'] == 12
+    assert {c['category'] for c in report['category_summaries']} == {
+        'ancestry', 'disease', 'fitness', 'longevity', 'prs',
+    }
+    fitness = [r for r in report['rows'] if r['category'] == 'fitness' and r['trait'] == 'Power & Strength']
+    actn3 = next(r for r in fitness if r['rsid'] == 'rs1815739')
+    assert actn3['risk_allele_count'] == 1
+    assert actn3['contribution'] == 0.40
+    assert '## SNP-Level Detail' in (tmp_path / 'report.md').read_text()
+
+
+def test_analyze_streams_rows_into_the_writer(tmp_path):
+    from Gene_Analysis import analyzers, report
+
+    genome = _write_genome(tmp_path)
+    written = []
+    started = {}
+    load_analyzer, add = analyzers.load_analyzer, report.ReportWriter.add
+
+    def load(name):
+        started[name] = len(written)
+        return load_analyzer(name)
+
+    def record(writer, row):
+        written.append(row['category'])
+        add(writer, row)
+
+    with mock.patch.object(analyzers, 'load_analyzer', load), \
+            mock.patch.object(report.ReportWriter, 'add', record), \
+            mock.patch('builtins.print'):
+        assert cli.main(['analyze', str(genome), '--json-output', str(tmp_path / 'r.json'),
+                         '--markdown-output', str(tmp_path / 'r.md')]) == 0
+    # Each analyzer's rows are written before the next one runs.
+    assert started['disease'] == written.count('ancestry') > 0
+    assert started['longevity'] < len(written)
+    assert json.loads((tmp_path / 'r.json').read_text())['metadata']['total_markers'] == len(written)
+
+
+def test_analyze_missing_file(tmp_path, capsys):
+    assert cli.main(['analyze', str(tmp_path / 'missing.txt')]) == 1
+
+
+def test_analyze_through_genome_cache(tmp_path):
+    genome = _write_genome(tmp_path)
+    cache_dir = tmp_path / 'cache'
+    with mock.patch('builtins.print'):
+        assert cli.main(['cache', str(genome), '--cache-dir', str(cache_dir)]) == 0
+        with mock.patch.object(cli, 'stream_genome') as stream:
+            cli.main([
+                'analyze', str(genome), '--genome-cache', '--cache-dir', str(cache_dir),
+                '--json-output', str(tmp_path / 'report.json'),
+                '--markdown-output', str(tmp_path / 'report.md'),
+            ])
+    assert not stream.called
+    report = json.loads((tmp_path / 'report.json').read_text())
+    assert report['metadata']['markers_found'] == 12
+
+
+
+def test_analyze_profile_metadata(tmp_path):
+    genome = _write_genome(tmp_path)
+    with mock.patch('builtins.print'):
+        cli.main([
+            'analyze', str(genome),
+            '--json-output', str(tmp_path / 'report.json'),
+            '--markdown-output', str(tmp_path / 'report.md'),
+            '--profile-output', str(tmp_path / 'run.pstats'),
+        ])
+    profile = json.loads((tmp_path / 'report.json').read_text())['metadata']['profile']
+    stages = {s['stage']: s for s in profile['stages']}
+    assert list(stages) == ['snapshot', 'load', 'ancestry', 'disease', 'fitness', 'longevity', 'report']
+    assert stages['snapshot']['refresh'] is None
+    assert stages['load']['rows_parsed'] == 4
+    assert stages['load']['markers_found'] == 4
+    assert stages['fitness']['markers_looked_up'] == 43
+    assert all(s['wall_seconds'] >= 0 and s['cpu_seconds'] >= 0 for s in profile['stages'])
+    assert (tmp_path / 'run.pstats').stat().st_size > 0
+
+
+def test_analyze_without_profile_has_no_profile_metadata(tmp_path):
+    genome = _write_genome(tmp_path)
+    with mock.patch('builtins.print'):
+        cli.main(['analyze', str(genome), '--json-output', str(tmp_path / 'r.json'),
+                  '--markdown-output', str(tmp_path / 'r.md')])
+    assert 'profile' not in json.loads((tmp_path / 'r.json').read_text())['metadata']
+
+def _run_python(code, cwd, **env):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True,
+                          env={**os.environ, 'PYTHONPATH': root, **env}, check=True)
+
+
+def test_help_skips_heavy_imports(tmp_path):
+    result = _run_python(
+        'import sys\n'
+        'from Gene_Analysis import cli\n'
+        'try:\n'
+        '    cli.main(["--help"])\n'
+        'except SystemExit:\n'
+        '    pass\n'
+        'print(sorted(m for m in ("numpy", "pandas") if m in sys.modules))\n',
+        tmp_path,
+    )
+    assert result.stdout.strip().endswith('[]')
+
+
+def test_importing_analyzers_has_no_side_effects(tmp_path):
+    cwd, home, cache = tmp_path / 'cwd', tmp_path / 'home', tmp_path / 'cache'
+    for directory in (cwd, home, cache):
+        directory.mkdir()
+    result = _run_python(
+        'import importlib.util, sys\n'
+        'from Gene_Analysis import panels\n'
+        'from Gene_Analysis.analyzers import ANALYZER_SCRIPTS, REPO_ROOT, load_analyzer\n'
+        'for name in ANALYZER_SCRIPTS:\n'
+        '    load_analyzer(name)\n'
+        'for script in ("Disease Testing/Disease.py", "Longevity/Longevity.py"):\n'
+        '    spec = importlib.util.spec_from_file_location("script", REPO_ROOT / script)\n'
+        '    spec.loader.exec_module(importlib.util.module_from_spec(spec))\n'
+        'assert "pandas" not in sys.modules\n'
+        'assert not panels._registries\n',
+        cwd,
+        HOME=str(home),
+        GENE_ANALYSIS_CACHE=str(cache),
+    )
+    assert result.stdout == ''
+    assert [list(d.iterdir()) for d in (cwd, home, cache)] == [[], [], []]
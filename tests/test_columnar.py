@@ -0,0 +1,56 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from unittest import mock
+
+import pytest
+
+from Gene_Analysis import batch, columnar
+from Gene_Analysis.report import build_report, marker_row
+
+REPORT = build_report([
+    marker_row('fitness', 'Power', 'rs1815739', 'CT', 'ACTN3', 'C', 0.3, 0.3),
+    marker_row('fitness', 'Power', 'rs4343', None, 'ACE', 'G', 0.2, None),
+    marker_row('ancestry', 'Eye Color', 'rs12913832', 'AG', 'HERC2/OCA2'),
+], 'genome.txt')
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_appends_accumulate_in_a_partitioned_dataset(tmp_path, fmt):
+    pa = pytest.importorskip('pyarrow')
+    ds = pytest.importorskip('pyarrow.dataset')
+    columnar.append_reports(tmp_path, [('s1', REPORT), ('s2', REPORT)], fmt)
+    columnar.append_reports(tmp_path, [('s3', REPORT)], fmt)
+    assert sorted(p.name for p in (tmp_path / 'rows').iterdir()) == ['category=ancestry', 'category=fitness']
+
+    rows = columnar.read_table(tmp_path, 'rows', fmt)
+    assert rows.num_rows == 9
+    for name in ('sample_id', 'category', 'trait', 'rsid', 'description'):
+        assert pa.types.is_dictionary(rows.schema.field(name).type)
+    fitness = columnar.read_table(tmp_path, 'trait_summaries', fmt, ds.field('category') == 'fitness')
+    assert sorted(fitness.column('sample_id').to_pylist()) == ['s1', 's2', 's3']
+    assert fitness.column('score').to_pylist() == [0.3] * 3
+    record = rows.filter(ds.field('rsid') == 'rs4343').to_pylist()[0]
+    assert record['genotype'] is None and record['weight'] == 0.2
+
+
+def test_batch_appends_every_sample(tmp_path):
+    pytest.importorskip('pyarrow')
+    (tmp_path / 'cohort').mkdir()
+    for sample in ('alice', 'bob'):
+        (tmp_path / 'cohort' / f'{sample}.txt').write_text('rs1815739\t11\t66560624\tCT\n')
+    output = batch.ReportOutput(columnar_dir=tmp_path / 'dataset')
+    outcomes = batch.run_batch(tmp_path / 'cohort', tmp_path / 'out', output=output)
+    assert all(o.error is None for o in outcomes)
+    summaries = columnar.read_table(tmp_path / 'dataset', 'category_summaries')
+    assert sorted(set(summaries.column('sample_id').to_pylist())) == ['alice', 'bob']
+
+
+def test_missing_pyarrow_fails_the_chunk_not_the_batch(tmp_path):
+    (tmp_path / 'cohort').mkdir()
+    (tmp_path / 'cohort' / 'alice.txt').write_text('rs1815739\t11\t66560624\tCT\n')
+    output = batch.ReportOutput(columnar_dir=tmp_path / 'dataset')
+    with mock.patch.dict(sys.modules, {'pyarrow': None, 'pyarrow.dataset': None}):
+        with pytest.raises(ImportError, match='pip install pyarrow'):
+            columnar.schema('rows')
+        [outcome] = batch.run_batch(tmp_path / 'cohort', tmp_path / 'out', output=output)
+    assert 'pyarrow' in outcome.error
+    assert (tmp_path / 'out' / 'alice.json').is_file()
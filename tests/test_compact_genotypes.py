@@ -0,0 +1,90 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from Gene_Analysis.compact_genotypes import NO_CALL, OTHER_CODE, CompactGenotypes, encode_genotypes
+from Gene_Analysis.genome_cache import build_cache
+from Gene_Analysis.loader import load_genome
+from Longevity_Aging import LongevityAgingAnalyzer
+
+GENOME = """# rsid\tchromosome\tposition\tgenotype
+rs3934834\t1\t995669\tCT
+i6000001\tX\t2700157\tA
+VG01S1\t2\t1000\tGG
+rs3094315\t1\t742429\tAA
+rs12562034\tMT\t758311\t--
+rs4000\t3\t5000\tDI
+rs4001\t3\t5001\tACG
+"""
+
+
+def _write(tmp_path, text=GENOME):
+    path = tmp_path / 'Genome.txt'
+    path.write_text(text)
+    return path
+
+
+def test_compact_matches_the_dict_loader(tmp_path):
+    source = _write(tmp_path)
+    store = load_genome(source)
+    compact = load_genome(source, compact=True)
+    # Wider calls are no calls, as the scoring kernels read them.
+    assert dict(compact) == {**dict(store), 'rs4001': '--'}
+    assert compact['i6000001'] == 'A' and compact['VG01S1'] == 'GG'
+    assert compact['rs4000'] == 'DI' and compact['rs4001'] == '--'
+    assert 'rs1' not in compact and 'nonsense' not in compact
+    with pytest.raises(KeyError):
+        compact['rs1']
+    cache = build_cache(source, tmp_path / 'cache')
+    assert dict(cache.to_compact()) == dict(cache.to_store())
+
+
+def test_lookup_codes_flags_missing_and_side_table_markers():
+    compact = CompactGenotypes.from_columns(['rs2', 'rs1', 'rs2', 'rs3', 'odd'], ['AG', 'T', 'CC', 'II', 'AA'])
+    assert compact['rs2'] == 'AG'
+    codes, found = compact.lookup_codes(['rs1', 'rs2', 'rs9', 'rs3', 'odd'])
+    assert found.tolist() == [True, True, False, True, True]
+    assert codes[3] == codes[4] == OTHER_CODE
+    assert compact.lookup_many(['rs1', 'rs9', 'odd']) == {'rs1': 'T', 'odd': 'AA'}
+
+
+def test_wide_calls_encode_as_no_calls():
+    # An S2 cast would read these as AG and CC.
+    codes = encode_genotypes(np.array(['AGT', 'AG', 'CCC', '']))
+    assert codes[0] == codes[2] == NO_CALL << 4 and codes[1] != codes[0]
+    compact = CompactGenotypes.from_arrays(np.array([1, 2]), np.array(['AGT', 'GG'], dtype=object))
+    assert dict(compact) == {'rs1': '--', 'rs2': 'GG'}
+
+
+def test_longevity_analyzer_scores_compact_genomes(tmp_path):
+    analyzer = LongevityAgingAnalyzer()
+    markers = sorted(analyzer.panel_rsids())
+    path = tmp_path / 'genome.txt'
+    path.write_text(''.join(f'{rsid}\t{"AG" if i % 2 else "CC"}\n' for i, rsid in enumerate(markers)))
+    plain = analyzer.load_genome_data(str(path))
+    compact = analyzer.load_genome_data(str(path), compact=True)
+    assert isinstance(compact, CompactGenotypes)
+    assert analyzer.analyze_telomere_length(compact) == analyzer.analyze_telomere_length(plain)
+    assert analyzer.calculate_polygenic_risk_score(compact) == analyzer.calculate_polygenic_risk_score(plain)
+
+
+def test_compact_uses_a_tenth_of_the_memory():
+    rng = np.random.default_rng(0)
+    numbers = rng.choice(50_000_000, 100_000, replace=False).tolist()
+    calls = rng.choice(['AA', 'AC', 'CT', 'GG', 'AG', 'TT'], len(numbers)).tolist()
+
+    tracemalloc.start()
+    # What parsing a text file into a dict allocates: key, value and entry.
+    plain = {f'rs{n}': call[0] + call[1] for n, call in zip(numbers, calls)}
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    compact = CompactGenotypes.from_columns(plain.keys(), plain.values())
+    compact_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert compact == plain
+    assert compact.nbytes * 10 < dict_bytes
+    assert compact_bytes * 10 < dict_bytes
@@ -0,0 +1,207 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+
+from Gene_Analysis import cli
+from Gene_Analysis.evidence import EvidenceStore, FileSource, RefreshInFlight, parse_sources
+
+RSIDS = [f'rs{i}' for i in range(1, 11)]
+
+
+def _jsonl(path, rsids, note):
+    path.write_text(''.join(json.dumps({'rsid': r, 'note': note}) + '\n' for r in rsids))
+    return path
+
+
+class CountingSource:
+    """In-memory source that records calls and the peak number of pages in flight."""
+
+    def __init__(self, name, fail_on=None):
+        self.name = name
+        self.fail_on = fail_on
+        self.calls = []
+        self.in_flight = self.peak = 0
+
+    async def fetch(self, rsids):
+        self.calls.append(rsids)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if self.fail_on in rsids:
+            raise ConnectionError('upstream went away')
+        return {rsid: {'rsid': rsid} for rsid in rsids}
+
+
+def test_refresh_publishes_a_snapshot(tmp_path):
+    store = EvidenceStore(tmp_path)
+    assert store.current() is None and store.needs_refresh()
+    clinvar = FileSource('ClinVar', _jsonl(tmp_path / 'clinvar.jsonl', RSIDS[:3], 'pathogenic'))
+    snapshot = asyncio.run(store.refresh([clinvar], RSIDS, page_size=2))
+    assert store.current() == snapshot
+    assert snapshot.sources == ['ClinVar'] and not snapshot.is_stale()
+    assert snapshot.is_stale(datetime.now(timezone.utc) + timedelta(days=31))
+    assert sorted(snapshot.records('ClinVar')) == ['rs1', 'rs2', 'rs3']
+    assert snapshot.metadata()['snapshot_id'] == snapshot.snapshot_id
+    assert not (tmp_path / 'staging').exists() or not any((tmp_path / 'staging').iterdir())
+
+
+def test_fetches_are_bounded_and_resumable(tmp_path):
+    store = EvidenceStore(tmp_path)
+    flaky = CountingSource('dbSNP', fail_on='rs7')
+    with pytest.raises(ConnectionError):
+        asyncio.run(store.refresh([flaky], RSIDS, page_size=1, concurrency=3))
+    assert flaky.peak == 3
+    assert store.current() is None
+
+    steady = CountingSource('dbSNP')
+    snapshot = asyncio.run(store.refresh([steady], RSIDS, page_size=1, concurrency=3))
+    assert len(steady.calls) < len(RSIDS)
+    assert ['rs7'] in steady.calls
+    assert len(snapshot.records('dbSNP')) == len(RSIDS)
+
+
+def test_current_snapshot_serves_until_the_swap(tmp_path):
+    store = EvidenceStore(tmp_path)
+    first = asyncio.run(store.refresh([CountingSource('gnomAD')], RSIDS))
+    gate = threading.Event()
+
+    class GatedSource(CountingSource):
+        async def fetch(self, rsids):
+            await asyncio.to_thread(gate.wait)
+            return await super().fetch(rsids)
+
+    thread = store.refresh_in_background([GatedSource('gnomAD')], RSIDS)
+    assert store.current() == first
+    gate.set()
+    thread.join(5)
+    second = store.current()
+    assert second.snapshot_id != first.snapshot_id
+    third = asyncio.run(store.refresh([CountingSource('gnomAD')], RSIDS))
+    remaining = sorted(p.name for p in (tmp_path / 'snapshots').iterdir())
+    assert remaining == sorted([second.snapshot_id, third.snapshot_id])
+
+
+def test_concurrent_refreshes_of_one_job_both_publish(tmp_path):
+    class SlowSource(CountingSource):
+        async def fetch(self, rsids):
+            await asyncio.sleep(0.05)
+            return await super().fetch(rsids)
+
+    async def both():
+        return await asyncio.gather(
+            EvidenceStore(tmp_path).refresh([CountingSource('dbSNP')], RSIDS, page_size=2),
+            EvidenceStore(tmp_path).refresh([SlowSource('dbSNP')], RSIDS, page_size=2),
+        )
+
+    fast, slow = asyncio.run(both())
+    assert fast.snapshot_id != slow.snapshot_id
+    assert EvidenceStore(tmp_path).current() == slow
+    assert len(fast.records('dbSNP')) == len(slow.records('dbSNP')) == len(RSIDS)
+    assert not (tmp_path / 'staging').exists() or not any((tmp_path / 'staging').iterdir())
+
+
+def test_failures_are_recorded_and_surfaced(tmp_path):
+    store = EvidenceStore(tmp_path)
+    thread = store.refresh_in_background([CountingSource('dbSNP', fail_on='rs3')], RSIDS)
+    thread.join(5)
+    assert isinstance(thread.error, ConnectionError) and thread.snapshot is None
+    assert store.last_failure()['error'] == 'ConnectionError: upstream went away'
+
+    source = FileSource('ClinVar', _jsonl(tmp_path / 'clinvar.jsonl', RSIDS[:2], 'benign'))
+    process = store.refresh_detached([source], RSIDS)
+    assert process.wait(30) == 0
+    assert not (tmp_path / 'REFRESH_RUNNING').exists()
+    assert store.last_failure() is None and sorted(store.current().records('ClinVar')) == ['rs1', 'rs2']
+    missing = store.refresh_detached([FileSource('ClinVar', tmp_path / 'missing.jsonl')], RSIDS)
+    assert missing.wait(30) == 1
+    assert 'FileNotFoundError' in store.last_failure()['error']
+
+
+def test_analyze_refreshes_in_the_background(tmp_path):
+    genome = tmp_path / 'genome.txt'
+    genome.write_text('rs1815739\t11\t66560624\tCT\n')
+    source = f"ClinVar={_jsonl(tmp_path / 'clinvar.jsonl', ['rs1815739'], 'benign')}"
+    argv = ['analyze', str(genome), '--cache-dir', str(tmp_path / 'cache'), '--evidence-source', source,
+            '--json-output', str(tmp_path / 'r.json'), '--markdown-output', str(tmp_path / 'r.md'),
+            '--result-cache']
+    with mock.patch('builtins.print'), mock.patch.object(EvidenceStore, 'refresh_detached') as detached:
+        assert cli.main(argv) == 0
+        assert detached.call_count == 1  # Started in its own process; analyze does not wait.
+        assert cli.main(argv + ['--wait-for-refresh']) == 0
+        first = json.loads((tmp_path / 'r.json').read_text())['metadata']
+        assert cli.main(argv) == 0
+    second = json.loads((tmp_path / 'r.json').read_text())['metadata']
+    assert 'snapshot_id' not in first
+    snapshot = EvidenceStore(tmp_path / 'cache' / 'evidence').current()
+    assert second['snapshot_id'] == snapshot.snapshot_id
+    assert snapshot.records('ClinVar')['rs1815739']['note'] == 'benign'
+    # The evidence does not change any score, so the cached result survives the new snapshot.
+    assert len(list((tmp_path / 'cache' / 'results').rglob('*.json'))) == 1
+    assert detached.call_count == 1
+
+
+def test_analyze_reports_a_failed_refresh(tmp_path, capsys):
+    genome = tmp_path / 'genome.txt'
+    genome.write_text('rs1815739\t11\t66560624\tCT\n')
+    argv = ['analyze', str(genome), '--cache-dir', str(tmp_path / 'cache'), '--wait-for-refresh',
+            '--evidence-source', f"ClinVar={tmp_path / 'missing.jsonl'}",
+            '--json-output', str(tmp_path / 'r.json'), '--markdown-output', str(tmp_path / 'r.md')]
+    assert cli.main(argv + ['--profile']) == 1
+    captured = capsys.readouterr()
+    assert 'Evidence refresh failed: FileNotFoundError' in captured.err
+    assert 'snapshot_refresh' in captured.out and 'failed=True' in captured.out
+    stages = {s['stage']: s for s in json.loads((tmp_path / 'r.json').read_text())['metadata']['profile']['stages']}
+    assert stages['snapshot']['refresh'] == 'thread'
+    assert stages['snapshot_refresh']['failed'] is True
+    assert cli.main(argv + ['--no-auto-update']) == 0
+    assert 'the evidence refresh at' in capsys.readouterr().err
+
+
+def test_parallel_analyze_runs_start_one_refresh(tmp_path):
+    genome = tmp_path / 'genome.txt'
+    genome.write_text('rs1815739\t11\t66560624\tCT\n')
+    source = f"ClinVar={_jsonl(tmp_path / 'clinvar.jsonl', ['rs1815739'], 'benign')}"
+    argv = ['analyze', str(genome), '--cache-dir', str(tmp_path / 'cache'), '--evidence-source', source,
+            '--json-output', str(tmp_path / 'r.json'), '--markdown-output', str(tmp_path / 'r.md')]
+    # The spawned refresh is still running (a live pid other than ours holds the lock).
+    running = mock.Mock(pid=os.getppid())
+    with mock.patch('builtins.print'), mock.patch('subprocess.Popen', return_value=running) as popen:
+        assert cli.main(argv) == 0
+        assert cli.main(argv) == 0
+    assert popen.call_count == 1
+    store = EvidenceStore(tmp_path / 'cache' / 'evidence')
+    assert store.refresh_holder() == os.getppid()
+    with pytest.raises(RefreshInFlight):
+        asyncio.run(store.refresh([CountingSource('dbSNP')], RSIDS))
+    # Once that process is gone its lock is stale and the next refresh takes it over.
+    (store.directory / 'REFRESH_RUNNING').write_text('999999999')
+    assert asyncio.run(store.refresh([CountingSource('dbSNP')], RSIDS)) == store.current()
+    assert not (store.directory / 'REFRESH_RUNNING').exists()
+
+
+def test_source_specs_are_validated():
+    assert parse_sources(['gnomAD=/data/gnomad.jsonl'])[0].name == 'gnomAD'
+    with pytest.raises(ValueError):
+        parse_sources(['gnomad.jsonl'])
+
+
+def test_batch_reports_carry_the_snapshot(tmp_path):
+    snapshot = asyncio.run(EvidenceStore(tmp_path / 'cache' / 'evidence').refresh([CountingSource('gnomAD')], RSIDS))
+    genomes = tmp_path / 'genomes'
+    genomes.mkdir()
+    for name in ('alice', 'bob'):
+        (genomes / f'{name}.txt').write_text('rs1815739\t11\t66560624\tCT\n')
+    argv = ['analyze-batch', str(genomes), '--output-dir', str(tmp_path / 'out'),
+            '--cache-dir', str(tmp_path / 'cache'), '--result-cache', '--workers', '2']
+    with mock.patch('builtins.print'):
+        assert cli.main(argv) == 0
+        assert cli.main(argv) == 0
+    for name in ('alice', 'bob'):
+        metadata = json.loads((tmp_path / 'out' / f'{name}.json').read_text())['metadata']
+        assert metadata['snapshot_id'] == snapshot.snapshot_id
@@ -1,17 +1,12 @@
 import importlib.util
 import pathlib
-import pandas as pd
-from unittest import mock
 
-# Load module from file path with patched pandas and print to avoid heavy output
+# Load module from file path; importing it has no side effects
 module_name = 'Fitness_Athletics'
 module_path = pathlib.Path(__file__).resolve().parents[1] / f'{module_name}.py'
 spec = importlib.util.spec_from_file_location(module_name, module_path)
-
-with mock.patch('pandas.read_csv') as read_csv, mock.patch('builtins.print'):
-    read_csv.return_value = pd.DataFrame({'rsid': [], 'chromosome': [], 'position': [], 'genotype': []})
-    Fitness_Athletics = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(Fitness_Athletics)
+Fitness_Athletics = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(Fitness_Athletics)
 
 calculate_probability = Fitness_Athletics.calculate_probability
 
@@ -0,0 +1,69 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from unittest import mock
+
+import numpy as np
+from Gene_Analysis import genome_cache
+from Gene_Analysis.genome_cache import build_cache, cache_path, load_cached_genome, open_cache
+from Gene_Analysis.loader import load_genome
+
+GENOME = """# rsid\tchromosome\tposition\tgenotype
+rs3934834\t1\t995669\tCT
+i6000001\tX\t2700157\tA
+rs3094315\t1\t742429\tAA
+rs12562034\tMT\t758311\t--
+rs3094315\t1\t742429\tGG
+"""
+
+
+def _write(tmp_path, text=GENOME):
+    path = tmp_path / 'Genome.txt'
+    path.write_text(text)
+    return path
+
+
+def test_cache_round_trip_matches_text_loader(tmp_path):
+    source = _write(tmp_path)
+    cache = build_cache(source, tmp_path / 'cache')
+    assert len(cache) == 4
+    assert cache.to_store(with_loci=True) == load_genome(source)
+    store = load_cached_genome(source, ['rs12562034', 'i6000001', 'rs0'],
+                               cache_dir=tmp_path / 'cache', with_loci=True)
+    assert dict(store) == {'rs12562034': '--', 'i6000001': 'A'}
+    assert store.record('i6000001').chromosome == 'X'
+    assert store.record('rs12562034').chromosome == 'MT'
+
+
+def test_cache_reuses_entry_and_invalidates_on_change(tmp_path):
+    source = _write(tmp_path)
+    first = open_cache(source, tmp_path / 'cache')
+    assert open_cache(source, tmp_path / 'cache').directory == first.directory
+    _write(tmp_path, GENOME.replace('995669\tCT', '995669\tTT'))
+    assert cache_path(source, tmp_path / 'cache') != first.directory
+    assert load_cached_genome(source, ['rs3934834'], cache_dir=tmp_path / 'cache')['rs3934834'] == 'TT'
+
+
+def test_default_cache_dir_follows_the_environment(tmp_path, monkeypatch):
+    source = _write(tmp_path)
+    monkeypatch.setenv('GENE_ANALYSIS_CACHE', str(tmp_path / 'env'))
+    assert open_cache(source).directory.parent.parent == tmp_path / 'env'
+
+
+def test_concurrent_builders_keep_the_published_entry(tmp_path):
+    source = _write(tmp_path)
+    save = np.save
+    other = []
+
+    def racing_save(path, array):
+        # A second builder publishes the entry while the first is still staging.
+        if not other:
+            with mock.patch.object(genome_cache.np, 'save', save):
+                entry = genome_cache.build_cache(source, tmp_path / 'cache').directory
+                other.extend([entry, (entry / 'metadata.json').stat().st_ino])
+        save(path, array)
+
+    with mock.patch.object(genome_cache.np, 'save', racing_save):
+        cache = build_cache(source, tmp_path / 'cache')
+    assert cache.directory == other[0]
+    assert (cache.directory / 'metadata.json').stat().st_ino == other[1]
+    assert len(cache) == 4
+    assert [p.name for p in cache.directory.parent.iterdir()] == [cache.directory.name]
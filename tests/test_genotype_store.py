@@ -0,0 +1,37 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import pandas as pd
+from Gene_Analysis.genotype_store import GenotypeRecord, GenotypeStore
+
+
+SAMPLE_ROWS = [
+    ('rs3094315', '1', 742429, 'AA'),
+    ('rs12562034', '1', 758311, 'GG'),
+    ('rs3934834', '1', 995669, 'CT'),
+    ('rs3094315', '1', 742429, 'GG'),
+]
+
+
+def test_lookup_is_first_occurrence():
+    store = GenotypeStore(SAMPLE_ROWS)
+    assert len(store) == 3
+    assert store['rs3094315'] == 'AA'
+    assert 'rs3934834' in store
+    assert store.get('rs0') is None
+
+
+def test_lookup_many_skips_missing_and_keeps_order():
+    store = GenotypeStore(SAMPLE_ROWS)
+    result = store.lookup_many(['rs3934834', 'rs0', 'rs3094315'])
+    assert list(result.items()) == [('rs3934834', 'CT'), ('rs3094315', 'AA')]
+
+
+def test_from_dataframe_keeps_loci():
+    df = pd.DataFrame(SAMPLE_ROWS, columns=['rsid', 'chromosome', 'position', 'genotype'])
+    store = GenotypeStore.from_dataframe(df)
+    assert store.record('rs12562034') == GenotypeRecord('rs12562034', '1', 758311, 'GG')
+    assert store.record('rs0') is None
+
+
+def test_store_compares_equal_to_plain_dict():
+    genotypes = {'rs1': 'AG', 'rs2': 'CC'}
+    assert GenotypeStore.from_genotypes(genotypes) == genotypes
@@ -0,0 +1,73 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import bz2
+import gzip
+import zipfile
+
+import pytest
+from Gene_Analysis.genome_cache import load_cached_genome
+from Gene_Analysis.loader import filter_genome_lines, genome_stem, load_genome, open_raw, stream_genome
+
+GENOME = """# rsid\tchromosome\tposition\tgenotype
+rs3094315\t1\t742429\tAA
+rs12562034\t1\t758311\tGG
+rs3934834\t1\t995669\tCT
+"""
+
+
+def test_load_genome_keeps_every_marker(tmp_path):
+    path = tmp_path / 'Genome.txt'
+    path.write_text(GENOME)
+    store = load_genome(path, with_loci=True)
+    assert dict(store) == {'rs3094315': 'AA', 'rs12562034': 'GG', 'rs3934834': 'CT'}
+    assert store.record('rs3934834').position == 995669
+
+
+def test_stream_genome_keeps_only_panel(tmp_path):
+    path = tmp_path / 'Genome.txt'
+    path.write_text(GENOME)
+    store = stream_genome(path, ['rs3934834', 'rs0'])
+    assert dict(store) == {'rs3934834': 'CT'}
+
+
+def test_filter_stops_once_panel_is_complete():
+    def lines():
+        yield '# header\n'
+        yield 'rs1\t1\t100\tAG\n'
+        yield 'rs2\t1\t200\tCC\n'
+        pytest.fail('read past the last panel rsid')
+
+    store = filter_genome_lines(lines(), {'rs2', 'rs1'}, with_loci=True)
+    assert store.record('rs2').chromosome == '1'
+    assert dict(store) == {'rs1': 'AG', 'rs2': 'CC'}
+
+
+def test_stream_genome_reports_rows_parsed(tmp_path):
+    path = tmp_path / 'Genome.txt'
+    path.write_text(GENOME)
+    stats = {}
+    stream_genome(path, {'rs12562034'}, stats=stats)
+    assert stats == {'format': '23andme', 'rows_parsed': 2}
+
+
+def test_compressed_downloads_are_read_directly(tmp_path):
+    gz = tmp_path / 'genome.txt.gz'
+    gz.write_bytes(gzip.compress(GENOME.encode()))
+    bz = tmp_path / 'genome.bz2'
+    bz.write_bytes(bz2.compress(GENOME.encode()))
+    archive = tmp_path / 'genome_Jane_Doe_v5_Full.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('__MACOSX/._genome.txt', 'x' * 1000)
+        zf.writestr('README.txt', 'x' * 1000)
+        zf.writestr('genome_Jane_Doe_v5_Full.txt', GENOME)
+    # A misleading suffix does not matter: the magic bytes decide.
+    renamed = tmp_path / 'Genome.txt'
+    renamed.write_bytes(gzip.compress(GENOME.encode()))
+
+    expected = {'rs3094315': 'AA', 'rs12562034': 'GG', 'rs3934834': 'CT'}
+    for path in (gz, bz, archive, renamed):
+        assert dict(load_genome(path)) == expected
+        assert dict(stream_genome(path, ['rs3934834'])) == {'rs3934834': 'CT'}
+        assert dict(load_cached_genome(path, ['rs3094315'], cache_dir=tmp_path / 'cache')) == {'rs3094315': 'AA'}
+        with open_raw(path) as handle:
+            assert handle.read() == GENOME
+    assert genome_stem(gz) == 'genome' and genome_stem(archive) == 'genome_Jane_Doe_v5_Full'
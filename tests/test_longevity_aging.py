@@ -40,3 +40,13 @@ def test_calculate_polygenic_risk_score():
     assert result['overall_aging_risk'] == 'High'
     assert pytest.approx(result['aging_rate_probability'], rel=1e-6) == 1 - (0.305 / 25)
 
+
+
+def test_load_genome_data_keeps_only_requested(tmp_path):
+    sample_file = tmp_path / 'sample.txt'
+    with open(sample_file, 'w') as f:
+        for snp, gt in SAMPLE_GENOME.items():
+            f.write(f"{snp} {gt}\n")
+    analyzer = LongevityAgingAnalyzer()
+    data = analyzer.load_genome_data(str(sample_file), ['rs7726159', 'rs1042522'])
+    assert data == {'rs7726159': 'AG', 'rs1042522': 'AA'}
@@ -0,0 +1,52 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import pytest
+
+from Gene_Analysis import panels
+
+DEFINITIONS = {
+    'version': 1,
+    'panels': {
+        'fitness': {'category': 'fitness', 'scored': True, 'markers': [
+            ['Power', 'rs1815739', 'C', 0.4, 'ACTN3 - Power', ''],
+            ['Power', 'rs4343', 'G', 0.3, 'ACE - Power', ''],
+            ['Endurance', 'rs1815739', 'T', 0.35, 'ACTN3 - Endurance', ''],
+        ]},
+        'ancestry': {'category': 'ancestry', 'scored': False, 'markers': [
+            ['Eye Color', 'rs12913832', '', None, 'HERC2/OCA2', ''],
+        ]},
+    },
+}
+
+
+def test_compile_shares_rsid_index():
+    registry = panels.compile_registry(DEFINITIONS)
+    assert registry.rsids.tolist() == ['rs1815739', 'rs4343', 'rs12913832']
+    assert registry.entry_rsid.tolist() == [0, 1, 0, 2]
+    assert registry.trait_offsets.tolist() == [0, 2, 3, 4]
+    assert registry.panel_offsets.tolist() == [0, 2, 3]
+    fitness = registry.panel('fitness')
+    assert fitness.traits == ['Power', 'Endurance']
+    assert fitness.rsids() == ['rs1815739', 'rs4343']
+    assert fitness.models()['Endurance'] == [('rs1815739', 'T', 0.35)]
+    assert registry.panel('ancestry').markers()[0].weight is None
+    assert registry.rsids_for() == {'rs1815739', 'rs4343', 'rs12913832'}
+
+
+def test_split_trait_is_rejected():
+    definitions = {'panels': {'p': {'category': 'p', 'scored': True, 'markers': [
+        ['A', 'rs1', 'A', 1.0, '', ''],
+        ['B', 'rs2', 'A', 1.0, '', ''],
+        ['A', 'rs3', 'A', 1.0, '', ''],
+    ]}}}
+    with pytest.raises(ValueError):
+        panels.compile_registry(definitions)
+
+
+def test_registry_reloads_compiled_arrays(tmp_path, monkeypatch):
+    registry = panels.load_registry(cache_dir=tmp_path)
+    assert panels.registry_path(registry.digest, tmp_path).is_file()
+    monkeypatch.setattr(panels, '_registries', {})
+    monkeypatch.setattr(panels, 'compile_registry', lambda *a: pytest.fail('recompiled'))
+    reloaded = panels.load_registry(cache_dir=tmp_path)
+    assert reloaded.panel('fitness').models() == registry.panel('fitness').models()
+    assert list(reloaded) == ['ancestry', 'disease', 'prs', 'fitness', 'longevity']
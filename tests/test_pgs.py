@@ -0,0 +1,95 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import gzip
+import json
+from unittest import mock
+
+import pytest
+
+from Gene_Analysis import cli
+from Gene_Analysis.genome_cache import build_cache
+from Gene_Analysis.pgs import GenomeIndex, read_header, score_pgs
+
+GENOME = """# rsid\tchromosome\tposition\tgenotype
+rs1\t1\t100\tAG
+rs2\t1\t200\tGG
+i3\t2\t300\tCT
+rs4\tX\t400\t--
+rs5\t22\t500\tTT
+"""
+
+SCORING = """###PGS CATALOG SCORING FILE
+#pgs_id=PGS000999
+#trait_reported=Example trait
+#genome_build=GRCh37
+rsID\tchr_name\tchr_position\teffect_allele\tother_allele\teffect_weight
+rs1\t1\t100\tA\tG\t0.5
+rs2\t1\t200\tG\tA\t0.25
+rs99\t2\t300\tT\tC\t-1.0
+rs4\tX\t400\tA\tG\t2.0
+rs5\t22\t500\tTA\tT\t3.0
+rs6\t3\t600\tC\tT\t7.0
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    genome = tmp_path / 'genome.txt'
+    genome.write_text(GENOME)
+    return GenomeIndex.from_cache(build_cache(genome, tmp_path / 'cache'))
+
+
+def _gzip(path, text):
+    with gzip.open(path, 'wt') as handle:
+        handle.write(text)
+    return path
+
+
+def test_scores_by_rsid_with_position_fallback(tmp_path, index):
+    path = _gzip(tmp_path / 'PGS000999.txt.gz', SCORING)
+    assert read_header(path)['pgs_id'] == 'PGS000999'
+    result = score_pgs(path, index)
+    # rs1 AG x A, rs2 GG x G, rs99 -> i3 CT x T by position; rs4 no call, rs5 indel, rs6 untyped.
+    assert result.score == pytest.approx(0.5 + 2 * 0.25 - 1.0)
+    assert (result.variants_matched, result.variants_total) == (3, 6)
+    assert result.matched_by_rsid == 4 and result.matched_by_position == 1
+    assert result.variants_unscorable == 1
+    assert result.coverage == pytest.approx(0.5)
+
+    by_rsid = score_pgs(path, index, match='rsid')
+    assert by_rsid.variants_matched == 2 and by_rsid.matched_by_position == 0
+    assert score_pgs(path, index, match='position').score == pytest.approx(result.score)
+
+
+def test_chunking_does_not_change_the_result(tmp_path, index):
+    path = tmp_path / 'scores.txt'
+    path.write_text(SCORING)
+    whole = score_pgs(path, index)
+    chunked = score_pgs(path, index, chunk_size=2)
+    assert chunked.chunks == 3 and whole.chunks == 1
+    assert chunked.to_dict() | {'chunks': 1} == whole.to_dict()
+
+
+def test_harmonized_columns_take_precedence(tmp_path, index):
+    path = tmp_path / 'harmonized.txt'
+    path.write_text(
+        'rsID\tchr_name\tchr_position\teffect_allele\teffect_weight\thm_rsID\thm_chr\thm_pos\n'
+        'rs77\t9\t9\tT\t1.0\ti3\t2\t300\n'
+        'rs78\t9\t9\tG\t1.0\t\t1\t200\n'
+    )
+    result = score_pgs(path, index)
+    assert result.score == 3.0 and result.matched_by_position == 1
+    with pytest.raises(ValueError):
+        score_pgs(path, index, match='locus')
+
+
+def test_cli_reports_score_and_coverage(tmp_path):
+    genome = tmp_path / 'genome.txt'
+    genome.write_text(GENOME)
+    scoring = _gzip(tmp_path / 'PGS000999.txt.gz', SCORING)
+    out = tmp_path / 'pgs.json'
+    argv = ['pgs', str(genome), str(scoring), '--cache-dir', str(tmp_path / 'cache'), '--json-output', str(out)]
+    with mock.patch('builtins.print'):
+        assert cli.main(argv) == 0
+    [result] = json.loads(out.read_text())
+    assert result['pgs_id'] == 'PGS000999' and result['variants_matched'] == 3
+    assert result['coverage'] == pytest.approx(0.5)
@@ -0,0 +1,75 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import json
+from unittest import mock
+
+from Gene_Analysis import cli
+from Gene_Analysis.genome_cache import build_cache
+from Gene_Analysis.genotype_store import GenotypeRecord
+from Gene_Analysis.loader import load_genome
+from Gene_Analysis.position_index import (
+    LocusFallback,
+    PositionIndex,
+    cached_with_fallback,
+    load_panel_loci,
+    stream_with_fallback,
+)
+
+# rs429358 and rs7412 are listed under vendor ids; rs4988235 keeps its rsid.
+GENOME = """# rsid\tchromosome\tposition\tgenotype
+i5000001\t19\t45411941\tCT
+rs1\t19\t45411000\tAA
+VG19S2\t19\t45412079\tCC
+rs4988235\t2\t136608646\tAG
+rs3\tX\t100\tA
+"""
+
+
+def _write(tmp_path):
+    path = tmp_path / 'genome.txt'
+    path.write_text(GENOME)
+    return path
+
+
+def test_point_and_range_queries(tmp_path):
+    index = PositionIndex.from_store(load_genome(_write(tmp_path), with_loci=True))
+    assert index.lookup('19', 45411941) == GenotypeRecord('i5000001', '19', 45411941, 'CT')
+    assert index.lookup('chr19', 45411942) is None
+    assert index.lookup('7', 45411941) is None
+    window = index.range('19', 45411000, 45412079)
+    assert [r.rsid for r in window] == ['rs1', 'i5000001', 'VG19S2']
+    assert index.range('X', 0, 99) == [] and index.range('22', 0, 10**9) == []
+
+
+def test_fallback_resolves_missing_rsids_by_position(tmp_path):
+    path = _write(tmp_path)
+    rsids = ['rs429358', 'rs7412', 'rs4988235', 'rs6025']
+    loci = load_panel_loci()
+    assert loci['rs429358'] == ('19', 45411941)
+
+    streamed = stream_with_fallback(path, rsids, loci=loci)
+    assert isinstance(streamed, LocusFallback)
+    expected = {'rs429358': 'CT', 'rs7412': 'CC', 'rs4988235': 'AG'}
+    assert streamed.lookup_many(rsids) == expected
+    assert sorted(streamed.resolved) == ['rs429358', 'rs7412']
+    assert streamed.record('rs7412').rsid == 'VG19S2'
+
+    # The genome cache drops ids it cannot encode, so VG19S2 is not found there.
+    cached = cached_with_fallback(path, rsids, loci=loci, cache_dir=tmp_path / 'cache')
+    assert cached.lookup_many(rsids) == {'rs429358': 'CT', 'rs4988235': 'AG'}
+    assert PositionIndex.from_cache(build_cache(path, tmp_path / 'cache')).lookup('2', 136608646).rsid == 'rs4988235'
+
+
+def test_analyze_counts_position_matches(tmp_path):
+    genome = _write(tmp_path)
+    argv = ['analyze', str(genome), '--cache-dir', str(tmp_path / 'cache'), '--profile',
+            '--json-output', str(tmp_path / 'r.json'), '--markdown-output', str(tmp_path / 'r.md')]
+    with mock.patch('builtins.print'):
+        assert cli.main(argv) == 0
+        plain = json.loads((tmp_path / 'r.json').read_text())
+        assert cli.main(argv + ['--position-fallback']) == 0
+    fallback = json.loads((tmp_path / 'r.json').read_text())
+    load = {s['stage']: s for s in fallback['metadata']['profile']['stages']}['load']
+    assert load['markers_found_by_position'] == 2
+    apoe = [r for r in fallback['rows'] if r['rsid'] == 'rs429358']
+    assert apoe and all(r['genotype'] == 'CT' for r in apoe)
+    assert fallback['metadata']['markers_found'] > plain['metadata']['markers_found']
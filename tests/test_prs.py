@@ -0,0 +1,102 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import random
+
+import numpy as np
+import pytest
+
+from Gene_Analysis.prs import (
+    PRSEngine,
+    allele_dosage,
+    allele_present,
+    genotype_array,
+    longevity_effect,
+    scalar_encoder,
+)
+
+MODELS = {
+    'Power': [('rs1815739', 'C', 0.40), ('rs4343', 'G', 0.30), ('rs5186', 'C', 0.20)],
+    'Endurance': [('rs1815739', 'T', 0.35), ('rs4343', 'A', 0.20), ('rs2070744', 'C', 0.15)],
+}
+GENOME = {'rs1815739': 'CT', 'rs4343': 'GG', 'rs2070744': 'TT'}
+
+
+def _effect(genotype, risk_allele):
+    """The scalar longevity effect rule that ``longevity_effect`` vectorizes."""
+    if risk_allele * 2 == genotype:
+        return 0.0
+    if risk_allele in genotype and len(genotype) == 2:
+        return 0.5
+    if genotype == risk_allele.replace('A', 'G') * 2:
+        return 1.0
+    return 0.3
+
+
+def _loop_score(model, genome):
+    score = 0.0
+    for rsid, allele, weight in model:
+        if rsid in genome:
+            score += genome[rsid].count(allele) * weight
+    return score
+
+
+def test_scores_match_scalar_loop():
+    result = PRSEngine(MODELS).score(GENOME)
+    for trait, model in MODELS.items():
+        assert result.score(trait) == _loop_score(model, GENOME)
+    assert result.markers_found.tolist() == [2, 3]
+    assert result.markers_total.tolist() == [3, 3]
+
+
+def test_shared_rsids_are_one_variant_per_allele():
+    engine = PRSEngine(MODELS)
+    assert engine.rsids == ['rs1815739', 'rs4343', 'rs5186', 'rs2070744']
+    assert len(engine.variant_rsids) == 6
+
+
+def test_contributions_follow_model_order():
+    rows = PRSEngine(MODELS).score(GENOME).contributions('Power')
+    assert [r.rsid for r in rows] == ['rs1815739', 'rs4343', 'rs5186']
+    assert rows[1].value == 2.0 and rows[1].contribution == 0.6
+    assert rows[2].genotype is None and rows[2].contribution == 0.0
+
+
+def test_allele_dosage_matches_str_count():
+    genotypes = ['AA', 'AG', 'GG', 'A', '--', 'DI', '']
+    alleles = ['A', 'A', 'A', 'A', 'A', 'I', 'A']
+    expected = [g.count(a) for g, a in zip(genotypes, alleles)]
+    got = allele_dosage(np.array(genotypes, dtype='S2'), np.array(alleles, dtype='S1'))
+    assert got.tolist() == expected
+
+
+def _every_call():
+    symbols = ['', 'A', 'C', 'G', 'T', 'D', 'I', '-']
+    genotypes = sorted({a + b for a in symbols for b in symbols if a or not b})
+    pairs = [(g, a) for g in genotypes for a in symbols]
+    return pairs, np.array([g for g, _ in pairs], dtype='S2'), np.array([a for _, a in pairs], dtype='S1')
+
+
+def test_calls_wider_than_two_characters_are_no_calls():
+    assert genotype_array(['AG', 'CCT', '', 'A']).tolist() == [b'AG', b'--', b'', b'A']
+    assert genotype_array(np.array([b'GGA', b'TT'])).tolist() == [b'--', b'TT']
+    engine = PRSEngine(MODELS)
+    wide = engine.score({**GENOME, 'rs1815739': 'CCT'})
+    assert wide.scores.tolist() == engine.score({**GENOME, 'rs1815739': '--'}).scores.tolist()
+    assert engine.genotype_matrix([{'rs1815739': 'CCT'}])[0, 0] == b'--'
+
+
+def test_kernels_match_the_scalar_functions_exactly():
+    pairs, genotypes, alleles = _every_call()
+    assert allele_dosage(genotypes, alleles).tolist() == [float(g.count(a)) for g, a in pairs]
+    assert allele_present(genotypes, alleles).tolist() == [a in g for g, a in pairs]
+    effects = longevity_effect(genotypes, alleles)
+    assert effects.tolist() == [_effect(g, a) for g, a in pairs]
+    assert np.array_equal(effects, scalar_encoder(_effect)(genotypes, alleles))
+
+
+def test_large_model_matches_scalar_loop():
+    rng = random.Random(7)
+    model = [(f'rs{i}', rng.choice('ACGT'), rng.uniform(-0.1, 0.1)) for i in range(50_000)]
+    genome = {f'rs{i}': rng.choice('ACGT') + rng.choice('ACGT') for i in range(0, 50_000, 2)}
+    result = PRSEngine({'big': model}).score(genome)
+    assert result.score('big') == pytest.approx(_loop_score(model, genome), abs=1e-9)
+    assert result.markers_found[0] == 25_000
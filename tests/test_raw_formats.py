@@ -0,0 +1,76 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import gzip
+
+import pytest
+from Gene_Analysis.genome_cache import build_cache
+from Gene_Analysis.loader import load_genome, sniff_format, stream_genome
+from Gene_Analysis.raw_formats import detect_format
+from Longevity_Aging import LongevityAgingAnalyzer
+
+DOWNLOADS = {
+    '23andme': (
+        '# This data file generated by 23andMe at: Mon Jan 01 00:00:00 2024\n'
+        '# rsid\tchromosome\tposition\tgenotype\n'
+        'rs4477212\t1\t82154\tAG\n'
+        'i713426\t7\t117199644\tCC\n'
+        'rs3\tX\t100\t--\n'
+    ),
+    'ancestry': (
+        '#AncestryDNA raw data download\n'
+        '#Data was collected using AncestryDNA array version: V2.0\n'
+        'rsid\tchromosome\tposition\tallele1\tallele2\n'
+        'rs4477212\t1\t82154\tA\tG\n'
+        'i713426\t7\t117199644\tC\tC\n'
+        'rs3\t23\t100\t0\t0\n'
+    ),
+    'myheritage': (
+        '# MyHeritage DNA raw data.\n'
+        '# This file was generated on 2024-01-01\n'
+        'RSID,CHROMOSOME,POSITION,RESULT\n'
+        '"rs4477212","1","82154","AG"\n'
+        '"i713426","7","117199644","CC"\n'
+        '"rs3","X","100","--"\n'
+    ),
+    'ftdna': (
+        'RSID,CHROMOSOME,POSITION,RESULT\n'
+        '"rs4477212","1","82154","AG"\n'
+        '"i713426","7","117199644","CC"\n'
+        '"rs3","X","100","--"\n'
+    ),
+}
+EXPECTED = {'rs4477212': 'AG', 'i713426': 'CC', 'rs3': '--'}
+
+
+@pytest.mark.parametrize('vendor', sorted(DOWNLOADS))
+def test_every_vendor_normalizes_to_the_same_genome(tmp_path, vendor):
+    path = tmp_path / 'download.txt'
+    path.write_text(DOWNLOADS[vendor])
+    assert sniff_format(path).name == vendor
+    store = load_genome(path, with_loci=True)
+    assert dict(store) == EXPECTED
+    assert store.record('rs3') == ('rs3', 'X', 100, '--')
+    stats = {}
+    streamed = stream_genome(path, ['rs3', 'i713426'], with_loci=True, stats=stats)
+    assert dict(streamed) == {'rs3': '--', 'i713426': 'CC'}
+    assert streamed.record('i713426').position == 117199644 and stats['format'] == vendor
+    cache = build_cache(path, tmp_path / 'cache')
+    assert cache.metadata['format'] == vendor
+    assert dict(cache.to_store(EXPECTED)) == EXPECTED
+    assert LongevityAgingAnalyzer.load_genome_data(str(path)) == EXPECTED
+
+
+def test_compressed_vendor_files_are_sniffed(tmp_path):
+    path = tmp_path / 'AncestryDNA.txt.gz'
+    path.write_bytes(gzip.compress(DOWNLOADS['ancestry'].encode()))
+    assert sniff_format(path).name == 'ancestry'
+    assert dict(stream_genome(path, ['rs4477212'])) == {'rs4477212': 'AG'}
+
+
+def test_headerless_layouts_are_told_apart_by_shape():
+    assert detect_format('rs1\t1\t100\tAG\n').name == '23andme'
+    assert detect_format('rs1\t1\t100\tA\tG\n').name == 'ancestry'
+    assert detect_format('rs1 AG\nrs2 CC\n').name == 'pairs'
+    assert detect_format('"rs1","1","100","AG"\n').name == 'ftdna'
+    assert detect_format('').name == '23andme'
+    with pytest.raises(ValueError):
+        detect_format('rs1\t1\t100\n')
@@ -0,0 +1,66 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import io
+import json
+import tracemalloc
+from unittest import mock
+
+import pytest
+
+from Gene_Analysis.report import (
+    ReportWriter, build_report, expand_compact, marker_row, render_markdown, report_metadata, write_report,
+)
+
+ROWS = [
+    marker_row('fitness', 'Power', 'rs1815739', 'CT', 'ACTN3 | power', 'C', 0.3, 0.3),
+    marker_row('fitness', 'Power', 'rs4343', None, 'ACE', 'G', 0.2, None),
+    marker_row('ancestry', 'Eye Color', 'rs12913832', 'AG', 'HERC2/OCA2 – “blue”'),
+]
+
+
+def test_streamed_files_match_in_memory_rendering(tmp_path):
+    for rows in (ROWS, []):
+        report = build_report(rows, 'genome.txt', 'v1')
+        write_report(report, tmp_path / 'r.json', tmp_path / 'r.md')
+        assert (tmp_path / 'r.json').read_text() == json.dumps(report, indent=2, ensure_ascii=False) + '\n'
+        assert (tmp_path / 'r.md').read_text() == render_markdown(report)
+
+
+def test_compact_round_trip():
+    report = build_report(ROWS * 3, 'genome.txt')
+    full, compact = io.StringIO(), io.StringIO()
+    write_report(report, full, io.StringIO())
+    with ReportWriter(compact, None, report['metadata'], compact=True) as writer:
+        writer.extend(report['rows'])
+    document = json.loads(compact.getvalue())
+    assert document['lookups']['trait'] == ['Power', 'Eye Color']
+    assert document['rows'][0][:3] == [0, 0, 'rs1815739']
+    assert expand_compact(document) == report
+    assert len(compact.getvalue()) < len(full.getvalue())
+
+
+def test_writer_memory_does_not_grow_with_rows(tmp_path):
+    def rows(n):
+        for i in range(n):
+            yield marker_row('prs', f'Trait {i % 50}', f'rs{i}', 'AG', 'PGS marker', 'A', 0.01, 0.01)
+
+    tracemalloc.start()
+    try:
+        with ReportWriter(tmp_path / 'r.json', tmp_path / 'r.md', report_metadata('genome.txt')) as writer:
+            writer.extend(rows(20_000))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert (tmp_path / 'r.json').stat().st_size > 5_000_000
+    assert peak < 1_000_000
+    summaries = json.loads((tmp_path / 'r.json').read_text())['trait_summaries']
+    assert len(summaries) == 50 and summaries[0]['markers_total'] == 400
+
+
+def test_interrupted_write_keeps_the_previous_report(tmp_path):
+    report = build_report(ROWS, 'genome.txt', 'v1')
+    write_report(report, tmp_path / 'r.json', tmp_path / 'r.md')
+    before = (tmp_path / 'r.json').read_text()
+    with mock.patch('shutil.copyfileobj', side_effect=KeyboardInterrupt), pytest.raises(KeyboardInterrupt):
+        write_report(build_report(ROWS[:1], 'other.txt', 'v2'), tmp_path / 'r.json', tmp_path / 'r.md')
+    assert (tmp_path / 'r.json').read_text() == before
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['r.json', 'r.md']
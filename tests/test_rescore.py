@@ -0,0 +1,92 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import json
+from unittest import mock
+
+import pytest
+
+from Gene_Analysis import batch, cli, panels, rescore
+
+GENOME = """rs1815739\t11\t66560624\tCT
+rs540874\t1\t1\tAA
+rs429358\t19\t44908684\tCT
+rs4988235\t2\t135851076\tAG
+rs1426654\t15\t48134287\tAA
+"""
+
+
+def _analyze(tmp_path):
+    genome = tmp_path / 'genome.txt'
+    genome.write_text(GENOME)
+    with mock.patch('builtins.print'):
+        cli.main([
+            'analyze', str(genome),
+            '--json-output', str(tmp_path / 'report.json'),
+            '--markdown-output', str(tmp_path / 'report.md'),
+        ])
+    return genome, json.loads((tmp_path / 'report.json').read_text())
+
+
+def _edited_registry():
+    definitions = json.loads(panels.PANEL_FILE.read_text())
+    fitness = definitions['panels']['fitness']['markers']
+    fitness[0][3] = 0.5                                   # re-weight rs1815739
+    del fitness[1]                                        # drop rs540874
+    fitness.insert(1, ['Muscle Fiber Type', 'rs4988235', 'A', 0.1, 'LCT - test marker', ''])
+    return panels.compile_registry(definitions, 'edited')
+
+
+def test_rescore_matches_full_reanalysis(tmp_path, monkeypatch):
+    genome, report = _analyze(tmp_path)
+    registry = _edited_registry()
+    patched = rescore.rescore_report(report, registry, load=lambda rsids: pytest.fail('genome reread'))
+
+    stats = patched['metadata']['rescore']
+    assert (stats['rows_rescored'], stats['rows_added'], stats['rows_removed']) == (1, 1, 1)
+    assert stats['traits_rescored'] == 1
+    assert patched['metadata']['panel_version'] == 'edited'
+
+    monkeypatch.setattr(batch, 'load_registry', lambda: registry)
+    (tmp_path / 'cohort').mkdir()
+    (tmp_path / 'cohort' / 'genome.txt').write_text(GENOME)
+    batch.run_batch(tmp_path / 'cohort', tmp_path / 'out')
+    full = json.loads((tmp_path / 'out' / 'genome.json').read_text())
+    assert patched['rows'] == full['rows']
+    assert patched['trait_summaries'] == full['trait_summaries']
+    assert patched['category_summaries'] == full['category_summaries']
+
+    untouched = [s for s in report['trait_summaries'] if s['trait'] != 'Muscle Fiber Type']
+    assert all(s in patched['trait_summaries'] for s in untouched)
+
+
+def test_new_rsids_are_read_from_the_genome(tmp_path):
+    genome, report = _analyze(tmp_path)
+    definitions = json.loads(panels.PANEL_FILE.read_text())
+    definitions['panels']['fitness']['markers'].append(['Recovery', 'rs999', 'G', 0.2, 'New marker', ''])
+    registry = panels.compile_registry(definitions, 'added')
+    with open(genome, 'a') as handle:
+        handle.write('rs999\t1\t2\tGG\n')
+    patched = rescore.rescore_report(report, registry)
+    row = patched['rows'][[r['rsid'] for r in patched['rows']].index('rs999')]
+    assert row['genotype'] == 'GG' and row['contribution'] == pytest.approx(0.4)
+
+
+def test_rescore_file_patches_in_place_once(tmp_path):
+    _analyze(tmp_path)
+    registry = _edited_registry()
+    stats = rescore.rescore_file(tmp_path / 'report.json', registry)
+    assert stats['rows_added'] == 1
+    assert json.loads((tmp_path / 'report.json').read_text())['metadata']['panel_version'] == 'edited'
+    assert 'LCT - test marker' in (tmp_path / 'report.md').read_text()
+    assert rescore.rescore_file(tmp_path / 'report.json', registry) is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['genome.txt', 'report.json', 'report.md']
+
+
+def test_rescore_file_keeps_score_intervals(tmp_path):
+    _, report = _analyze(tmp_path)
+    before = {(s['category'], s['trait']) for s in report['trait_summaries'] if 'score_interval' in s}
+    assert before
+    rescore.rescore_file(tmp_path / 'report.json', _edited_registry())
+    patched = json.loads((tmp_path / 'report.json').read_text())
+    after = {(s['category'], s['trait']) for s in patched['trait_summaries'] if 'score_interval' in s}
+    assert after == before
+    assert ' to ' in (tmp_path / 'report.md').read_text()
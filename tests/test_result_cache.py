@@ -0,0 +1,75 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import json
+from unittest import mock
+
+import pytest
+
+from Gene_Analysis import batch, cli
+from Gene_Analysis.result_cache import ResultCache, result_key
+
+GENOME = """rs1815739\t11\t66560624\tCT
+rs429358\t19\t44908684\tCT
+rs1426654\t15\t48134287\tAA
+"""
+
+
+def _analyze(tmp_path, name, *extra):
+    with mock.patch('builtins.print'):
+        assert cli.main([
+            'analyze', str(tmp_path / 'genome.txt'), '--result-cache', '--cache-dir', str(tmp_path / 'cache'),
+            '--json-output', str(tmp_path / f'{name}.json'),
+            '--markdown-output', str(tmp_path / f'{name}.md'), *extra,
+        ]) == 0
+    return json.loads((tmp_path / f'{name}.json').read_text())
+
+
+def test_repeat_analyze_is_served_from_the_cache(tmp_path):
+    (tmp_path / 'genome.txt').write_text(GENOME)
+    first = _analyze(tmp_path, 'first')
+    with mock.patch('Gene_Analysis.analyzers.analyzer_rows', side_effect=AssertionError('recomputed')):
+        second = _analyze(tmp_path, 'second', '--profile')
+    assert second['rows'] == first['rows']
+    assert second['trait_summaries'] == first['trait_summaries']
+    assert second['metadata']['input_file'] == first['metadata']['input_file']
+    assert [s['stage'] for s in second['metadata']['profile']['stages']] == ['snapshot', 'result_cache']
+    assert second['metadata']['profile']['stages'][1]['hit'] is True
+    assert (tmp_path / 'second.md').read_text().split('\n', 3)[3] == (tmp_path / 'first.md').read_text().split('\n', 3)[3]
+
+
+def test_key_changes_with_genome_and_panels():
+    assert result_key('g', 'p') == ResultCache().key('g', 'p')
+    assert len({result_key('g', 'p'), result_key('g', 'q'), result_key('h', 'p')}) == 3
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path, max_entries=2)
+    report = {'metadata': {'generated_at': 'then', 'input_file': 'x'}, 'rows': []}
+    for age, key in enumerate(['c', 'b', 'a']):
+        cache.put(key, report)
+        os.utime(cache.path(key), (1000 - age, 1000 - age))
+    # 'a' is the oldest entry but reading it makes it the most recent.
+    assert cache.get('a', 'genome.txt')['metadata']['input_file'] == 'genome.txt'
+    cache.put('d', report)
+    assert sorted(p.stem for p in cache.directory.glob('*.json')) == ['a', 'd']
+    assert 'generated_at' not in json.loads(cache.path('d').read_text())['metadata']
+
+
+def test_size_bound_and_unreadable_entries(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1)
+    cache.put('big', {'metadata': {}, 'rows': ['x' * 100]})
+    assert not cache.path('big').exists()
+    cache.directory.mkdir(parents=True, exist_ok=True)
+    cache.path('torn').write_text('{"metadata": ')
+    assert cache.get('torn', 'genome.txt') is None
+
+
+def test_batch_reuses_results_across_runs(tmp_path):
+    (tmp_path / 'cohort').mkdir()
+    (tmp_path / 'cohort' / 'alice.txt').write_text(GENOME)
+    cache = ResultCache(tmp_path / 'cache')
+    first = batch.run_batch(tmp_path / 'cohort', tmp_path / 'first', results_cache=cache)
+    second = batch.run_batch(
+        tmp_path / 'cohort', tmp_path / 'second', lambda *a: pytest.fail('genome reloaded'), results_cache=cache,
+    )
+    assert second == first
+    assert (tmp_path / 'second' / batch.SUMMARY_FILE).read_text() == (tmp_path / 'first' / batch.SUMMARY_FILE).read_text()
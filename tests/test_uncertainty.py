@@ -0,0 +1,70 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import json
+import time
+from pathlib import Path
+from unittest import mock
+
+from Gene_Analysis import cli
+from Gene_Analysis.report import marker_row
+from Gene_Analysis.uncertainty import annotate_report, trait_intervals
+
+SAMPLE = Path(__file__).parent / 'data' / 'sample_genome.txt'
+
+
+def _rows(genotype='AG'):
+    return [
+        marker_row('prs', 'lipids', 'rs1', 'AA', '', 'A', 0.5, 1.0),
+        marker_row('prs', 'lipids', 'rs2', genotype, '', 'G', 0.3, None),
+        marker_row('ancestry', 'origin', 'rs3', 'CC', '', None, None, None),
+    ]
+
+
+def test_intervals_are_seeded_and_bracket_the_score():
+    rows = _rows()
+    first = trait_intervals(rows, seed=7)
+    assert first == trait_intervals(rows, seed=7)
+    assert first != trait_intervals(rows, seed=8)
+    assert list(first) == [('prs', 'lipids')]
+    lower, median, upper = first[('prs', 'lipids')]
+    # Score is 2 x 0.5 + 1 x 0.3; with every marker typed the median stays on it.
+    assert lower < 1.3 < upper
+    assert abs(median - 1.3) < 0.01
+
+
+def test_missing_markers_widen_the_interval_and_bounds_are_used():
+    typed = trait_intervals(_rows())[('prs', 'lipids')]
+    imputed = trait_intervals(_rows(genotype=None))[('prs', 'lipids')]
+    assert imputed[2] - imputed[0] > typed[2] - typed[0]
+
+    tight = {'rs1': (0.499, 0.501), 'rs2': (0.299, 0.301)}
+    lower, _, upper = trait_intervals(_rows(), bounds=tight)[('prs', 'lipids')]
+    assert upper - lower < 0.01
+
+
+def test_annotate_report_is_fast_and_records_its_settings():
+    rows = [
+        marker_row('prs', f'trait{i % 20}', f'rs{i}', 'AG' if i % 3 else None, '', 'A', 0.1, None)
+        for i in range(500)
+    ]
+    report = {'metadata': {}, 'rows': rows, 'trait_summaries': [
+        {'category': 'prs', 'trait': f'trait{i}', 'markers_total': 25, 'markers_found': 16, 'score': 1.6}
+        for i in range(20)
+    ]}
+    started = time.perf_counter()
+    annotate_report(report, draws=10_000)
+    assert time.perf_counter() - started < 1.0
+    assert report['metadata']['uncertainty'] == {'method': 'monte_carlo', 'draws': 10_000, 'seed': 0, 'level': 0.95}
+    assert all(len(s['score_interval']) == 2 for s in report['trait_summaries'])
+
+
+def test_analyze_writes_score_intervals(tmp_path):
+    argv = ['analyze', str(SAMPLE), '--cache-dir', str(tmp_path / 'cache'),
+            '--json-output', str(tmp_path / 'r.json'), '--markdown-output', str(tmp_path / 'r.md')]
+    with mock.patch('builtins.print'):
+        assert cli.main(argv) == 0
+    report = json.loads((tmp_path / 'r.json').read_text())
+    # Traits with no marker typed in the sample are fully imputed, but still get an interval.
+    weighted = [s for s in report['trait_summaries'] if s['category'] in ('prs', 'fitness', 'longevity')]
+    assert weighted and all(s['score_interval'][0] <= s['score_interval'][1] for s in weighted)
+    assert not any('score_interval' in s for s in report['trait_summaries'] if s not in weighted)
+    assert ' to ' in (tmp_path / 'r.md').read_text()
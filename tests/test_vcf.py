@@ -0,0 +1,164 @@
+import sys, os; sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import gzip
+import json
+import struct
+import zlib
+from unittest import mock
+
+from Gene_Analysis import cli
+from Gene_Analysis.vcf import BGZFReader, BlockIndex, call_genotype, is_vcf, load_vcf
+
+LOCI = {'rs1': ('1', 1000), 'rs2': ('1', 250000), 'rs3': ('2', 5000), 'rs4': ('X', 70), 'rs5': ('2', 7)}
+HEADER = '##fileformat=VCFv4.2\n##contig=<ID=1>\n#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tNA1\tNA2\n'
+
+
+def _records():
+    """Filler records every 10 bp, with the panel loci among them."""
+    special = {
+        ('1', 1000): ['1', '1000', '.', 'A', 'G', '50', 'PASS', '.', 'GT:DP', '0/1:30', '1/1:12'],
+        ('1', 250000): ['1', '250000', 'rs2', 'C', 'T', '50', 'PASS', '.', 'GT', '1|1', '0|0'],
+        ('2', 5000): ['2', '5000', '.', 'AT', 'A', '50', 'PASS', '.', 'GT', '0/1', './.'],
+    }
+    for chromosome, length in (('1', 300000), ('2', 9000), ('X', 100)):
+        for position in range(10, length, 10):
+            fields = special.get((chromosome, position))
+            yield fields or [chromosome, str(position), '.', 'A', 'C', '50', 'PASS', '.', 'GT', '0/0', '0/0']
+    # rs5 at 2:7 is absent: chromosome 2 starts after it.
+
+
+def _write_bgzf(path, text, block_size=4096):
+    """Write ``text`` as BGZF blocks; return the virtual offset of every line start."""
+    data = text.encode()
+    starts, offset = [], 0
+    line_starts = [0] + [i + 1 for i, byte in enumerate(data) if byte == 10][:-1]
+    with open(path, 'wb') as handle:
+        for begin in range(0, len(data), block_size):
+            chunk = data[begin:begin + block_size]
+            body = zlib.compress(chunk, 6)[2:-4]
+            size = 18 + len(body) + 8
+            handle.write(b'\x1f\x8b\x08\x04' + b'\0' * 6 + struct.pack('<H', 6) + b'BC'
+                         + struct.pack('<HH', 2, size - 1) + body
+                         + struct.pack('<II', zlib.crc32(chunk), len(chunk)))
+            starts.append((begin, offset))
+            offset += size
+        handle.write(b'\x1f\x8b\x08\x04' + b'\0' * 6 + b'\x06\x00BC\x02\x00\x1b\x00\x03\x00' + b'\0' * 8)
+    blocks = dict(starts)
+    return [(blocks[s // block_size * block_size] << 16) | (s % block_size) for s in line_starts]
+
+
+def _write_tabix(path, lines, offsets):
+    """Write a minimal .tbi with one bin-4681-level chunk per record and its linear index."""
+    references = {}
+    for line, offset in zip(lines, offsets):
+        if line.startswith('#'):
+            continue
+        chromosome, position = line.split('\t')[:2]
+        beg = int(position) - 1
+        bins, linear = references.setdefault(chromosome, ({}, {}))
+        bins.setdefault(4681 + (beg >> 14), []).append((offset, offset + 1))
+        linear.setdefault(beg >> 14, offset)
+    names = b''.join(name.encode() + b'\0' for name in references)
+    out = b'TBI\x01' + struct.pack('<8i', len(references), 2, 1, 2, 0, ord('#'), 0, len(names)) + names
+    for bins, linear in references.values():
+        out += struct.pack('<i', len(bins))
+        for number, chunks in bins.items():
+            out += struct.pack('<Ii', number, len(chunks)) + b''.join(struct.pack('<QQ', *c) for c in chunks)
+        windows = [linear.get(i, 0) for i in range(max(linear) + 1)]
+        out += struct.pack('<i', len(windows)) + b''.join(struct.pack('<Q', w) for w in windows)
+    path.write_bytes(gzip.compress(out))
+
+
+def _vcf(tmp_path, name='sample.vcf.gz'):
+    text = HEADER + ''.join('\t'.join(fields) + '\n' for fields in _records())
+    path = tmp_path / name
+    offsets = _write_bgzf(path, text)
+    return path, text, offsets
+
+
+EXPECTED = {'rs1': 'AG', 'rs2': 'TT', 'rs3': 'ID', 'rs4': 'AA'}
+
+
+def test_block_index_seeks_to_each_locus(tmp_path):
+    path, text, _ = _vcf(tmp_path)
+    stats = {}
+    store = load_vcf(path, list(LOCI) + ['rs_unplaced'], loci=LOCI, cache_dir=tmp_path / 'cache', stats=stats)
+    assert dict(store) == EXPECTED
+    assert store.record('rs2') == ('rs2', '1', 250000, 'TT')
+    assert stats['access'] == 'index' and stats['markers_without_locus'] == 1
+    total = len(list(BGZFReader(path).blocks()))
+    assert 0 < stats['blocks_read'] < total / 10
+    # The index is reused from the cache on the next run; the second sample can be picked by name.
+    assert len(list((tmp_path / 'cache').rglob('*.npz'))) == 1
+    assert load_vcf(path, ['rs1'], loci=LOCI, cache_dir=tmp_path / 'cache', sample='NA2')['rs1'] == 'GG'
+
+    plain = tmp_path / 'plain.vcf'
+    plain.write_text(text)
+    assert dict(load_vcf(plain, LOCI, loci=LOCI, cache_dir=tmp_path / 'cache')) == EXPECTED
+    index = BlockIndex.build(BGZFReader(path))
+    assert sorted(set(index.chromosomes.tolist())) == [1, 2, 23]
+
+
+def test_tabix_index_and_unseekable_gzip(tmp_path):
+    path, text, offsets = _vcf(tmp_path)
+    _write_tabix(tmp_path / 'sample.vcf.gz.tbi', text.splitlines(), offsets)
+    stats = {}
+    assert dict(load_vcf(path, LOCI, loci=LOCI, stats=stats, cache_dir=tmp_path / 'cache')) == EXPECTED
+    assert stats['access'] == 'tabix'
+    assert not (tmp_path / 'cache').exists()
+
+    ordinary = tmp_path / 'ordinary.vcf.gz'
+    ordinary.write_bytes(gzip.compress(text.encode()))
+    stats = {}
+    assert dict(load_vcf(ordinary, LOCI, loci=LOCI, stats=stats)) == EXPECTED
+    assert stats['access'] == 'scan'
+
+
+def test_markers_without_a_locus_are_found_by_id(tmp_path):
+    path, text, _ = _vcf(tmp_path)
+    loci = {rsid: locus for rsid, locus in LOCI.items() if rsid != 'rs2'}
+    stats = {}
+    rsids = list(LOCI) + ['rs_unplaced']
+    assert dict(load_vcf(path, rsids, loci=loci, cache_dir=tmp_path / 'cache', stats=stats)) == EXPECTED
+    assert stats['markers_located_by_id'] == 1 and stats['markers_without_locus'] == 1
+    # The next run seeks to the cached position without another pass over the file.
+    with mock.patch('Gene_Analysis.vcf._locate_ids', side_effect=AssertionError('searched again')):
+        assert load_vcf(path, ['rs2'], loci=loci, cache_dir=tmp_path / 'cache')['rs2'] == 'TT'
+        assert 'rs_unplaced' not in load_vcf(path, ['rs_unplaced'], loci=loci, cache_dir=tmp_path / 'cache')
+
+    ordinary = tmp_path / 'ordinary.vcf.gz'
+    ordinary.write_bytes(gzip.compress(text.encode()))
+    stats = {}
+    assert dict(load_vcf(ordinary, LOCI, loci=loci, stats=stats)) == EXPECTED
+    assert stats['access'] == 'scan' and stats['markers_located_by_id'] == 1
+
+
+def test_call_genotype():
+    def record(ref, alt, gt):
+        return ['1', '5', '.', ref, alt, '.', '.', '.', 'GT:GQ', gt]
+
+    assert call_genotype(record('A', 'G,T', '1/2:99'), 9) == 'GT'
+    assert call_genotype(record('A', 'G', '1'), 9) == 'G'
+    assert call_genotype(record('A', 'G', '.:3'), 9) == '--'
+    assert call_genotype(record('A', '<NON_REF>', '0/0'), 9) == 'AA'
+    assert call_genotype(record('A', 'AT', '0|1'), 9) == 'DI'
+    assert call_genotype(record('A', 'G', '0/1'), 10) == '--'
+
+
+def test_analyze_reads_a_vcf_by_position(tmp_path):
+    loci = {'rs429358': ('19', 45411941), 'rs7412': ('19', 45412079)}
+    text = HEADER + ''.join(
+        f'19\t{position}\t.\t{ref}\t{alt}\t.\tPASS\t.\tGT\t{gt}\tx\n'
+        for position, ref, alt, gt in ((45411900, 'A', 'C', '0/0'), (45411941, 'T', 'C', '0/1'),
+                                       (45412079, 'C', 'T', '0/0'), (45412100, 'G', 'A', '1/1'))
+    )
+    path = tmp_path / 'wgs.vcf.gz'
+    _write_bgzf(path, text)
+    assert is_vcf(path)
+    argv = ['analyze', str(path), '--cache-dir', str(tmp_path / 'cache'), '--profile', '--result-cache',
+            '--json-output', str(tmp_path / 'r.json'), '--markdown-output', str(tmp_path / 'r.md')]
+    with mock.patch('builtins.print'), mock.patch('Gene_Analysis.vcf.load_panel_loci', return_value=loci):
+        assert cli.main(argv) == 0
+    report = json.loads((tmp_path / 'r.json').read_text())
+    load = {s['stage']: s for s in report['metadata']['profile']['stages']}['load']
+    assert load['source'] == 'vcf' and load['markers_found'] == 2
+    assert {r['rsid']: r['genotype'] for r in report['rows'] if r['rsid'] in loci} == {'rs429358': 'TC', 'rs7412': 'CC'}